@@ -1,14 +1,47 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-import random
-import plotly.graph_objects as go
-import plotly.express as px
+import os
+import threading
+
+# pandas, plotly (through parking.rendering) and the optional batching,
+# ingestion and sharding modules are imported where they are used, so pages
+# that need none of them start without paying for them
+from parking.aggregates import OccupancyAggregates
+from parking.billing import Tariffs, load_tariffs
+from parking.cache import FigureCache
+from parking.forecast import OccupancyForecaster
+from parking.inventory import PREFERENCE_POINTS, STATUS_AVAILABLE, InventoryStore, layout_facilities
+from parking.live import ChangeFeed
+from parking.metrics import METRICS, export_file, serve_http
+from parking.reservations import ReservationCalendar
+from parking.search import SpotSearch
+from parking.storage import BookingStore
+
+# Seconds between live map and availability refreshes; 0 turns them off
+LIVE_REFRESH = float(os.environ.get('PARKING_LIVE_REFRESH', 2)) or None
 
 # Page configuration
 st.set_page_config(page_title="Smart Parking System", page_icon="🅿️", layout="wide")
 
+@st.cache_resource
+def get_metrics():
+    """Hot-path timers, enabled by PARKING_METRICS and exported to
+    PARKING_METRICS_FILE and/or PARKING_METRICS_PORT"""
+    if os.environ.get('PARKING_METRICS', '0') == '0':
+        return METRICS
+    METRICS.enabled = True
+    metrics_file = os.environ.get('PARKING_METRICS_FILE')
+    if metrics_file:
+        threading.Thread(target=export_file, args=(METRICS, metrics_file), name='metrics-file', daemon=True).start()
+    metrics_port = os.environ.get('PARKING_METRICS_PORT')
+    if metrics_port:
+        serve_http(METRICS, os.environ.get('PARKING_METRICS_HOST', '127.0.0.1'), int(metrics_port))
+    return METRICS
+
+# Time this rerun; the breakdown shows in the sidebar Profiling panel
+metrics = get_metrics()
+metrics.start_run()
+
 # Initialize session state
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
@@ -16,163 +49,240 @@ if 'user_name' not in st.session_state:
     st.session_state.user_name = ""
 if 'current_booking' not in st.session_state:
     st.session_state.current_booking = None
-if 'bookings_history' not in st.session_state:
-    st.session_state.bookings_history = []
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = None
 if 'dashboard_action' not in st.session_state:
     st.session_state.dashboard_action = None
-if 'parking_data' not in st.session_state:
-    # Initialize parking facilities
-    st.session_state.parking_data = {
-        'Select Mall - Saket': {'total': 120, 'available': 45, 'floors': 3},
-        'DLF Cyber Hub - Gurgaon': {'total': 200, 'available': 78, 'floors': 4},
-        'Phoenix Market City - Mumbai': {'total': 350, 'available': 142, 'floors': 5},
-        'Forum Mall - Bangalore': {'total': 180, 'available': 63, 'floors': 3}
-    }
 
 # Facility data structure
-def generate_parking_spots(facility_name, floor_num, total_spots=40):
-    """Generate parking spot layout for a floor"""
-    spots = []
-    rows = 8
-    cols = 5
-    spot_id = 1
-    
-    for row in range(rows):
-        for col in range(cols):
-            status = random.choice(['available', 'occupied', 'available', 'occupied'])
-            if random.random() < 0.7:  # 70% chance of being available for demo
-                status = 'available'
-            
-            spots.append({
-                'id': f"{floor_num}{chr(65+row)}{spot_id:02d}",
-                'row': row,
-                'col': col,
-                'status': status,
-                'type': random.choice(['Regular', 'EV Charging', 'Disabled', 'Regular', 'Regular']),
-                'distance_to_entry': abs(row - 0) + abs(col - 2)  # Manhattan distance from entry
-            })
-            spot_id += 1
-    
-    return spots
+@st.cache_resource
+def get_booking_store():
+    """Durable users, sessions and bookings database"""
+    return BookingStore(os.environ.get('PARKING_DB_PATH', 'parking.db'))
 
-def create_parking_map(spots, assigned_spot=None, route_spots=None):
-    """Create interactive parking lot visualization"""
-    fig = go.Figure()
-    
-    # Color mapping
-    color_map = {
-        'available': '#00D66A',
-        'occupied': '#FF4B4B',
-        'assigned': '#FFB800'
-    }
+@st.cache_resource
+def get_tariffs():
+    """Parking tariffs, with facility overrides from PARKING_TARIFF_FILE"""
+    tariff_file = os.environ.get('PARKING_TARIFF_FILE')
+    return Tariffs(load_tariffs(tariff_file) if tariff_file else None)
+
+@st.cache_resource
+def get_facilities():
+    """Facilities from a compiled layout bundle in PARKING_LAYOUT_FILE, else the built-in ones"""
+    return layout_facilities(os.environ.get('PARKING_LAYOUT_FILE'))
+
+def restore_active_sessions(target):
+    """Mark the spots of cars still parked from before a restart occupied on ``target``
+
+    ``target`` is the local InventoryStore or the ShardedInventory.
+    """
+    for session in get_booking_store().active_sessions():
+        if session['facility'] in target.facilities:
+            target.set_status(session['facility'], int(session['floor'].split()[1]), session['spot'], 'occupied')
+
+@st.cache_resource
+def get_inventory_store():
+    """Spot inventory shared by all sessions in this process"""
+    store = InventoryStore(get_facilities(), layout_path=os.environ.get('PARKING_LAYOUT_FILE'))
+    restore_active_sessions(store)
+    return store
+
+@st.cache_resource
+def get_reservation_calendar():
+    """Future reservations per spot, loaded once from the database"""
+    calendar = ReservationCalendar(get_inventory_store())
+    calendar.load(get_booking_store().upcoming_reservations())
+    return calendar
+
+@st.cache_resource
+def get_shard_router():
+    """Inventory shards in PARKING_SHARD_DIR that own claims and reservations, if configured"""
+    socket_dir = os.environ.get('PARKING_SHARD_DIR')
+    if not socket_dir:
+        return None
+    from parking.sharding import ShardedInventory
+    shards = ShardedInventory(get_facilities(), socket_dir, int(os.environ.get('PARKING_SHARDS', 1)))
+    restore_active_sessions(shards)
+    return shards
+
+def reserved_soon(facility_name, floor_num):
+    """Spots pre-booked for the coming hour, held back from Quick Park"""
+    now = datetime.now()
+    calendar = get_shard_router() or get_reservation_calendar()
+    return calendar.busy_mask(facility_name, floor_num, now, now + timedelta(hours=1))
+
+@st.cache_resource
+def get_batch_assigner():
+    """Quick Park arrival batching, enabled by PARKING_BATCH_WINDOW seconds"""
+    window = float(os.environ.get('PARKING_BATCH_WINDOW', 0))
+    # Batches are solved against this process's inventory, so not with shards
+    if window <= 0 or get_shard_router():
+        return None
+    from parking.assignment import BatchAssigner
+    return BatchAssigner(get_inventory_store(), window=window, exclude=reserved_soon)
+
+@st.cache_resource
+def get_occupancy_aggregates():
+    """Live totals per facility, floor and type, updated on every claim"""
+    return OccupancyAggregates(get_inventory_store())
+
+@st.cache_resource
+def get_occupancy_ingestor():
+    """Sensor and gate events from PARKING_EVENTS_FILE and/or PARKING_EVENTS_PORT"""
+    events_file = os.environ.get('PARKING_EVENTS_FILE')
+    events_port = os.environ.get('PARKING_EVENTS_PORT')
+    if not events_file and not events_port:
+        return None
+    from parking.ingest import OccupancyIngestor, serve_tcp, tail_jsonl
+    ingestor = OccupancyIngestor(get_inventory_store()).start()
+    if events_file:
+        threading.Thread(target=tail_jsonl, args=(events_file, ingestor), name='occupancy-tail', daemon=True).start()
+    if events_port:
+        serve_tcp(ingestor, os.environ.get('PARKING_EVENTS_HOST', '127.0.0.1'), int(events_port))
+    return ingestor
+
+@st.cache_resource
+def get_occupancy_forecaster():
+    """Hour-of-week occupancy curves from stored history, kept learning live"""
+    forecaster = OccupancyForecaster(get_inventory_store())
+    forecaster.fit(get_booking_store().occupancy_intervals())
+    forecaster.track()
+    return forecaster
+
+@st.cache_resource
+def get_change_feed():
+    """Recent spot status changes per floor for live views"""
+    return ChangeFeed(get_inventory_store())
+
+@st.cache_resource
+def get_stylesheet():
+    """Page CSS from assets/style.css, read once per process"""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'style.css'), encoding='utf-8') as f:
+        return f"<style>\n{f.read()}</style>"
+
+@st.cache_resource
+def get_spot_search():
+    """Search across floors and nearby facilities, claiming through the shards when configured"""
+    return SpotSearch(get_inventory_store(), get_shard_router())
+
+@st.cache_resource
+def get_figure_cache():
+    """Floor figures shared by all sessions, bounded LRU"""
+    cache = FigureCache(maxsize=64)
+    METRICS.track('figure_cache_hits_total', lambda: cache.hits, 'counter')
+    METRICS.track('figure_cache_misses_total', lambda: cache.misses, 'counter')
+    return cache
+
+booking_store = get_booking_store()
+tariffs = get_tariffs()
+inventory = get_inventory_store()
+reservations = get_reservation_calendar()
+shards = get_shard_router()
+# With shards, claims and reservations go to the owning shard and the local
+# inventory is a replica for maps, routes and aggregates
+claims = shards or inventory
+calendar = shards or reservations
+batch_assigner = get_batch_assigner()
+aggregates = get_occupancy_aggregates()
+ingestor = get_occupancy_ingestor()
+change_feed = get_change_feed()
+forecaster = get_occupancy_forecaster()
+figure_cache = get_figure_cache()
+spot_search = get_spot_search()
+
+def sync_replica():
+    """Pull claims made by other app workers from the shards"""
+    if shards:
+        shards.sync(inventory)
+
+sync_replica()
+
+# Live facility availability, shared by every session
+parking_data = aggregates.facility_counts()
+
+def floor_map(facility_name, floor_num, assigned_spot=None):
+    """Floor figure, rebuilt only when the floor or its overlay changes
+
+    The route is a fixed function of the assigned spot on a given layout,
+    so the assigned spot alone identifies the overlay.
+    """
+    def build():
+        from parking.rendering import create_parking_map
+        spots = inventory.floor(facility_name, floor_num)
+        points = inventory.router(facility_name, floor_num).points
+        if not assigned_spot:
+            return create_parking_map(spots, points=points)
+        route_cells, route_idx = inventory.route(facility_name, floor_num, assigned_spot)
+        return create_parking_map(spots, assigned_spot, spots.ids[route_idx].tolist(),
+                                  route_cells=route_cells, points=points)
+
+    key = (facility_name, floor_num, inventory.version(facility_name, floor_num), assigned_spot)
+    return figure_cache.get_or_build(key, build)
+
+@st.fragment(run_every=LIVE_REFRESH)
+def live_availability(total_bookings):
+    """Dashboard stats and facility chart, refreshed from the live aggregates"""
+    sync_replica()
+    col1, col2, col3, col4 = st.columns(4)
+    total_facilities, total_spots, available_spots = aggregates.totals()
     
-    for spot in spots:
-        color = color_map.get(spot['status'], '#00D66A')
-        
-        if assigned_spot and spot['id'] == assigned_spot:
-            color = color_map['assigned']
-            marker_size = 20
-        else:
-            marker_size = 15
-        
-        # Check if spot is on the route
-        is_on_route = route_spots and spot['id'] in route_spots
-        
-        fig.add_trace(go.Scatter(
-            x=[spot['col']],
-            y=[spot['row']],
-            mode='markers+text',
-            marker=dict(
-                size=marker_size,
-                color=color,
-                symbol='square',
-                line=dict(width=3, color='#FFB800') if is_on_route else dict(width=1, color='#333')
-            ),
-            text=spot['id'],
-            textposition='middle center',
-            textfont=dict(size=8, color='white'),
-            hovertemplate=f"<b>Spot: {spot['id']}</b><br>" +
-                         f"Status: {spot['status']}<br>" +
-                         f"Type: {spot['type']}<br>" +
-                         "<extra></extra>",
-            showlegend=False
-        ))
+    with col1:
+        st.markdown(f'<div class="stat-card"><h3>🏢</h3><h2>{total_facilities}</h2><p>Total Facilities</p></div>', unsafe_allow_html=True)
     
-    # Add entry point
-    fig.add_trace(go.Scatter(
-        x=[2],
-        y=[-1],
-        mode='markers+text',
-        marker=dict(size=25, color='#4A90E2', symbol='triangle-up'),
-        text='ENTRY',
-        textposition='bottom center',
-        textfont=dict(size=12, color='#4A90E2', family='Arial Black'),
-        showlegend=False
-    ))
+    with col2:
+        st.markdown(f'<div class="stat-card"><h3>🅿️</h3><h2>{total_spots}</h2><p>Total Spots</p></div>', unsafe_allow_html=True)
     
-    fig.update_layout(
-        title="Parking Lot Layout",
-        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-1, 6]),
-        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-2, 9]),
-        plot_bgcolor='#1E1E1E',
-        paper_bgcolor='#0E1117',
-        height=500,
-        margin=dict(l=20, r=20, t=40, b=20)
-    )
+    with col3:
+        st.markdown(f'<div class="stat-card"><h3>✅</h3><h2>{available_spots}</h2><p>Available Now</p></div>', unsafe_allow_html=True)
     
-    return fig
-
-def calculate_route(start_pos, end_pos):
-    """Calculate simple route between two points"""
-    route = []
-    current = list(start_pos)
+    with col4:
+        st.markdown(f'<div class="stat-card"><h3>📝</h3><h2>{total_bookings}</h2><p>Your Bookings</p></div>', unsafe_allow_html=True)
     
-    # Move horizontally first, then vertically
-    while current[1] != end_pos[1]:
-        current[1] += 1 if current[1] < end_pos[1] else -1
-        route.append(tuple(current))
+    st.markdown("---")
     
-    while current[0] != end_pos[0]:
-        current[0] += 1 if current[0] < end_pos[0] else -1
-        route.append(tuple(current))
+    # Facility availability chart
+    st.subheader("🏢 Facility Availability")
     
-    return route
+    # Rebuilt only when a claim or release changed the counts
+    def build():
+        from parking.rendering import create_availability_chart
+        return create_availability_chart(aggregates.facility_counts())
 
-# Custom CSS
-st.markdown("""
-    <style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: bold;
-        color: #4A90E2;
-        text-align: center;
-        margin-bottom: 2rem;
-    }
-    .stat-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 10px;
-        color: white;
-        text-align: center;
-        margin: 0.5rem 0;
-    }
-    .booking-card {
-        background: #1E1E1E;
-        padding: 1.5rem;
-        border-radius: 10px;
-        border-left: 4px solid #4A90E2;
-        margin: 1rem 0;
-    }
-    .success-msg {
-        background: #00D66A;
-        color: white;
-        padding: 1rem;
-        border-radius: 5px;
-        text-align: center;
-        font-weight: bold;
+    fig = figure_cache.get_or_build(('availability', aggregates.version), build)
+    with metrics.timer('plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment(run_every=LIVE_REFRESH)
+def live_floor_map(facility_name, floor_num, assigned_spot=None):
+    """Floor map redrawn on each refresh, with the spots that changed since the last one"""
+    sync_replica()
+    key = ('live_version', facility_name, floor_num)
+    last_version = st.session_state.get(key)
+    changes = None if last_version is None else change_feed.changes_since(facility_name, floor_num, last_version)
+    st.session_state[key] = inventory.version(facility_name, floor_num)
+    
+    fig = floor_map(facility_name, floor_num, assigned_spot)
+    with metrics.timer('plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+    if changes is not None and len(changes[1]):
+        spots = inventory.floor(facility_name, floor_num)
+        freed = spots.ids[changes[1][changes[2] == STATUS_AVAILABLE]].tolist()
+        taken = spots.ids[changes[1][changes[2] != STATUS_AVAILABLE]].tolist()
+        st.caption(f"Live: {len(freed)} spot(s) freed, {len(taken)} taken since the last refresh"
+                   + (f" (freed: {', '.join(freed[:5])})" if freed else ""))
+
+def session_booking(session):
+    """Current booking dict for an open parking session row"""
+    return {
+        'facility': session['facility'],
+        'floor': session['floor'],
+        'spot': session['spot'],
+        'entry_time': datetime.fromisoformat(session['entry_ts']).strftime("%I:%M %p"),
+        'session_id': session['id']
     }
-    </style>
-""", unsafe_allow_html=True)
+
+# Custom CSS
+st.markdown(get_stylesheet(), unsafe_allow_html=True)
 
 # Header
 st.markdown('<div class="main-header">🅿️ Smart Parking Management System</div>', unsafe_allow_html=True)
@@ -217,6 +327,12 @@ if page == "Login" and not st.session_state.logged_in:
                 st.session_state.user_name = name
                 st.session_state.user_phone = phone
                 st.session_state.user_vehicle = vehicle
+                st.session_state.user_id = booking_store.upsert_user(phone, name, vehicle)
+                
+                # Resume a parking session that is still open
+                session = booking_store.active_session(st.session_state.user_id)
+                if session:
+                    st.session_state.current_booking = session_booking(session)
                 st.rerun()
             else:
                 st.error("Please fill all fields")
@@ -250,11 +366,13 @@ elif page == "About":
         """)
     
     st.subheader("🏢 Available Facilities")
-    facilities_df = pd.DataFrame([
-        {"Facility": k, "Total Spots": v['total'], "Available": v['available'], "Floors": v['floors']}
-        for k, v in st.session_state.parking_data.items()
-    ])
-    st.dataframe(facilities_df, use_container_width=True)
+    # A markdown table rather than st.dataframe, which would load pandas and
+    # pyarrow just for this page
+    facilities_table = aggregates.cached('facilities_table', lambda: "\n".join(
+        ["| Facility | Total Spots | Available | Floors |", "|---|---:|---:|---:|"]
+        + [f"| {k} | {v['total']} | {v['available']} | {v['floors']} |" for k, v in parking_data.items()]
+    ))
+    st.markdown(facilities_table)
 
 # Dashboard
 elif page == "Dashboard":
@@ -281,61 +399,47 @@ elif page == "Dashboard":
     
     st.markdown("---")
     
-    # Stats
-    col1, col2, col3, col4 = st.columns(4)
+    # Stats and availability chart refresh on their own; the rest of the
+    # page only reruns on interaction
+    total_bookings = booking_store.count_bookings(st.session_state.user_id)
+    live_availability(total_bookings)
     
-    with col1:
-        st.markdown('<div class="stat-card"><h3>🏢</h3><h2>4</h2><p>Total Facilities</p></div>', unsafe_allow_html=True)
-    
-    with col2:
-        total_spots = sum([v['total'] for v in st.session_state.parking_data.values()])
-        st.markdown(f'<div class="stat-card"><h3>🅿️</h3><h2>{total_spots}</h2><p>Total Spots</p></div>', unsafe_allow_html=True)
-    
-    with col3:
-        available_spots = sum([v['available'] for v in st.session_state.parking_data.values()])
-        st.markdown(f'<div class="stat-card"><h3>✅</h3><h2>{available_spots}</h2><p>Available Now</p></div>', unsafe_allow_html=True)
-    
-    with col4:
-        total_bookings = len(st.session_state.bookings_history)
-        st.markdown(f'<div class="stat-card"><h3>📝</h3><h2>{total_bookings}</h2><p>Your Bookings</p></div>', unsafe_allow_html=True)
-    
-    st.markdown("---")
-    
-    # Facility availability chart
-    st.subheader("🏢 Facility Availability")
-    
-    facilities_chart_data = pd.DataFrame([
-        {"Facility": k, "Available": v['available'], "Occupied": v['total'] - v['available']}
-        for k, v in st.session_state.parking_data.items()
-    ])
-    
-    fig = px.bar(facilities_chart_data, x="Facility", y=["Available", "Occupied"],
-                 title="Real-time Parking Availability",
-                 color_discrete_map={"Available": "#00D66A", "Occupied": "#FF4B4B"},
-                 barmode='stack')
-    fig.update_layout(plot_bgcolor='#0E1117', paper_bgcolor='#0E1117')
-    st.plotly_chart(fig, use_container_width=True)
+    # Receipt for the session that just ended
+    last_exit = st.session_state.pop('last_exit', None)
+    if last_exit:
+        st.success(f"✅ Exited {last_exit['spot']} after {last_exit['duration']}. Parking fee: ₹{last_exit['fee']:.2f}")
     
     # Current booking status
     if st.session_state.current_booking:
         st.subheader("🚗 Current Parking Session")
         booking = st.session_state.current_booking
+        session = booking_store.active_session(st.session_state.user_id)
+        now = datetime.now()
+        charges = tariffs.fee(booking['facility'], session['entry_ts'], now, session['spot_type'] or 'Regular') if session else 0.0
         st.markdown(f"""
         <div class="booking-card">
             <h3>Spot: {booking['spot']}</h3>
             <p><strong>Facility:</strong> {booking['facility']}</p>
             <p><strong>Floor:</strong> {booking['floor']}</p>
             <p><strong>Entry Time:</strong> {booking['entry_time']}</p>
+            <p><strong>Charges so far:</strong> ₹{charges:.2f}</p>
         </div>
         """, unsafe_allow_html=True)
         
         if st.button("🚪 Exit Parking", type="primary"):
-            st.session_state.bookings_history.append({
-                **booking,
-                'exit_time': datetime.now().strftime("%I:%M %p")
-            })
+            exit_ts = now.isoformat(timespec='seconds')
+            # Closing the session is the atomic step: only the request that
+            # closes it bills the stay and frees the spot
+            if session and session['id'] == booking['session_id'] and \
+                    booking_store.end_session(session['id'], exit_ts, charges):
+                claims.release(booking['facility'], int(booking['floor'].split()[1]), booking['spot'])
+                minutes = int((now - datetime.fromisoformat(session['entry_ts'])).total_seconds() // 60)
+                st.session_state.last_exit = {
+                    'spot': booking['spot'],
+                    'duration': f"{minutes // 60}h {minutes % 60:02d}m",
+                    'fee': charges
+                }
             st.session_state.current_booking = None
-            st.success("✅ Exited successfully!")
             st.rerun()
 
 # Quick Park (QR Scan)
@@ -349,89 +453,123 @@ elif page == "Quick Park (QR Scan)":
         st.info("In a real implementation, this would use your camera to scan a QR code at the facility entrance.")
         
         facility = st.selectbox("Select Facility (Simulated QR Scan)", 
-                               list(st.session_state.parking_data.keys()))
+                               list(parking_data.keys()))
         
         if facility:
-            data = st.session_state.parking_data[facility]
+            data = parking_data[facility]
             st.metric("Available Spots", f"{data['available']}/{data['total']}")
             
-            floor = st.selectbox("Select Floor", [f"Floor {i+1}" for i in range(data['floors'])])
+            floor = st.selectbox("Select Floor", ["Any Floor"] + [f"Floor {i+1}" for i in range(data['floors'])])
             
             spot_preference = st.radio("Spot Preference", 
                                       ["Closest to Entry", "Near Elevator", "Near Exit", "Any Available"])
             
-            if st.button("🎯 Assign Parking Spot", type="primary", use_container_width=True):
-                if data['available'] > 0:
-                    # Generate spots for selected floor
+            # One open session per user: a second claim would hold a spot
+            # that can never be exited, and re-occupy it on every restart
+            active = booking_store.active_session(st.session_state.user_id)
+            if active:
+                if not st.session_state.current_booking:
+                    st.session_state.current_booking = session_booking(active)
+                st.info(f"You are already parked at spot {active['spot']} ({active['facility']}, {active['floor']}). "
+                        "Exit from the Dashboard before parking again.")
+            elif st.button("🎯 Assign Parking Spot", type="primary", use_container_width=True):
+                # Claim the best available spot for the preference; the
+                # claim is atomic, so no other session can get it too.
+                # Spots pre-booked for the coming hour are held back.
+                preference_kind = PREFERENCE_POINTS.get(spot_preference)
+                assigned_facility, floor_num, assigned_idx = facility, None, -1
+                if floor != "Any Floor":
                     floor_num = int(floor.split()[1])
-                    spots = generate_parking_spots(facility, floor_num)
+                    if batch_assigner:
+                        with st.spinner("Matching you with the current wave of arrivals..."):
+                            assigned_idx = batch_assigner.submit(facility, floor_num, preference_kind).result(
+                                timeout=batch_assigner.window + 30)
+                    else:
+                        assigned_idx = claims.claim_best(facility, floor_num, preference_kind,
+                                                         exclude=reserved_soon(facility, floor_num))
+                
+                # Any floor, or the chosen floor is full: the best spot on
+                # any floor, then at the nearest facility with space
+                if assigned_idx < 0:
+                    found = spot_search.claim(facility, preference_kind, exclude=reserved_soon)
+                    if found:
+                        assigned_facility, assigned_floor_num, assigned_idx = found
+                        if floor_num is not None:
+                            moved_to = f"on Floor {assigned_floor_num}" if assigned_facility == facility else f"at {assigned_facility}"
+                            st.session_state.assignment_note = f"{floor} was full, so your spot is {moved_to}."
+                        elif assigned_facility != facility:
+                            st.session_state.assignment_note = f"{facility} is full, so your spot is at {assigned_facility}."
+                        floor_num = assigned_floor_num
+                sync_replica()
+                
+                if assigned_idx >= 0:
+                    assigned_floor = f"Floor {floor_num}"
+                    spots = inventory.floor(assigned_facility, floor_num)
+                    assigned = spots.spot(assigned_idx)
                     
-                    # Find best available spot based on preference
-                    available_spots = [s for s in spots if s['status'] == 'available']
+                    # Calculate route
+                    _, route_idx = inventory.route(assigned_facility, floor_num, assigned['id'])
+                    route_spot_ids = spots.ids[route_idx].tolist()
                     
-                    if available_spots:
-                        if spot_preference == "Closest to Entry":
-                            assigned = min(available_spots, key=lambda x: x['distance_to_entry'])
-                        else:
-                            assigned = random.choice(available_spots)
-                        
-                        # Calculate route
-                        entry_pos = (0, 2)  # Entry point
-                        spot_pos = (assigned['row'], assigned['col'])
-                        route = calculate_route(entry_pos, spot_pos)
-                        route_spot_ids = [s['id'] for s in spots if (s['row'], s['col']) in route]
-                        
-                        # Store booking
-                        st.session_state.current_booking = {
-                            'facility': facility,
-                            'floor': floor,
-                            'spot': assigned['id'],
-                            'entry_time': datetime.now().strftime("%I:%M %p"),
-                            'route': route_spot_ids
-                        }
-                        
-                        # Update availability
-                        st.session_state.parking_data[facility]['available'] -= 1
-                        
-                        st.success(f"✅ Spot {assigned['id']} assigned successfully!")
-                        st.rerun()
+                    # Store booking
+                    entry_time = datetime.now()
+                    session_id = booking_store.start_session(
+                        st.session_state.user_id, assigned_facility, assigned_floor, assigned['id'],
+                        entry_time.isoformat(timespec='seconds'), assigned['type']
+                    )
+                    st.session_state.current_booking = {
+                        'facility': assigned_facility,
+                        'floor': assigned_floor,
+                        'spot': assigned['id'],
+                        'entry_time': entry_time.strftime("%I:%M %p"),
+                        'route': route_spot_ids,
+                        'session_id': session_id,
+                        'relocated': assigned_facility != facility
+                    }
+                    
+                    st.success(f"✅ Spot {assigned['id']} assigned successfully!")
+                    st.rerun()
                 else:
-                    st.error("❌ No spots available at this facility")
+                    st.error("❌ No spots available at this facility or nearby")
     
     with col2:
         if st.session_state.current_booking:
             booking = st.session_state.current_booking
             
-            if booking['facility'] == facility:
+            # Also shown when the spot is at a nearby facility because the
+            # scanned one was full
+            if booking['facility'] == facility or booking.get('relocated'):
                 st.subheader("Step 2: Navigate to Your Spot")
+                note = st.session_state.pop('assignment_note', None)
+                if note:
+                    st.warning(note)
                 st.markdown(f"""
                 <div class="success-msg">
-                    Your Spot: {booking['spot']}
+                    Your Spot: {booking['spot']}{f" at {booking['facility']}" if booking.get('relocated') else ""}
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Show map with route
                 floor_num = int(booking['floor'].split()[1])
-                spots = generate_parking_spots(facility, floor_num)
-                
-                # Mark assigned spot
-                for spot in spots:
-                    if spot['id'] == booking['spot']:
-                        spot['status'] = 'assigned'
-                
-                fig = create_parking_map(spots, booking['spot'], booking.get('route', []))
-                st.plotly_chart(fig, use_container_width=True)
+                live_floor_map(booking['facility'], floor_num, booking['spot'])
                 
                 st.info("🧭 Follow the highlighted path to reach your spot")
                 
-                # Navigation instructions
+                # Navigation instructions, one step per ramp climbed
+                segments = inventory.facility_route(booking['facility'], floor_num, booking['spot'])
+                steps = ["Enter through main gate"]
+                for lower, cells in segments[:-1]:
+                    if len(cells):
+                        steps.append(f"On **Floor {lower}**, follow the lane {len(cells)} cells to the up ramp")
+                    else:
+                        steps.append(f"On **Floor {lower}**, take the up ramp beside the entry")
+                if len(segments[-1][1]):
+                    steps.append(f"On **{booking['floor']}**, follow the highlighted route {len(segments[-1][1])} cells")
+                else:
+                    steps.append(f"On **{booking['floor']}**, your spot is beside the entry")
+                steps.append(f"Park at spot **{booking['spot']}**")
                 st.markdown("### Turn-by-Turn Directions")
-                st.markdown(f"""
-                1. Enter through main gate
-                2. Proceed to **{booking['floor']}**
-                3. Follow the highlighted route
-                4. Park at spot **{booking['spot']}**
-                """)
+                st.markdown("\n".join(f"{n}. {step}" for n, step in enumerate(steps, 1)))
 
 # Pre-Book Parking
 elif page == "Pre-Book Parking":
@@ -442,13 +580,13 @@ elif page == "Pre-Book Parking":
     with col1:
         st.subheader("Booking Details")
         
-        facility = st.selectbox("Select Facility", list(st.session_state.parking_data.keys()))
+        facility = st.selectbox("Select Facility", list(parking_data.keys()))
         
         booking_date = st.date_input("Date", min_value=datetime.now().date())
         booking_time = st.time_input("Arrival Time")
         duration = st.slider("Duration (hours)", 1, 12, 2)
         
-        data = st.session_state.parking_data[facility]
+        data = parking_data[facility]
         floor = st.selectbox("Preferred Floor", [f"Floor {i+1}" for i in range(data['floors'])])
         
         st.subheader("Spot Preferences")
@@ -459,28 +597,35 @@ elif page == "Pre-Book Parking":
         
         if st.button("🎫 Confirm Booking", type="primary", use_container_width=True):
             floor_num = int(floor.split()[1])
-            spots = generate_parking_spots(facility, floor_num)
-            available_spots = [s for s in spots if s['status'] == 'available' and s['type'] == spot_type]
+            spots = inventory.floor(facility, floor_num)
+            location_kind = PREFERENCE_POINTS.get(location_pref)
+            
+            # Reserve a spot with no overlapping booking for the whole window
+            start = datetime.combine(booking_date, booking_time)
+            end = start + timedelta(hours=duration)
+            assigned_idx = calendar.reserve_best(facility, floor_num, start, end, location_kind, spot_type)
             
-            if not available_spots:
-                available_spots = [s for s in spots if s['status'] == 'available']
+            if assigned_idx < 0:
+                assigned_idx = calendar.reserve_best(facility, floor_num, start, end, location_kind)
             
-            if available_spots:
-                assigned = random.choice(available_spots)
+            if assigned_idx >= 0:
+                assigned = spots.spot(assigned_idx)
                 
                 booking = {
                     'facility': facility,
                     'floor': floor,
                     'spot': assigned['id'],
-                    'date': booking_date.strftime("%d %b %Y"),
+                    'date': booking_date.isoformat(),
                     'time': booking_time.strftime("%I:%M %p"),
                     'duration': duration,
-                    'type': spot_type,
-                    'status': 'Confirmed'
+                    'type': assigned['type'],
+                    'status': 'Confirmed',
+                    'start_ts': start.isoformat(timespec='seconds'),
+                    'end_ts': end.isoformat(timespec='seconds')
                 }
                 
-                st.session_state.bookings_history.append(booking)
-                st.success(f"✅ Booking confirmed for {booking['date']} at {booking['time']}")
+                booking_store.add_booking(st.session_state.user_id, booking)
+                st.success(f"✅ Booking confirmed for {booking_date.strftime('%d %b %Y')} at {booking['time']}")
                 st.balloons()
                 st.rerun()
             else:
@@ -502,11 +647,22 @@ elif page == "Pre-Book Parking":
         - Vehicle: {vehicle_size}
         """)
         
-        # Show facility map preview
+        # Expected availability at the chosen time from the occupancy history
         floor_num = int(floor.split()[1])
-        spots = generate_parking_spots(facility, floor_num)
-        fig = create_parking_map(spots)
-        st.plotly_chart(fig, use_container_width=True)
+        start = datetime.combine(booking_date, booking_time)
+        expected_free = forecaster.expected_free(facility, floor_num, start, duration)
+        reserved = int(calendar.busy_mask(facility, floor_num, start, start + timedelta(hours=duration)).sum())
+        if expected_free is None:
+            st.metric(f"Free on {floor} now", inventory.available(facility, floor_num),
+                      help="Not enough history yet to forecast this floor")
+        else:
+            st.metric(f"Expected free on {floor}", max(expected_free - reserved, 0),
+                      help=f"Typical free spots in the busiest hour of your stay, less {reserved} already reserved")
+        
+        # Show facility map preview
+        fig = floor_map(facility, floor_num)
+        with metrics.timer('plotly_chart'):
+            st.plotly_chart(fig, use_container_width=True)
 
 # My Bookings
 elif page == "My Bookings":
@@ -526,22 +682,70 @@ elif page == "My Bookings":
         
         st.markdown("---")
     
-    if st.session_state.bookings_history:
+    if booking_store.count_bookings(st.session_state.user_id):
         st.subheader("📅 Booking History")
         
-        for idx, booking in enumerate(reversed(st.session_state.bookings_history)):
-            with st.expander(f"Booking #{len(st.session_state.bookings_history) - idx} - {booking.get('date', 'Today')}"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write(f"**Facility:** {booking['facility']}")
-                    st.write(f"**Spot:** {booking['spot']}")
-                    st.write(f"**Floor:** {booking.get('floor', 'N/A')}")
-                
-                with col2:
-                    st.write(f"**Date:** {booking.get('date', 'Today')}")
-                    st.write(f"**Time:** {booking.get('time', booking.get('entry_time', 'N/A'))}")
-                    st.write(f"**Status:** {booking.get('status', 'Completed')}")
+        # Filters and paging are pushed down to indexed queries, so only
+        # one page of bookings is ever loaded and rendered
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            history_facility = st.selectbox("Facility", ["All"] + list(parking_data.keys()))
+        with col2:
+            history_status = st.selectbox("Status", ["All", "Confirmed", "Completed"])
+        with col3:
+            history_from = st.date_input("From", value=None)
+        with col4:
+            history_to = st.date_input("To", value=None)
+        with col5:
+            page_size = st.selectbox("Per Page", [10, 20, 50, 100], index=1)
+        
+        history_filters = {
+            'facility': None if history_facility == "All" else history_facility,
+            'status': None if history_status == "All" else history_status,
+            'date_from': history_from.isoformat() if history_from else None,
+            'date_to': history_to.isoformat() if history_to else None
+        }
+        total_bookings = booking_store.count_bookings(st.session_state.user_id, **history_filters)
+        total_pages = max(1, -(-total_bookings // page_size))
+        if st.session_state.get('history_page', 1) > total_pages:
+            st.session_state.history_page = total_pages
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            history_view = st.radio("View", ["Table", "Details"], horizontal=True)
+        with col2:
+            page_num = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages,
+                                       key='history_page')
+        
+        offset = (page_num - 1) * page_size
+        bookings = booking_store.list_bookings(st.session_state.user_id, limit=page_size, offset=offset,
+                                               **history_filters)
+        st.caption(f"Showing {offset + 1 if bookings else 0}-{offset + len(bookings)} of {total_bookings} bookings")
+        
+        if history_view == "Table":
+            import pandas as pd
+            with metrics.timer('history_dataframe'):
+                history_df = pd.DataFrame(bookings, columns=['date', 'time', 'entry_time', 'facility', 'floor', 'spot',
+                                                             'type', 'duration', 'status', 'fee'])
+                history_df['time'] = history_df['time'].fillna(history_df['entry_time'])
+                history_df = history_df.drop(columns='entry_time').rename(columns=str.title)
+            st.dataframe(history_df, use_container_width=True, hide_index=True)
+        else:
+            for idx, booking in enumerate(bookings):
+                with st.expander(f"Booking #{total_bookings - offset - idx} - {booking.get('date', 'Today')}"):
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        st.write(f"**Facility:** {booking['facility']}")
+                        st.write(f"**Spot:** {booking['spot']}")
+                        st.write(f"**Floor:** {booking.get('floor', 'N/A')}")
+                    
+                    with col2:
+                        st.write(f"**Date:** {booking.get('date', 'Today')}")
+                        st.write(f"**Time:** {booking.get('time', booking.get('entry_time', 'N/A'))}")
+                        st.write(f"**Status:** {booking.get('status', 'Completed')}")
+                        if 'fee' in booking:
+                            st.write(f"**Fee:** ₹{booking['fee']:.2f}")
     else:
         st.info("No booking history yet. Start parking or pre-book a spot!")
 
@@ -549,6 +753,7 @@ elif page == "My Bookings":
 elif page == "Logout":
     st.session_state.logged_in = False
     st.session_state.user_name = ""
+    st.session_state.user_id = None
     st.session_state.current_booking = None
     st.rerun()
 
@@ -560,3 +765,20 @@ st.markdown("""
     <p>🅿️ Making parking hassle-free across India</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Profiling panel: where this rerun's time went and rolling percentiles
+breakdown = metrics.finish_run(page)
+if breakdown:
+    with st.sidebar.expander("⏱️ Profiling"):
+        total = breakdown.pop('total')
+        st.markdown(f"**This rerun ({page}): {total * 1000:.1f} ms**\n\n" + "\n".join(
+            f"- {name}: {seconds * 1000:.1f} ms" for name, seconds in sorted(breakdown.items(), key=lambda kv: -kv[1])
+        ))
+        lookups = figure_cache.hits + figure_cache.misses
+        if lookups:
+            st.caption(f"Figure cache: {figure_cache.hits / lookups:.0%} hits ({figure_cache.hits}/{lookups})")
+        st.markdown("| Timer | Calls | p50 ms | p95 ms | p99 ms |\n|---|---:|---:|---:|---:|\n" + "\n".join(
+            f"| {name}{''.join(f' [{value}]' for _, value in labels)} | {stats['count']} | {stats['p50'] * 1000:.1f} "
+            f"| {stats['p95'] * 1000:.1f} | {stats['p99'] * 1000:.1f} |"
+            for (name, labels), stats in sorted(metrics.summary().items())
+        ))
@@ -0,0 +1,84 @@
+"""Monthly rebilling time for one facility
+
+Fills a temporary database with a month of completed sessions for one
+facility (mixed spot types, stays of 5 minutes to 10 hours) and their
+booking history rows, as BookingStore.end_session writes them, then times
+the reconciliation job: loading the month, recomputing every fee with the
+vectorized tariff engine and writing the fees back. The fee computation
+alone is also timed on the in-memory arrays. Run from the repository root:
+
+    python -m benchmarks.bench_billing --sessions 300000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from parking.billing import Tariffs, rebill
+from parking.storage import BookingStore
+
+FACILITY = 'DLF Cyber Hub - Gurgaon'
+
+
+def fill(store, sessions, month, seed):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(f"{month}-01T00:00", 's') + rng.integers(0, 30 * 86400, sessions) * np.timedelta64(1, 's')
+    end = start + rng.integers(5 * 60, 10 * 3600, sessions) * np.timedelta64(1, 's')
+    types = np.array(['Regular', 'EV Charging', 'Disabled'])[rng.choice(3, sessions, p=(0.6, 0.2, 0.2))]
+    user_id = store.upsert_user('0000000000', 'Bench', 'BENCH')
+    conn = store._conn()
+    with conn:
+        conn.executemany(
+            "INSERT INTO sessions (user_id, facility, floor, spot, entry_ts, exit_ts, status, spot_type) "
+            "VALUES (?, ?, 'Floor 1', '1A01', ?, ?, 'completed', ?)",
+            zip([user_id] * sessions, [FACILITY] * sessions, np.datetime_as_string(start).tolist(),
+                np.datetime_as_string(end).tolist(), types.tolist())
+        )
+        # The history row end_session adds for every completed session
+        history = []
+        for session_id, entry_ts, exit_ts, spot_type in conn.execute(
+                "SELECT id, entry_ts, exit_ts, spot_type FROM sessions WHERE user_id = ?", (user_id,)):
+            entry, exit_time = datetime.fromisoformat(entry_ts), datetime.fromisoformat(exit_ts)
+            history.append((user_id, session_id, FACILITY, entry.date().isoformat(), entry.strftime("%I:%M %p"),
+                            round((exit_time - entry).total_seconds() / 3600, 2), spot_type,
+                            entry.strftime("%I:%M %p"), exit_time.strftime("%I:%M %p"), entry_ts, exit_ts, exit_ts))
+        conn.executemany(
+            "INSERT INTO bookings (user_id, session_id, facility, floor, spot, date, time, duration, type, "
+            "status, entry_time, exit_time, start_ts, end_ts, created_at) "
+            "VALUES (?, ?, ?, 'Floor 1', '1A01', ?, ?, ?, ?, 'Completed', ?, ?, ?, ?, ?)",
+            history
+        )
+    return start, end, types
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=300000)
+    parser.add_argument('--month', default='2026-03')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    tariffs = Tariffs()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BookingStore(os.path.join(tmp, 'bench.db'))
+        start, end, types = fill(store, args.sessions, args.month, args.seed)
+
+        started = time.perf_counter()
+        fees = tariffs.fees(FACILITY, start, end, types)
+        compute_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        ids, _, rebilled = rebill(store, tariffs, FACILITY, args.month, write=True)
+        rebill_s = time.perf_counter() - started
+
+    print(f"fee computation: {args.sessions} sessions in {compute_s * 1000:.0f} ms "
+          f"({args.sessions / compute_s:.0f} sessions/s), total {fees.sum():.2f}")
+    print(f"rebill job (load, compute, write back): {len(ids)} sessions in {rebill_s:.2f}s, "
+          f"total {rebilled.sum():.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Concurrent claim/release load test against the shared InventoryStore
+
+Hundreds of threads repeatedly claim the best spot on one floor, hold it
+briefly and release it. Every successful claim is checked against a
+registry of currently held spots, so any double assignment is reported as a
+conflict. Run from the repository root:
+
+    python -m benchmarks.bench_claims --threads 200 --claims 200
+"""
+import argparse
+import threading
+import time
+
+from parking.inventory import InventoryStore
+
+
+def run(threads, claims_per_thread, spots, hold):
+    store = InventoryStore({'Load Test': {'total': spots, 'floors': 1}})
+    initial = store.available('Load Test', 1)
+    table = store.floor('Load Test', 1)
+    held = set()
+    held_lock = threading.Lock()
+    stats = {'claims': 0, 'full': 0, 'conflicts': 0}
+    start_gate = threading.Barrier(threads + 1)
+
+    def worker():
+        claims = full = conflicts = 0
+        start_gate.wait()
+        for _ in range(claims_per_thread):
+            idx = store.claim_best('Load Test', 1, 'entry')
+            if idx < 0:
+                full += 1
+                continue
+            spot_id = table.ids[idx]
+            with held_lock:
+                if spot_id in held:
+                    conflicts += 1
+                held.add(spot_id)
+            claims += 1
+            if hold:
+                time.sleep(hold)
+            with held_lock:
+                held.discard(spot_id)
+            if not store.release('Load Test', 1, spot_id):
+                conflicts += 1
+        with held_lock:
+            stats['claims'] += claims
+            stats['full'] += full
+            stats['conflicts'] += conflicts
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    stats['elapsed_s'] = elapsed
+    stats['claims_per_s'] = stats['claims'] / elapsed
+    stats['count_consistent'] = store.available('Load Test', 1) == initial == table.available_count()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=200)
+    parser.add_argument('--claims', type=int, default=200, help="claim attempts per thread")
+    parser.add_argument('--spots', type=int, default=1000)
+    parser.add_argument('--hold', type=float, default=0.0, help="seconds each claim is held")
+    args = parser.parse_args()
+
+    stats = run(args.threads, args.claims, args.spots, args.hold)
+    print(f"threads={args.threads} spots={args.spots} claims={stats['claims']} "
+          f"full={stats['full']} conflicts={stats['conflicts']}")
+    print(f"{stats['claims_per_s']:.0f} claims/s over {stats['elapsed_s']:.2f}s, "
+          f"counts consistent: {stats['count_consistent']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""Headless load test of the booking flows, with JSON results to compare across commits
+
+Simulated users drive the same calls the pages make, without a browser:
+login, Quick Park (claim with reservations held back, route, floor map with
+the route overlay, open session), Pre-Book (reserve a window, store the
+booking), history listing and exit (bill and close the session, free the
+spot). Each flow runs as a phase for every user on a pool of threads
+against a temporary database, and reports throughput, latency percentiles
+and peak RSS. Component timings for spot generation, map building and
+batch assignment at the chosen floor size are reported alongside.
+
+Results go to stdout or ``--out`` as JSON tagged with the git commit.
+``--compare`` checks them against an earlier file and exits non-zero when
+a throughput drops or a median latency grows by more than ``--tolerance``
+(tails are reported but too noisy under thread contention to gate on):
+
+    python -m benchmarks.bench_flows --users 2000 --out results.json
+    python -m benchmarks.bench_flows --users 2000 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from parking.assignment import assign_batch
+from parking.billing import Tariffs
+from parking.inventory import InventoryStore, generate_parking_spots
+from parking.metrics import Metrics
+from parking.rendering import create_parking_map
+from parking.reservations import ReservationCalendar
+from parking.storage import BookingStore
+
+PHASES = ['login', 'quick_park', 'pre_book', 'history', 'exit']
+# Results where a higher value is better; every other compared value is a latency
+HIGHER_IS_BETTER = {'throughput_per_s'}
+
+
+def facilities(count, floors, spots_per_floor):
+    return {f"Facility {i:03d}": {'total': floors * spots_per_floor, 'floors': floors} for i in range(count)}
+
+
+class Flows:
+    """The page handlers' calls for one simulated user at a time"""
+
+    def __init__(self, store, inventory, calendar, tariffs):
+        self.store = store
+        self.inventory = inventory
+        self.calendar = calendar
+        self.tariffs = tariffs
+        self.names = list(inventory.facilities)
+        self.users = {}
+
+    def place(self, user):
+        facility_name = self.names[user % len(self.names)]
+        floors = self.inventory.facilities[facility_name]['floors']
+        return facility_name, user // len(self.names) % floors + 1
+
+    def login(self, user):
+        user_id = self.store.upsert_user(f"9{user:09d}", f"User {user}", f"DL{user:06d}")
+        self.store.active_session(user_id)
+        self.users[user] = {'user_id': user_id}
+
+    def quick_park(self, user):
+        facility_name, floor_num = self.place(user)
+        now = datetime.now()
+        exclude = self.calendar.busy_mask(facility_name, floor_num, now, now + timedelta(hours=1))
+        idx = self.inventory.claim_best(facility_name, floor_num, 'entry', exclude=exclude)
+        if idx < 0:
+            return
+        spots = self.inventory.floor(facility_name, floor_num)
+        assigned = spots.spot(idx)
+        route_cells, route_idx = self.inventory.route(facility_name, floor_num, assigned['id'])
+        create_parking_map(spots, assigned['id'], spots.ids[route_idx].tolist(), route_cells=route_cells,
+                           points=self.inventory.router(facility_name, floor_num).points)
+        entry = now - timedelta(minutes=30 + user % 240)
+        session_id = self.store.start_session(self.users[user]['user_id'], facility_name, f"Floor {floor_num}",
+                                              assigned['id'], entry.isoformat(timespec='seconds'), assigned['type'])
+        self.users[user]['session'] = (facility_name, floor_num, assigned['id'], assigned['type'], entry, session_id)
+
+    def pre_book(self, user):
+        facility_name, floor_num = self.place(user)
+        start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1 + user % 7,
+                                                                                      hours=user % 12)
+        end = start + timedelta(hours=2)
+        idx = self.calendar.reserve_best(facility_name, floor_num, start, end, 'entry')
+        if idx < 0:
+            return
+        spot = self.inventory.floor(facility_name, floor_num).spot(idx)
+        self.store.add_booking(self.users[user]['user_id'], {
+            'facility': facility_name, 'floor': f"Floor {floor_num}", 'spot': spot['id'],
+            'date': start.date().isoformat(), 'time': start.strftime("%I:%M %p"), 'duration': 2,
+            'type': spot['type'], 'status': 'Confirmed',
+            'start_ts': start.isoformat(timespec='seconds'), 'end_ts': end.isoformat(timespec='seconds')
+        })
+
+    def history(self, user):
+        user_id = self.users[user]['user_id']
+        if self.store.count_bookings(user_id):
+            self.store.list_bookings(user_id, limit=20)
+
+    def exit(self, user):
+        session = self.users[user].pop('session', None)
+        if session is None:
+            return
+        facility_name, floor_num, spot_id, spot_type, entry, session_id = session
+        now = datetime.now()
+        fee = self.tariffs.fee(facility_name, entry, now, spot_type)
+        if self.store.end_session(session_id, now.isoformat(timespec='seconds'), fee):
+            self.inventory.release(facility_name, floor_num, spot_id)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def stats(summary, key, wall=None):
+    """Results for one timer; throughput is over ``wall`` seconds, or the time spent in the timer"""
+    timer = summary[key]
+    wall = wall or timer['total']
+    return {
+        'count': timer['count'],
+        'throughput_per_s': timer['count'] / wall,
+        'p50_ms': timer['p50'] * 1000,
+        'p95_ms': timer['p95'] * 1000,
+        'p99_ms': timer['p99'] * 1000,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def run_flows(args):
+    facility_map = facilities(args.facilities, args.floors, args.spots_per_floor)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        inventory = InventoryStore(facility_map, seed=args.seed)
+        flows = Flows(BookingStore(os.path.join(tmp, 'bench.db')), inventory, ReservationCalendar(inventory),
+                      Tariffs())
+        # Build every floor before timing, as a warm app process would have
+        inventory.facility_counts()
+        for phase in PHASES:
+            metrics = Metrics(window=None, enabled=True)
+            step = getattr(flows, phase)
+
+            def timed(user):
+                with metrics.timer(phase):
+                    step(user)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                list(pool.map(timed, range(args.users)))
+            results[phase] = stats(metrics.summary(), (phase, ()), time.perf_counter() - started)
+    return results
+
+
+def run_components(args):
+    """Single-thread timings of the functions the flows are most sensitive to"""
+    metrics = Metrics(window=None, enabled=True)
+    spots = generate_parking_spots('Bench', 1, args.spots_per_floor, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    route = spots.ids[spots.at([(0, c) for c in range(spots.cols)])].tolist()
+    arrivals = [(('entry', 'elevator', None)[i % 3], None) for i in range(min(64, len(spots)))]
+    for i in range(args.component_repeat):
+        with metrics.timer('generate_parking_spots'):
+            generate_parking_spots('Bench', 1 + i, args.spots_per_floor, seed=args.seed)
+        with metrics.timer('create_parking_map'):
+            create_parking_map(spots, route[-1], route)
+        with metrics.timer('assign_batch'):
+            assign_batch(spots, arrivals)
+        with metrics.timer('pick_available'):
+            spots.pick_available('entry', exclude=rng.random(len(spots)) < 0.1)
+    summary = metrics.summary()
+    return {name: stats(summary, (name, ())) for name, _ in summary}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Lines describing every result that got worse than the baseline by more than ``tolerance``
+
+    Latencies must also grow by at least ``min_delta_ms``, since the tails
+    of sub-millisecond calls move by more than any useful tolerance between
+    identical runs.
+    """
+    regressions = []
+    for section in ('flows', 'components'):
+        for name, values in current[section].items():
+            old = baseline.get(section, {}).get(name)
+            if old is None:
+                continue
+            for key in ('throughput_per_s', 'p50_ms'):
+                if key in HIGHER_IS_BETTER:
+                    worse = values[key] < old[key] * (1 - tolerance)
+                else:
+                    worse = values[key] > max(old[key] * (1 + tolerance), old[key] + min_delta_ms)
+                if worse:
+                    regressions.append(f"{section}.{name}.{key}: {old[key]:.3f} -> {values[key]:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8, help="worker threads driving users")
+    parser.add_argument('--facilities', type=int, default=8)
+    parser.add_argument('--floors', type=int, default=2)
+    parser.add_argument('--spots-per-floor', type=int, default=400)
+    parser.add_argument('--component-repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write the JSON results here instead of stdout")
+    parser.add_argument('--compare', help="earlier results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="latency growth always allowed")
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('out', 'compare', 'tolerance', 'min_delta_ms')},
+        'flows': run_flows(args),
+        'components': run_components(args)
+    }
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != results['params']:
+            print("warning: parameters differ from the baseline run", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
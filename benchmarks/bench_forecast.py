@@ -0,0 +1,72 @@
+"""Occupancy forecaster training and query time on a year of history
+
+Generates synthetic stays for every floor of the default facilities,
+busier on weekday working hours and weekend afternoons. Reports the time
+to fit them all, the time per expected-free query, and the rate of
+incremental updates. Run from the repository root:
+
+    python -m benchmarks.bench_forecast --stays-per-day 400
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from parking.forecast import OccupancyForecaster
+from parking.inventory import DEFAULT_FACILITIES, InventoryStore
+
+
+def history(days, stays_per_day, now, seed):
+    rng = np.random.default_rng(seed)
+    floors = [(name, f) for name, info in DEFAULT_FACILITIES.items() for f in range(1, info['floors'] + 1)]
+    n = days * stays_per_day
+    day = rng.integers(1, days + 1, n)
+    # Arrivals cluster around 10:00 and 18:00, stays last 1-6 hours
+    hour = np.where(rng.random(n) < 0.5, rng.normal(10, 2, n), rng.normal(18, 2, n)).clip(0, 23)
+    length = rng.uniform(1, 6, n)
+    origin = np.datetime64(now.replace(hour=0, minute=0, second=0, microsecond=0), 's')
+    start = origin - day * np.timedelta64(86400, 's') + (hour * 3600).astype(np.int64) * np.timedelta64(1, 's')
+    end = start + (length * 3600).astype(np.int64) * np.timedelta64(1, 's')
+    which = rng.integers(len(floors), size=n)
+    starts = np.datetime_as_string(start).tolist()
+    ends = np.datetime_as_string(end).tolist()
+    return [(*floors[w], s, e) for w, s, e in zip(which.tolist(), starts, ends)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--stays-per-day', type=int, default=400)
+    parser.add_argument('--queries', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    rows = history(args.days, args.stays_per_day, now, args.seed)
+    store = InventoryStore(DEFAULT_FACILITIES)
+    forecaster = OccupancyForecaster(store)
+
+    started = time.perf_counter()
+    forecaster.fit(rows, now=now)
+    fit_s = time.perf_counter() - started
+
+    facility = next(iter(DEFAULT_FACILITIES))
+    forecaster.expected_free(facility, 1, now, 2)
+    started = time.perf_counter()
+    for i in range(args.queries):
+        forecaster.expected_free(facility, 1, now + timedelta(hours=i % 168), 1 + i % 12)
+    query_us = (time.perf_counter() - started) / args.queries * 1e6
+
+    started = time.perf_counter()
+    for i in range(args.queries):
+        forecaster.observe(facility, 1, now - timedelta(hours=3), now - timedelta(hours=1))
+    observe_per_s = args.queries / (time.perf_counter() - started)
+
+    print(f"fit {len(rows)} stays over {args.days} days: {fit_s:.2f}s")
+    print(f"expected_free query: {query_us:.1f} us")
+    print(f"incremental observe: {observe_per_s:.0f} stays/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Replay a recorded occupancy event stream through the ingestion pipeline
+
+Without ``--replay`` a synthetic recording is written first: sensors on
+every spot of a facility flipping between available and occupied, with a
+share of events resent (duplicates) and delivered late (out of order).
+Events are then replayed from the JSONL file in micro-batches on one
+thread, parsing included, and the final inventory is checked against the
+newest event per spot. The inventory carries the listeners the app
+installs (occupancy aggregates, the live change feed and the occupancy
+forecaster), so every change pays for them as it would in the app;
+``--bare`` leaves them off. Run from the repository root:
+
+    python -m benchmarks.bench_ingest --events 500000
+    python -m benchmarks.bench_ingest --record events.jsonl --events 100000
+    python -m benchmarks.bench_ingest --replay events.jsonl
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from parking.aggregates import OccupancyAggregates
+from parking.forecast import OccupancyForecaster
+from parking.ingest import OccupancyIngestor
+from parking.inventory import STATUS_NAMES, InventoryStore
+from parking.live import ChangeFeed
+
+FACILITIES = {'Sensor Deck': {'total': 5000, 'floors': 5}}
+
+
+def record(path, events, duplicate_share, late_share, seed):
+    store = InventoryStore(FACILITIES)
+    rng = np.random.default_rng(seed)
+    ids = [store.floor('Sensor Deck', floor_num).ids for floor_num in range(1, 6)]
+    floor_nums = rng.integers(1, 6, events).tolist()
+    spots = rng.random(events).tolist()
+    statuses = rng.integers(2, size=events).tolist()
+    start = 1_700_000_000.0
+    rows = [
+        {'facility': 'Sensor Deck', 'floor': floor_num, 'spot': str(ids[floor_num - 1][int(u * len(ids[floor_num - 1]))]),
+         'status': STATUS_NAMES[status], 'ts': round(start + n * 0.001, 3)}
+        for n, (floor_num, u, status) in enumerate(zip(floor_nums, spots, statuses))
+    ]
+    # Delivery order: late events slip behind later ones, resends repeat an
+    # event verbatim a little after the original
+    order = np.arange(events, dtype=np.float64)
+    late = rng.random(events) < late_share
+    order[late] += rng.uniform(1, 100, np.count_nonzero(late))
+    resent = np.flatnonzero(rng.random(events) < duplicate_share)
+    order = np.r_[order, resent + rng.uniform(1, 50, len(resent))]
+    source = np.r_[np.arange(events), resent]
+    rows = [rows[n] for n in source[np.argsort(order, kind='stable')].tolist()]
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+    return len(rows)
+
+
+def attach_listeners(store):
+    """The inventory listeners the app installs"""
+    OccupancyAggregates(store)
+    ChangeFeed(store)
+    OccupancyForecaster(store).track()
+
+
+def replay(path, batch_size, bare=False):
+    store = InventoryStore(FACILITIES)
+    for floor_num in range(1, 6):
+        store.floor('Sensor Deck', floor_num)
+    if not bare:
+        attach_listeners(store)
+    ingestor = OccupancyIngestor(store, batch_size=batch_size)
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    started = time.perf_counter()
+    for start in range(0, len(lines), batch_size):
+        ingestor.apply_batch(lines[start:start + batch_size])
+    elapsed = time.perf_counter() - started
+
+    # Expected final state: the newest event per spot wins
+    newest = {}
+    for line in lines:
+        event = json.loads(line)
+        key = (event['floor'], event['spot'])
+        if key not in newest or event['ts'] > newest[key][0]:
+            newest[key] = (event['ts'], event['status'])
+    consistent = all(
+        STATUS_NAMES[store.floor('Sensor Deck', floor_num).status[store.floor('Sensor Deck', floor_num).index_of(spot)]]
+        == status
+        for (floor_num, spot), (_, status) in newest.items()
+    )
+    return ingestor.stats, elapsed, consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=500000)
+    parser.add_argument('--batch', type=int, default=5000, help="events per micro-batch")
+    parser.add_argument('--duplicates', type=float, default=0.05, help="share of events resent")
+    parser.add_argument('--late', type=float, default=0.05, help="share of events delivered out of order")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', help="write a recording to this file and exit")
+    parser.add_argument('--replay', help="replay this recording instead of a synthetic one")
+    parser.add_argument('--bare', action='store_true', help="replay without the app's inventory listeners")
+    args = parser.parse_args()
+
+    if args.record:
+        n = record(args.record, args.events, args.duplicates, args.late, args.seed)
+        print(f"wrote {n} events to {args.record}")
+        return
+
+    path = args.replay
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        record(path, args.events, args.duplicates, args.late, args.seed)
+    try:
+        stats, elapsed, consistent = replay(path, args.batch, args.bare)
+    finally:
+        if args.replay is None:
+            os.remove(path)
+    print(f"{stats['received']} events in {elapsed:.2f}s: {stats['received'] / elapsed:.0f} events/s "
+          f"({stats['batches']} batches of {args.batch})")
+    print(f"applied={stats['applied']} changed={stats['changed']} superseded={stats['superseded']} "
+          f"stale={stats['stale']} unknown={stats['unknown']} malformed={stats['malformed']}")
+    print(f"final state matches newest event per spot: {consistent}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Layout import, bundle compile and floor load times for many large facilities
+
+Writes a synthetic CSV of ``--facilities`` facilities with ``--floors``
+floors of about ``--spots`` spots each (rows of spots between drive lanes,
+pillars, an entry, ramp, exit and elevator), compiles it into a layout
+bundle, then times building every floor of every facility from the bundle
+against the same layouts loaded from a JSON layout file, which runs the
+lane searches on load. Spot distances and routes from both are checked to
+match. Run from the repository root:
+
+    python -m benchmarks.bench_layouts --facilities 30 --floors 4 --spots 1000
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from parking.inventory import SPOT_TYPES, InventoryStore
+from parking.layouts import LayoutBundle, compile_bundle, read_csv
+
+COLS = 40
+FIELDS = ['facility', 'floor', 'kind', 'row', 'col', 'id', 'type', 'status', 'direction', 'lat', 'lon']
+
+
+def floor_rows(spots):
+    """Rows of a floor: a lane row above every pair of spot rows, and one at the bottom"""
+    # Slack for the pillars
+    spot_rows = -(-spots * 21 // 20 // (COLS - 2)) + 1
+    return spot_rows + spot_rows // 2 + 2
+
+
+def write_csv(path, facilities, floors, spots, seed):
+    rng = np.random.default_rng(seed)
+    rows = floor_rows(spots)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        for i in range(facilities):
+            name = f"Facility {i:03d}"
+            writer.writerow({'facility': name, 'kind': 'facility', 'lat': 19 + i * 0.01, 'lon': 73 + i * 0.01})
+            for floor_num in range(1, floors + 1):
+                placed = 0
+                for row in range(rows):
+                    lane_row = row % 3 == 0 or row == rows - 1
+                    for col in range(COLS):
+                        cell = {'facility': name, 'floor': floor_num, 'row': row, 'col': col}
+                        if lane_row or col in (0, COLS - 1):
+                            writer.writerow({**cell, 'kind': 'lane'})
+                        elif rng.random() < 0.02:
+                            writer.writerow({**cell, 'kind': 'blocked'})
+                        elif placed < spots:
+                            writer.writerow({**cell, 'kind': 'spot', 'type': SPOT_TYPES[rng.choice(3, p=[.6, .2, .2])]})
+                            placed += 1
+                for kind, row, col in (('entry', 0, 1), ('ramp', 0, COLS - 2), ('exit', rows - 1, COLS // 2),
+                                       ('elevator', rows // 2, 0)):
+                    writer.writerow({'facility': name, 'floor': floor_num, 'kind': kind, 'row': row, 'col': col})
+
+
+def write_json_layouts(path, features):
+    """The same layouts as a PARKING_LAYOUT_FILE JSON file"""
+    layouts = {}
+    for name, facility in features.items():
+        layouts[name] = {
+            str(floor_num): {
+                'spots': floor['spots'],
+                'points': floor['points'],
+                'blocked': floor['blocked'],
+                'lanes': floor['lanes']
+            }
+            for floor_num, floor in facility['floors'].items()
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(layouts, f)
+
+
+def build_all(inventory):
+    started = time.perf_counter()
+    for name, info in inventory.facilities.items():
+        for floor_num in range(1, info['floors'] + 1):
+            inventory.floor(name, floor_num)
+    return time.perf_counter() - started
+
+
+def same_floors(a, b, facilities, floors):
+    for name in list(facilities)[:3]:
+        for floor_num in range(1, floors + 1):
+            table_a, table_b = a.floor(name, floor_num), b.floor(name, floor_num)
+            for kind in table_a.distances:
+                if not np.array_equal(table_a.distances[kind], table_b.distances[kind]):
+                    return False
+            spot_id = str(table_a.ids[-1])
+            if not np.array_equal(a.route(name, floor_num, spot_id)[0], b.route(name, floor_num, spot_id)[0]):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--facilities', type=int, default=30)
+    parser.add_argument('--floors', type=int, default=4)
+    parser.add_argument('--spots', type=int, default=1000, help="spots per floor")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'layouts.csv')
+        bundle_dir = os.path.join(tmp, 'bundle')
+        json_path = os.path.join(tmp, 'layouts.json')
+        write_csv(csv_path, args.facilities, args.floors, args.spots, args.seed)
+
+        started = time.perf_counter()
+        features = read_csv(csv_path)
+        read_s = time.perf_counter() - started
+        write_json_layouts(json_path, features)
+        started = time.perf_counter()
+        compile_bundle(features, bundle_dir)
+        compile_s = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(bundle_dir, name)) for name in os.listdir(bundle_dir))
+
+        started = time.perf_counter()
+        facilities = LayoutBundle(bundle_dir).facilities
+        bundled = InventoryStore(facilities, layout_path=bundle_dir)
+        open_s = time.perf_counter() - started
+        bundle_build_s = build_all(bundled)
+
+        started = time.perf_counter()
+        from_json = InventoryStore(facilities, layout_path=json_path)
+        json_open_s = time.perf_counter() - started
+        json_build_s = build_all(from_json)
+
+        spots = sum(info['total'] for info in facilities.values())
+        print(f"{args.facilities} facilities x {args.floors} floors, {spots} spots; "
+              f"read CSV {read_s:.2f}s, compile {compile_s:.2f}s, bundle {size / 2 ** 20:.1f} MiB")
+        print(f"{'source':<8} {'open ms':>9} {'build all ms':>13} {'per floor ms':>13}")
+        n_floors = args.facilities * args.floors
+        for source, open_time, build_time in (('bundle', open_s, bundle_build_s), ('json', json_open_s, json_build_s)):
+            print(f"{source:<8} {open_time * 1000:>9.1f} {build_time * 1000:>13.1f} {build_time / n_floors * 1000:>13.2f}")
+        print(f"same distances and routes: {same_floors(bundled, from_json, facilities, args.floors)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Per-call overhead of the instrumentation, disabled and enabled
+
+Times generate_parking_spots (a sub-millisecond timed function) called
+bare, through its timer with metrics disabled, and with metrics enabled,
+plus an empty ``timer()`` block in both states. Run from the repository
+root:
+
+    python -m benchmarks.bench_metrics --calls 20000
+"""
+import argparse
+import time
+
+from parking.inventory import generate_parking_spots
+from parking.metrics import METRICS
+
+
+def per_call(func, calls):
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return best / calls * 1e6
+
+
+def empty_timer():
+    with METRICS.timer('empty'):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    bare = generate_parking_spots.__wrapped__
+    results = {'bare': per_call(lambda: bare('Bench', 1), args.calls)}
+    METRICS.enabled = False
+    results['disabled'] = per_call(lambda: generate_parking_spots('Bench', 1), args.calls)
+    timer_off = per_call(empty_timer, args.calls)
+    METRICS.enabled = True
+    results['enabled'] = per_call(lambda: generate_parking_spots('Bench', 1), args.calls)
+    timer_on = per_call(empty_timer, args.calls)
+
+    print(f"{'generate_parking_spots':<24} {'us/call':>8} {'overhead us':>12}")
+    for name, us in results.items():
+        print(f"{name:<24} {us:>8.2f} {us - results['bare']:>12.2f}")
+    print(f"empty timer() block: {timer_off:.2f} us disabled, {timer_on:.2f} us enabled")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Compare single-trace and per-spot floor map rendering
+
+Run from the repository root:
+
+    python -m benchmarks.bench_render --sizes 40 1000 10000
+"""
+import argparse
+import time
+
+from parking.inventory import generate_parking_spots
+from parking.rendering import create_parking_map
+
+
+def bench(spots, mode, repeat):
+    """Best-of-N build and serialization time for one rendering mode"""
+    route = spots.ids[spots.at([(0, c) for c in range(spots.cols)])].tolist()
+    assigned = route[-1] if route else None
+    best_build = best_json = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = create_parking_map(spots, assigned, route, mode=mode)
+        built = time.perf_counter()
+        payload = fig.to_json()
+        done = time.perf_counter()
+        best_build = min(best_build, built - start)
+        best_json = min(best_json, done - built)
+    return {
+        'traces': len(fig.data),
+        'build_ms': best_build * 1000,
+        'json_ms': best_json * 1000,
+        'payload_kb': len(payload) / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[40, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Warm up plotly's lazily imported validators before timing anything
+    create_parking_map(generate_parking_spots('Benchmark', 1, 40), mode='per_spot').to_json()
+
+    print(f"{'spots':>7} {'mode':>9} {'traces':>7} {'build ms':>10} {'json ms':>10} {'payload KB':>11}")
+    for size in args.sizes:
+        spots = generate_parking_spots('Benchmark', 1, size)
+        for mode in ('single', 'per_spot'):
+            r = bench(spots, mode, args.repeat)
+            print(f"{size:>7} {mode:>9} {r['traces']:>7} {r['build_ms']:>10.1f} {r['json_ms']:>10.1f} {r['payload_kb']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
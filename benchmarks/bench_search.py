@@ -0,0 +1,79 @@
+"""Facility-wide best-spot search time on large facilities
+
+Builds one facility of ``--spots`` spots over ``--floors`` floors and times
+"best available spot anywhere in the facility" through SpotSearch (one
+preference-heap peek per floor) against a full vectorized scan of every
+floor, for several preferences and types, then the time per facility-wide
+claim while the facility fills up. Run from the repository root:
+
+    python -m benchmarks.bench_search --spots 5000 --floors 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from parking.inventory import SPOT_TYPES, InventoryStore, type_code
+from parking.search import SpotSearch
+
+FACILITY = 'Bench Facility'
+QUERIES = [('entry', None), ('elevator', None), ('exit', 'EV Charging'), ('entry', 'Disabled')]
+
+
+def scan_best(inventory, kind, spot_type):
+    """Reference answer: every floor's spots, masked and costed with NumPy"""
+    router = inventory.facility_router(FACILITY)
+    best = None
+    for floor_num in range(1, inventory.facilities[FACILITY]['floors'] + 1):
+        table = inventory.floor(FACILITY, floor_num)
+        mask = table.status == 0
+        if spot_type is not None:
+            mask &= table.type == type_code(spot_type)
+        if not mask.any():
+            continue
+        cost = router.arrival(floor_num) + np.where(mask, table.distances[kind].astype(np.int64), np.iinfo(np.int32).max)
+        idx = int(np.argmin(cost))
+        if best is None or cost[idx] < best[2]:
+            best = (floor_num, idx, int(cost[idx]))
+    return best
+
+
+def per_call_us(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--spots', type=int, default=5000)
+    parser.add_argument('--floors', type=int, default=10)
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    inventory = InventoryStore({FACILITY: {'total': args.spots, 'floors': args.floors}})
+    search = SpotSearch(inventory)
+    inventory.facility_counts()
+    inventory.facility_router(FACILITY)
+
+    print(f"{args.spots} spots on {args.floors} floors, {inventory.available(FACILITY)} available")
+    print(f"{'preference':<12} {'type':<12} {'search us':>10} {'scan us':>10}  same cost")
+    for kind, spot_type in QUERIES:
+        found = search.best(FACILITY, kind, spot_type)
+        reference = scan_best(inventory, kind, spot_type)
+        search_us = per_call_us(lambda: search.best(FACILITY, kind, spot_type), args.calls)
+        scan_us = per_call_us(lambda: scan_best(inventory, kind, spot_type), max(args.calls // 20, 1))
+        same = (found and found[2]) == (reference and reference[2])
+        print(f"{kind:<12} {spot_type or 'any':<12} {search_us:>10.1f} {scan_us:>10.1f}  {same}")
+
+    claimed = 0
+    started = time.perf_counter()
+    while search.claim(FACILITY, 'entry', SPOT_TYPES[0], nearby=False):
+        claimed += 1
+    elapsed = time.perf_counter() - started
+    print(f"claim until full: {claimed} claims, {elapsed / max(claimed, 1) * 1e6:.1f} us per claim")
+
+
+if __name__ == '__main__':
+    main()
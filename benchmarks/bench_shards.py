@@ -0,0 +1,95 @@
+"""Claim throughput of the sharded inventory as shard workers are added
+
+Starts N shard worker processes owning a set of synthetic facilities, then
+a fixed pool of client processes that claim and release spots on random
+facilities through ShardedInventory as fast as they can. Throughput should
+grow with the shard count until the machine runs out of cores. Run from the
+repository root:
+
+    python -m benchmarks.bench_shards --shards 1 2 4 8 --clients 8
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from parking.inventory import InventoryStore
+from parking.sharding import ShardedInventory, start_shards
+
+
+def facilities(count, spots):
+    return {f"Facility {i:03d}": {'total': spots, 'floors': 2} for i in range(count)}
+
+
+def client(socket_dir, n_shards, facility_map, ops, seed, start_at, results, authkey):
+    inventory = ShardedInventory(facility_map, socket_dir, n_shards, authkey)
+    # Same seeded layouts as the shards, to turn claimed indices into ids
+    replica = InventoryStore(facility_map)
+    names = list(facility_map)
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(names), size=ops)
+    floors = rng.integers(1, 3, size=ops)
+    # Open connections and build the replica up front so setup is not timed
+    for name in names:
+        inventory.available(name, 1)
+        replica.floor(name, 1)
+        replica.floor(name, 2)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    claims = 0
+    started = time.perf_counter()
+    for pick, floor_num in zip(picks.tolist(), floors.tolist()):
+        idx = inventory.claim_best(names[pick], floor_num, 'entry')
+        if idx >= 0:
+            claims += 1
+            inventory.release(names[pick], floor_num, replica.floor(names[pick], floor_num).ids[idx])
+    results.put((claims, ops * 2, time.perf_counter() - started))
+
+
+def run(n_shards, n_clients, ops, n_facilities, spots):
+    facility_map = facilities(n_facilities, spots)
+    context = multiprocessing.get_context('spawn')
+    authkey = os.urandom(32)
+    with tempfile.TemporaryDirectory() as socket_dir:
+        shards = start_shards(n_shards, socket_dir, facility_map, authkey=authkey)
+        # Build every floor before timing
+        warm = ShardedInventory(facility_map, socket_dir, n_shards, authkey)
+        warm.facility_counts()
+        results = context.Queue()
+        start_at = time.time() + 5.0
+        clients = [context.Process(target=client,
+                                   args=(socket_dir, n_shards, facility_map, ops, seed, start_at, results, authkey))
+                   for seed in range(n_clients)]
+        for process in clients:
+            process.start()
+        outcomes = [results.get() for _ in clients]
+        for process in clients:
+            process.join()
+        for process in shards:
+            process.terminate()
+    calls = sum(o[1] for o in outcomes)
+    elapsed = max(o[2] for o in outcomes)
+    return sum(o[0] for o in outcomes), calls / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8, help="client processes")
+    parser.add_argument('--ops', type=int, default=5000, help="claims per client")
+    parser.add_argument('--facilities', type=int, default=64)
+    parser.add_argument('--spots', type=int, default=400, help="spots per facility")
+    args = parser.parse_args()
+
+    print(f"{multiprocessing.cpu_count()} cores, {args.clients} clients, {args.facilities} facilities")
+    print(f"{'shards':>6} {'claims':>8} {'calls/s':>10}")
+    for n_shards in args.shards:
+        claims, rate = run(n_shards, args.clients, args.ops, args.facilities, args.spots)
+        print(f"{n_shards:>6} {claims:>8} {rate:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Cold-start import time and first render time for each page of the app
+
+Every page is rendered in a fresh Python process with Streamlit's AppTest
+against an empty temporary database, as a newly started container would
+serve it. For each page the benchmark reports the time spent importing
+modules while the page's script ran, the time to its first complete render,
+and whether pandas, plotly's figure classes and the map rendering were
+loaded. About is only reachable from the Login page, so its process renders
+Login first: its imports are counted from the cold start and its render
+time is the switch to About.
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PAGES = ['Login', 'About', 'Dashboard', 'Quick Park (QR Scan)', 'Pre-Book Parking', 'My Bookings']
+# Dashboard redirect actions that open each logged-in page on first render
+ACTIONS = {'Quick Park (QR Scan)': 'quick_park', 'Pre-Book Parking': 'pre_book', 'My Bookings': 'my_bookings'}
+# Streamlit itself imports plotly.graph_objects, which loads its figure
+# classes lazily, so a page that builds no chart leaves plotly.graph_objs._figure
+# and the rendering module unloaded
+HEAVY_MODULES = ['pandas', 'plotly.express', 'plotly.graph_objs._figure', 'parking.rendering']
+MARKER = '-- page run --'
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def render(page):
+    """Child process: render one page and print its timings as JSON"""
+    from streamlit.testing.v1 import AppTest
+
+    from parking.storage import BookingStore
+
+    at = AppTest.from_file(APP, default_timeout=120)
+    if page not in ('Login', 'About'):
+        at.session_state.logged_in = True
+        at.session_state.user_name = 'Bench'
+        at.session_state.user_id = BookingStore(os.environ['PARKING_DB_PATH']).upsert_user('0', 'Bench', 'BENCH')
+        at.session_state.dashboard_action = ACTIONS.get(page)
+    print(MARKER, file=sys.stderr, flush=True)
+    if page == 'About':
+        at.run()
+        at.sidebar.radio[0].set_value('About')
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise SystemExit(f"{page} failed: {at.exception}")
+    print(json.dumps({'first_render_s': elapsed, 'loaded': [m for m in HEAVY_MODULES if m in sys.modules]}))
+
+
+def import_seconds(stderr):
+    """Total time of top-level imports logged by -X importtime after the marker"""
+    total = 0
+    seen = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            seen = True
+        elif seen and line.startswith('import time:'):
+            _, cumulative, name = line.split('|')
+            # Nested imports are indented and already counted by their parent
+            if cumulative.strip().isdigit() and not name.startswith('  '):
+                total += int(cumulative)
+    return total / 1e6
+
+
+def measure(page):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PARKING_DB_PATH=os.path.join(tmp, 'bench.db'))
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'benchmarks.bench_startup', '--page', page],
+                                env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(result.stderr[-2000:])
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return import_seconds(result.stderr), timings['first_render_s'], timings['loaded']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="cold starts per page; the best is reported")
+    parser.add_argument('--page', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.page:
+        render(args.page)
+        return
+    print(f"{'page':<22} {'imports ms':>10} {'first render ms':>15}  loaded")
+    for page in PAGES:
+        runs = [measure(page) for _ in range(args.repeat)]
+        imports = min(r[0] for r in runs)
+        first_render = min(r[1] for r in runs)
+        label = 'About (after Login)' if page == 'About' else page
+        print(f"{label:<22} {imports * 1000:>10.0f} {first_render * 1000:>15.0f}  {', '.join(runs[0][2]) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
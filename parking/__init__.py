@@ -0,0 +1 @@
+"""Core parking logic shared by the Streamlit app and offline tools"""
@@ -0,0 +1,106 @@
+"""Materialized occupancy totals kept in step with the inventory
+
+The Dashboard and About pages only need counts: spots and available spots
+globally, per facility, per floor and per spot type. These are computed
+once from the SpotTables and then adjusted by one on every status change,
+so reading them never touches the spot arrays.
+"""
+import threading
+
+import numpy as np
+
+from .inventory import SPOT_TYPES, STATUS_AVAILABLE
+
+
+class OccupancyAggregates:
+    """Per-type total and available counts at floor, facility and global level
+
+    Counts are indexed by spot type code: fixed totals are int64 arrays,
+    and available counts are lists of ints, which the per-change listener
+    adjusts several times faster than array elements. ``version`` is bumped
+    on every change, and ``cached`` memoizes views derived from the counts
+    (tables, chart frames) until the next one.
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.version = 0
+        self._lock = threading.Lock()
+        self._cache = {}
+        n_types = len(SPOT_TYPES)
+        self.total = np.zeros(n_types, dtype=np.int64)
+        self.available = [0] * n_types
+        self.facility_total = {}
+        self.facility_available = {}
+        self.floor_total = {}
+        self.floor_available = {}
+        # Type column of each floor, looked up on every change
+        self._types = {}
+        with self._lock:
+            inventory.add_listener(self._on_change)
+            for facility_name, info in inventory.facilities.items():
+                self.facility_total[facility_name] = np.zeros(n_types, dtype=np.int64)
+                self.facility_available[facility_name] = [0] * n_types
+                for floor_num in range(1, info['floors'] + 1):
+                    self._add_floor(facility_name, floor_num)
+
+    def _add_floor(self, facility_name, floor_num):
+        table = self.inventory.floor(facility_name, floor_num)
+        n_types = len(SPOT_TYPES)
+        total = np.bincount(table.type, minlength=n_types).astype(np.int64)
+        available = np.bincount(table.type[table.status == STATUS_AVAILABLE], minlength=n_types).tolist()
+        self._types[(facility_name, floor_num)] = table.type
+        self.floor_total[(facility_name, floor_num)] = total
+        self.floor_available[(facility_name, floor_num)] = available
+        self.facility_total[facility_name] += total
+        self.total += total
+        for code, count in enumerate(available):
+            self.facility_available[facility_name][code] += count
+            self.available[code] += count
+
+    def _on_change(self, facility_name, floor_num, idx, old, new):
+        if (old == STATUS_AVAILABLE) == (new == STATUS_AVAILABLE):
+            return
+        code = int(self._types[(facility_name, floor_num)][idx])
+        step = 1 if new == STATUS_AVAILABLE else -1
+        with self._lock:
+            self.floor_available[(facility_name, floor_num)][code] += step
+            self.facility_available[facility_name][code] += step
+            self.available[code] += step
+            self.version += 1
+
+    def cached(self, name, build):
+        """Value of ``build()`` memoized until the counts next change"""
+        version = self.version
+        hit = self._cache.get(name)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        value = build()
+        self._cache[name] = (version, value)
+        return value
+
+    def facility_counts(self):
+        """{facility: {'total', 'available', 'floors'}} as of the current version"""
+        def build():
+            with self._lock:
+                return {
+                    facility_name: {
+                        'total': int(self.facility_total[facility_name].sum()),
+                        'available': sum(self.facility_available[facility_name]),
+                        'floors': info['floors']
+                    }
+                    for facility_name, info in self.inventory.facilities.items()
+                }
+        return self.cached('facility_counts', build)
+
+    def type_counts(self, facility_name=None):
+        """{spot type: (total, available)} for one facility or every facility"""
+        with self._lock:
+            total = self.total if facility_name is None else self.facility_total[facility_name]
+            available = self.available if facility_name is None else self.facility_available[facility_name]
+            return {name: (int(total[code]), int(available[code])) for code, name in enumerate(SPOT_TYPES)}
+
+    def totals(self):
+        """(facilities, spots, available spots) across the whole network"""
+        with self._lock:
+            return len(self.facility_total), int(self.total.sum()), sum(self.available)
@@ -0,0 +1,256 @@
+"""Batch spot assignment for arrival surges
+
+Greedy Quick Park gives every car the closest free spot, so a burst of cars
+at one entrance all queue into the same aisle. Here arrivals collected over
+a short window are matched to spots together, minimizing each car's
+preference distance plus a congestion cost that grows with the number of
+cars in the batch sent down the same aisle.
+"""
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+import numpy as np
+
+from .inventory import STATUS_AVAILABLE, type_code
+
+# Cost of an arrival/spot pair that must never be matched (type mismatch,
+# spot taken). Kept finite so the solver's potentials stay well defined.
+INFEASIBLE = 1e9
+
+# Extra cost for each car of the batch already sent down the same aisle
+CONGESTION_WEIGHT = 2.0
+
+
+def linear_sum_assignment(cost):
+    """Min-cost matching of rows to distinct columns
+
+    Shortest augmenting path form of the Hungarian algorithm with the inner
+    loop over columns vectorized. Requires rows <= columns. Returns
+    (rows, cols) index arrays like scipy.optimize.linear_sum_assignment.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("cost matrix needs at least as many columns as rows")
+    # 1-based potentials and matching, column 0 is the virtual start
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.intp)
+    way = np.zeros(m + 1, dtype=np.intp)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(match[1:])
+    rows = match[1:][cols] - 1
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def congested_assignment(cost, groups, weight):
+    """Min-cost matching of rows to distinct columns with a load cost per column group
+
+    The k-th row matched into a group (counting from 0) costs ``weight * k``
+    on top of its own cost, so a group taking L rows adds
+    ``weight * L * (L - 1) / 2``. Solved exactly as a min-cost flow from
+    rows through columns and groups by successive shortest paths, with
+    Bellman-Ford rounds vectorized over the cost matrix since moving a row
+    to another column has negative residual cost. Pairs costing INFEASIBLE
+    or more are never matched; rows are left unmatched once no column is
+    reachable. Returns (rows, cols) index arrays sorted by row.
+    """
+    cost = np.where(np.asarray(cost, dtype=np.float64) < INFEASIBLE, cost, np.inf)
+    n, m = cost.shape
+    _, groups = np.unique(groups, return_inverse=True)
+    n_groups = int(groups.max()) + 1 if m else 0
+    rows_all, cols_all = np.arange(n), np.arange(m)
+    own = np.full(n, -1, dtype=np.intp)
+    user = np.full(m, -1, dtype=np.intp)
+    load = np.zeros(n_groups)
+
+    for _ in range(n):
+        # Distances from the unmatched rows; a column remembers the row it
+        # was reached from, or -1 when reached back from its group
+        d_row = np.where(own < 0, 0.0, np.inf)
+        d_col = np.full(m, np.inf)
+        from_row = np.full(m, -1, dtype=np.intp)
+        d_group = np.full(n_groups, np.inf)
+        via_col = np.full(n_groups, -1, dtype=np.intp)
+        matched = np.flatnonzero(own >= 0)
+        for _ in range(n + m + n_groups):
+            via = d_row[:, None] + cost
+            via[matched, own[matched]] = np.inf
+            best = np.argmin(via, axis=0)
+            new = np.minimum(via[best, cols_all], np.where(user >= 0, d_group[groups], np.inf))
+            better = new < d_col - 1e-9
+            if not better.any():
+                break
+            d_col[better] = new[better]
+            from_row[better] = np.where(via[best, cols_all] <= new, best, -1)[better]
+            d_row[matched] = np.minimum(d_row[matched], d_col[own[matched]] - cost[matched, own[matched]])
+            # Free columns lead into their group
+            free = np.where(user < 0, d_col, np.inf)
+            order = np.lexsort((free, groups))
+            first = order[np.r_[True, groups[order][1:] != groups[order][:-1]]]
+            # Only strict improvements, so ties cannot close a cycle of predecessors
+            improved = first[free[first] < d_group[groups[first]] - 1e-9]
+            d_group[groups[improved]] = free[improved]
+            via_col[groups[improved]] = improved
+
+        total = d_group + weight * load
+        if not n_groups or not np.isfinite(total.min()):
+            break
+        group = int(np.argmin(total))
+        col = via_col[group]
+        # Walk the path back, moving each row on it into its new column
+        while True:
+            row = from_row[col]
+            prev = own[row]
+            own[row], user[col] = col, row
+            if prev < 0:
+                break
+            user[prev] = -1
+            col = prev if from_row[prev] >= 0 else via_col[groups[prev]]
+        load[group] += 1
+
+    rows = rows_all[own >= 0]
+    return rows, own[rows]
+
+
+def assign_batch(table, arrivals, congestion_weight=CONGESTION_WEIGHT, exclude=None):
+    """Spot index for each arrival on one floor, or -1 where none fits
+
+    ``arrivals`` is a list of (kind, spot_type) pairs; kind None means any
+    location and spot_type None any type. Only currently available spots
+    outside the optional ``exclude`` mask are considered. Does not change
+    the table.
+    """
+    n = len(arrivals)
+    mask = table.status == STATUS_AVAILABLE
+    if exclude is not None:
+        mask &= ~exclude
+    available = np.flatnonzero(mask)
+    if not n or not len(available):
+        return np.full(n, -1, dtype=np.intp)
+
+    entry = table.distances.get('entry', table.distance_to_entry)
+    cost = np.empty((n, len(available)))
+    for i, (kind, spot_type) in enumerate(arrivals):
+        distance = table.distances.get(kind, entry) if kind else np.zeros(len(table))
+        cost[i] = distance[available]
+        if spot_type is not None:
+            cost[i, table.type[available] != type_code(spot_type)] = INFEASIBLE
+
+    # Each car only ever needs one of its n cheapest spots in an aisle: any
+    # other spot there can be swapped for one of those that no other car
+    # took without changing the aisle's load. Aisles are the layout's columns.
+    aisles = table.col[available] if congestion_weight else np.zeros(len(available), dtype=np.intp)
+    keep = []
+    for aisle in np.unique(aisles):
+        members = np.flatnonzero(aisles == aisle)
+        if len(members) > n:
+            members = members[np.unique(np.argpartition(cost[:, members], n - 1, axis=1)[:, :n])]
+        keep.append(members)
+    keep = np.sort(np.concatenate(keep))
+    cost, available, aisles = cost[:, keep], available[keep], aisles[keep]
+
+    result = np.full(n, -1, dtype=np.intp)
+    if congestion_weight:
+        rows, cols = congested_assignment(cost, aisles, congestion_weight)
+        result[rows] = available[cols]
+        return result
+    if cost.shape[1] < n:
+        # More cars than spots: pad with dummy spots every car can take
+        cost = np.hstack([cost, np.full((n, n - cost.shape[1]), INFEASIBLE / 2)])
+    rows, cols = linear_sum_assignment(cost)
+    matched = (cols < len(available)) & (cost[rows, cols] < INFEASIBLE / 2)
+    result[rows[matched]] = available[cols[matched]]
+    return result
+
+
+class BatchAssigner:
+    """Collects Quick Park arrivals for a short window and assigns them together
+
+    ``submit`` returns a Future that resolves to the claimed spot index (or
+    -1). A background thread flushes the pending arrivals of every floor
+    once per window. ``exclude`` is an optional callable returning a mask of
+    spots to hold back on a (facility, floor).
+    """
+
+    def __init__(self, inventory, window=2.0, congestion_weight=CONGESTION_WEIGHT, exclude=None):
+        self.inventory = inventory
+        self.window = window
+        self.congestion_weight = congestion_weight
+        self.exclude = exclude
+        self.assigned = 0
+        self.batches = 0
+        self.solve_seconds = 0.0
+        self._pending = defaultdict(list)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='batch-assigner', daemon=True)
+        self._thread.start()
+
+    def submit(self, facility_name, floor_num, kind=None, spot_type=None):
+        future = Future()
+        with self._lock:
+            self._pending[(facility_name, floor_num)].append((kind, spot_type, future))
+        return future
+
+    def _run(self):
+        while True:
+            time.sleep(self.window)
+            self.flush()
+
+    def flush(self):
+        """Assign and claim every pending arrival now"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(list)
+        for (facility_name, floor_num), requests in pending.items():
+            started = time.perf_counter()
+            table = self.inventory.floor(facility_name, floor_num)
+            exclude = self.exclude(facility_name, floor_num) if self.exclude else None
+            spots = assign_batch(table, [(kind, spot_type) for kind, spot_type, _ in requests],
+                                 self.congestion_weight, exclude)
+            for (kind, spot_type, future), idx in zip(requests, spots):
+                # Another session may have claimed the spot since the solve
+                if idx < 0 or not self.inventory.claim(facility_name, floor_num, table.ids[idx]):
+                    idx = self.inventory.claim_best(facility_name, floor_num, kind, spot_type, exclude)
+                future.set_result(int(idx))
+                self.assigned += idx >= 0
+            self.batches += 1
+            self.solve_seconds += time.perf_counter() - started
+
+    def stats(self):
+        """Assignments made and their throughput while solving"""
+        return {
+            'assigned': self.assigned,
+            'batches': self.batches,
+            'assignments_per_s': self.assigned / self.solve_seconds if self.solve_seconds else 0.0
+        }
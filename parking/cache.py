@@ -0,0 +1,45 @@
+"""Built figures shared across sessions
+
+Kept apart from the rendering module so pages that only read the cache do
+not import plotly.
+"""
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """Bounded LRU of built figures shared across sessions
+
+    Keys should include everything the figure depends on, typically
+    (facility, floor, inventory version, assigned spot, route), so a stale
+    entry is never returned and old versions simply age out.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Cached value for key, calling build() on a miss"""
+        with self._lock:
+            fig = self._entries.get(key)
+            if fig is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+
+        # Build outside the lock so one slow floor doesn't block the others
+        fig = build()
+        with self._lock:
+            self._entries[key] = fig
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return fig
+
+    def __len__(self):
+        return len(self._entries)
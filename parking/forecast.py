@@ -0,0 +1,234 @@
+"""Hour-of-week occupancy forecasts per facility floor
+
+Every stay (a completed parking session, a past reservation, or a spot
+occupied and released in the live inventory) is spread over the clock hours
+it covers. The occupied spot-hours are then summed into 168 hour-of-week
+buckets per floor. Dividing by the number of times each bucket has been
+observed gives the typical number of occupied spots at that hour, and the
+expected free spots for a future window is the floor's capacity minus the
+busiest hour in it.
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .inventory import STATUS_AVAILABLE
+
+HOURS_PER_WEEK = 168
+# Live stays waiting to be folded into the curves before the listener folds
+# them itself, so a process nobody queries still stays bounded
+FOLD_BATCH = 10000
+
+# A Monday midnight, so hour offsets from it fold directly into hour-of-week
+_WEEK_ORIGIN = np.datetime64('2024-01-01T00:00', 's')
+_HOUR = np.timedelta64(3600, 's')
+
+
+def to_hours(times):
+    """Hours since the week origin for datetimes or ISO strings, as floats"""
+    return (np.asarray(times, dtype='datetime64[s]') - _WEEK_ORIGIN) / _HOUR
+
+
+def hourly_occupancy(start, end, n_hours):
+    """Occupied spot-hours in each of ``n_hours`` clock hours for [start, end) intervals
+
+    ``start`` and ``end`` are float hour offsets in [0, n_hours]. Whole hours
+    come from a difference array; the partial first and last hour of each
+    interval are corrected by their fractions.
+    """
+    first = np.floor(start).astype(np.intp)
+    last = np.floor(end).astype(np.intp)
+    size = n_hours + 1
+    occupied = np.cumsum(np.bincount(first, minlength=size) - np.bincount(last, minlength=size)).astype(np.float64)
+    occupied -= np.bincount(first, weights=start - first, minlength=size)
+    occupied += np.bincount(last, weights=end - last, minlength=size)
+    return occupied[:n_hours]
+
+
+def hour_of_week_buckets(key_idx, start, end, n_floors, origin, n_hours):
+    """Occupied spot-hours per hour-of-week bucket for each floor, as (n_floors, 168)
+
+    ``start`` and ``end`` are hour offsets from the whole hour ``origin``,
+    clipped to [0, n_hours], and ``key_idx`` numbers each stay's floor. One
+    flat series per floor is laid end to end, so every floor's hourly
+    occupancy comes from one ``hourly_occupancy`` call.
+    """
+    offsets = key_idx * (n_hours + 1)
+    series = hourly_occupancy(start + offsets, end + offsets, n_floors * (n_hours + 1))
+    series = series.reshape(n_floors, n_hours + 1)[:, :n_hours]
+    buckets = np.arange(n_floors)[:, None] * HOURS_PER_WEEK + (origin + np.arange(n_hours)) % HOURS_PER_WEEK
+    occupied = np.bincount(buckets.ravel(), weights=series.ravel(), minlength=n_floors * HOURS_PER_WEEK)
+    return occupied.reshape(n_floors, HOURS_PER_WEEK)
+
+
+class OccupancyForecaster:
+    """Hour-of-week occupancy curves per (facility, floor)
+
+    ``fit`` trains from stored history in one vectorized pass. ``observe``
+    and the inventory listener installed by ``track`` only record stays;
+    they are folded into the curves in vectorized batches on the next query
+    or every ``FOLD_BATCH`` stays, since the listener runs under the
+    inventory's floor lock for every status change. Expected free counts
+    are cached per floor and only recomputed after new data, so
+    ``expected_free`` is a slice and a max.
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self._occupied = {}
+        self._observed = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+        self._first_hour = None
+        self._last_hour = None
+        self._curves = {}
+        # (facility, floor, spot index) -> hour the spot was taken
+        self._since = {}
+        # (facility, floor, start hour, end hour) stays not folded in yet
+        self._pending = []
+        self._clock_offset = self._local_offset()
+        self._lock = threading.Lock()
+
+    def _advance(self, until_hour):
+        """Count every clock hour up to ``until_hour`` as observed once"""
+        until_hour = int(until_hour)
+        if self._first_hour is None:
+            self._first_hour = self._last_hour = until_hour
+            return
+        if until_hour > self._last_hour:
+            self._observed += np.bincount(np.arange(self._last_hour, until_hour) % HOURS_PER_WEEK,
+                                          minlength=HOURS_PER_WEEK)
+            self._last_hour = until_hour
+            self._curves.clear()
+
+    def fit(self, rows, now=None):
+        """Train from (facility, floor number, start, end) stays, replacing any earlier data"""
+        now_hour = float(to_hours([now or datetime.now()])[0])
+        # Number the floors in one pass over the rows
+        floors, key_idx, starts, ends = {}, [], [], []
+        facilities = self.inventory.facilities
+        for facility_name, floor_num, start, end in rows:
+            if facility_name in facilities:
+                key_idx.append(floors.setdefault((facility_name, floor_num), len(floors)))
+                starts.append(start)
+                ends.append(end)
+        with self._lock:
+            self._pending.clear()
+            self._occupied = {}
+            self._observed[:] = 0
+            self._first_hour = self._last_hour = None
+            self._curves.clear()
+            if not starts:
+                self._advance(np.floor(now_hour))
+                return
+
+            start = to_hours(starts)
+            end = np.minimum(to_hours(ends), now_hour)
+            valid = end > start
+            origin = int(np.floor(start[valid].min())) if valid.any() else int(np.floor(now_hour))
+            n_hours = int(np.floor(now_hour)) - origin
+            self._first_hour = self._last_hour = origin
+            self._advance(origin + n_hours)
+            if not valid.any() or n_hours <= 0:
+                return
+
+            key_idx = np.array(key_idx, dtype=np.intp)[valid]
+            start, end = start[valid] - origin, np.minimum(end[valid] - origin, n_hours)
+            occupied = hour_of_week_buckets(key_idx, start, end, len(floors), origin, n_hours)
+            for key, i in floors.items():
+                self._occupied[key] = occupied[i]
+
+    @staticmethod
+    def _local_offset():
+        """Hours to add to time.time() / 3600 for local wall-clock hours since the week origin"""
+        return float(to_hours([datetime.now()])[0]) - time.time() / 3600
+
+    def _now_hour(self):
+        return time.time() / 3600 + self._clock_offset
+
+    def observe(self, facility_name, floor_num, start, end):
+        """Add one finished stay"""
+        start_hour, end_hour = to_hours([start, end])
+        self._pending.append((facility_name, floor_num, float(start_hour), float(end_hour)))
+
+    def _fold(self):
+        """Add the recorded stays to the curves; caller holds the lock"""
+        # Stays appended meanwhile land after the first n and stay queued
+        n = len(self._pending)
+        if not n:
+            return
+        stays = self._pending[:n]
+        del self._pending[:n]
+        floors = {}
+        key_idx = np.array([floors.setdefault((f, floor_num), len(floors)) for f, floor_num, _, _ in stays],
+                           dtype=np.intp)
+        start = np.array([stay[2] for stay in stays])
+        end = np.array([stay[3] for stay in stays])
+        # Follow daylight saving changes for the stays recorded from now on
+        self._clock_offset = self._local_offset()
+        valid = end > start
+        if not valid.any():
+            return
+        key_idx, start, end = key_idx[valid], start[valid], end[valid]
+
+        origin = int(np.floor(start.min()))
+        n_hours = int(np.floor(end.max())) - origin + 1
+        if self._first_hour is None:
+            self._first_hour = self._last_hour = origin
+        self._advance(origin + n_hours - 1)
+        occupied = hour_of_week_buckets(key_idx, start - origin, end - origin, len(floors), origin, n_hours)
+        keys = list(floors)
+        for i in np.unique(key_idx).tolist():
+            key = keys[i]
+            if key not in self._occupied:
+                self._occupied[key] = np.zeros(HOURS_PER_WEEK)
+            self._occupied[key] += occupied[i]
+            self._curves.pop(key, None)
+
+    def track(self):
+        """Learn from live claims and releases as they happen"""
+        self.inventory.add_listener(self._on_change)
+
+    def _on_change(self, facility_name, floor_num, idx, old, new):
+        # Called under the floor's lock, which also orders the changes to
+        # one spot, so recording a stay needs no lock of its own
+        key = (facility_name, floor_num, idx)
+        if new != STATUS_AVAILABLE:
+            self._since[key] = self._now_hour()
+            return
+        since = self._since.pop(key, None)
+        if since is None:
+            return
+        self._pending.append((facility_name, floor_num, since, self._now_hour()))
+        if len(self._pending) >= FOLD_BATCH and self._lock.acquire(blocking=False):
+            try:
+                self._fold()
+            finally:
+                self._lock.release()
+
+    def curve(self, facility_name, floor_num):
+        """Expected occupied spots per hour-of-week bucket, or None without history"""
+        key = (facility_name, floor_num)
+        now_hour = np.floor(to_hours([datetime.now()])[0])
+        with self._lock:
+            self._fold()
+            if self._last_hour is not None:
+                self._advance(now_hour)
+            curve = self._curves.get(key)
+            if curve is None:
+                occupied = self._occupied.get(key)
+                if occupied is None or not self._observed.any():
+                    return None
+                curve = occupied / np.maximum(self._observed, 1)
+                self._curves[key] = curve
+        return curve
+
+    def expected_free(self, facility_name, floor_num, start, hours):
+        """Expected free spots over a stay: capacity minus the busiest hour, or None"""
+        curve = self.curve(facility_name, floor_num)
+        if curve is None:
+            return None
+        first = int(np.floor(to_hours([start])[0]))
+        buckets = np.arange(first, first + max(int(np.ceil(hours)), 1)) % HOURS_PER_WEEK
+        capacity = len(self.inventory.floor(facility_name, floor_num))
+        return max(capacity - int(round(float(curve[buckets].max()))), 0)
@@ -0,0 +1,187 @@
+"""Occupancy events from ground sensors and gates, applied to the inventory
+
+Sensors report ``{"facility", "floor", "spot", "status", "ts"}`` events
+(``ts`` in epoch seconds or ISO format) as JSON lines. Sources (a tailed
+file, a TCP socket or any code calling ``submit``) only enqueue them. One
+background thread drains the queue in micro-batches and applies each
+floor's events in a single locked pass.
+
+Sensors resend and networks reorder, so every spot remembers the timestamp
+of the last event applied to it. Within a batch only the newest event per
+spot counts, and an event no newer than the remembered one is dropped.
+"""
+import json
+import queue
+import socketserver
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from .inventory import STATUS_NAMES
+
+_STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+
+def event_ms(ts):
+    """Epoch milliseconds for an epoch-seconds number or ISO timestamp"""
+    if isinstance(ts, str):
+        return int(datetime.fromisoformat(ts).timestamp() * 1000)
+    return int(ts * 1000)
+
+
+class OccupancyIngestor:
+    """Micro-batched, order-tolerant event application to an InventoryStore
+
+    A batch is flushed when it reaches ``batch_size`` events or ``max_delay``
+    seconds after its first event, whichever comes first.
+    """
+
+    def __init__(self, inventory, batch_size=5000, max_delay=0.05):
+        self.inventory = inventory
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.stats = {'received': 0, 'applied': 0, 'changed': 0, 'stale': 0, 'superseded': 0,
+                      'unknown': 0, 'malformed': 0, 'batches': 0}
+        self._queue = queue.Queue()
+        self._last_ms = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def submit(self, event):
+        """Enqueue one event, as a dict or a JSON line"""
+        self._queue.put(event)
+
+    def start(self):
+        """Apply queued events on a daemon thread until ``stop``"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='occupancy-ingest', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.max_delay)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.apply_batch(batch)
+
+    def apply_batch(self, events):
+        """Apply a list of events (dicts or JSON lines) now; returns spots changed"""
+        stats = self.stats
+        floors = defaultdict(lambda: ([], [], []))
+        for event in events:
+            try:
+                if not isinstance(event, dict):
+                    event = json.loads(event)
+                key = (event['facility'], int(event['floor']))
+                spot_id, code, stamp = event['spot'], _STATUS_CODES[event['status']], event_ms(event['ts'])
+            except (ValueError, KeyError, TypeError, OverflowError):
+                stats['malformed'] += 1
+                continue
+            spot_ids, codes, stamps = floors[key]
+            spot_ids.append(spot_id)
+            codes.append(code)
+            stamps.append(stamp)
+        stats['received'] += len(events)
+        stats['batches'] += 1
+
+        changed = 0
+        facilities = self.inventory.facilities
+        for (facility_name, floor_num), (spot_ids, codes, stamps) in floors.items():
+            if facility_name not in facilities or not 1 <= floor_num <= facilities[facility_name]['floors']:
+                stats['unknown'] += len(spot_ids)
+                continue
+            changed += self._apply_floor(facility_name, floor_num, spot_ids, codes, stamps)
+        stats['changed'] += changed
+        return changed
+
+    def _apply_floor(self, facility_name, floor_num, spot_ids, codes, stamps):
+        stats = self.stats
+        table = self.inventory.floor(facility_name, floor_num)
+        last_ms = self._last_ms.get((facility_name, floor_num))
+        if last_ms is None:
+            last_ms = self._last_ms.setdefault((facility_name, floor_num), np.full(len(table), -1, dtype=np.int64))
+
+        index_of = table.index_of
+        idx = np.fromiter((index_of(spot_id) for spot_id in spot_ids), dtype=np.intp, count=len(spot_ids))
+        codes = np.asarray(codes, dtype=np.int8)
+        stamps = np.asarray(stamps, dtype=np.int64)
+        known = idx >= 0
+        stats['unknown'] += int(len(idx) - np.count_nonzero(known))
+        idx, codes, stamps = idx[known], codes[known], stamps[known]
+        if not len(idx):
+            return 0
+
+        # Newest event per spot: sort by (spot, ts) and keep each run's last
+        order = np.lexsort((stamps, idx))
+        idx, codes, stamps = idx[order], codes[order], stamps[order]
+        last = np.r_[idx[1:] != idx[:-1], True]
+        stats['superseded'] += int(len(idx) - np.count_nonzero(last))
+        idx, codes, stamps = idx[last], codes[last], stamps[last]
+
+        newer = stamps > last_ms[idx]
+        stats['stale'] += int(len(idx) - np.count_nonzero(newer))
+        idx, codes = idx[newer], codes[newer]
+        last_ms[idx] = stamps[newer]
+        stats['applied'] += len(idx)
+        return self.inventory.apply_statuses(facility_name, floor_num, idx, codes)
+
+
+def tail_jsonl(path, ingestor, poll=0.2, from_start=True, stop=None):
+    """Feed lines appended to a JSONL file into the ingestor; runs until ``stop`` is set
+
+    Meant to run on its own thread. Partial lines are held until their
+    newline arrives.
+    """
+    stop = stop or threading.Event()
+    with open(path, 'r', encoding='utf-8') as f:
+        if not from_start:
+            f.seek(0, 2)
+        pending = ''
+        while not stop.is_set():
+            chunk = f.readline()
+            if not chunk:
+                time.sleep(poll)
+                continue
+            pending += chunk
+            if pending.endswith('\n'):
+                if pending.strip():
+                    ingestor.submit(pending)
+                pending = ''
+
+
+class _EventHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.server.ingestor.submit(line)
+
+
+def serve_tcp(ingestor, host='127.0.0.1', port=0):
+    """Accept newline-delimited JSON events over TCP on a daemon thread
+
+    Returns the server; ``server.server_address`` has the bound port and
+    ``server.shutdown()`` stops it.
+    """
+    server = socketserver.ThreadingTCPServer((host, port), _EventHandler)
+    server.daemon_threads = True
+    server.ingestor = ingestor
+    threading.Thread(target=server.serve_forever, name='occupancy-tcp', daemon=True).start()
+    return server
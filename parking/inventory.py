@@ -0,0 +1,570 @@
+"""Facility and floor spot inventory shared by every session in the process"""
+import heapq
+import json
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from .metrics import METRICS
+from .routing import UNREACHABLE, FacilityRouter, FloorGraph, FloorRouter
+
+FLOOR_COLS = 5
+
+# Status and type columns are stored as small integer codes
+STATUS_AVAILABLE = 0
+STATUS_OCCUPIED = 1
+STATUS_NAMES = ('available', 'occupied')
+SPOT_TYPES = ('Regular', 'EV Charging', 'Disabled')
+SPOT_TYPE_WEIGHTS = (0.6, 0.2, 0.2)
+
+# Spot preference labels used by the UI -> point of interest kind
+PREFERENCE_POINTS = {
+    'Closest to Entry': 'entry',
+    'Near Entrance': 'entry',
+    'Near Elevator': 'elevator',
+    'Near Exit': 'exit'
+}
+
+_FAR = np.iinfo(np.int32).max
+_rng = np.random.default_rng()
+
+# Facility capacities and (latitude, longitude) locations; live availability
+# comes from the InventoryStore
+DEFAULT_FACILITIES = {
+    'Select Mall - Saket': {'total': 120, 'floors': 3, 'location': (28.5286, 77.2190)},
+    'DLF Cyber Hub - Gurgaon': {'total': 200, 'floors': 4, 'location': (28.4950, 77.0890)},
+    'Phoenix Market City - Mumbai': {'total': 350, 'floors': 5, 'location': (19.0866, 72.8890)},
+    'Forum Mall - Bangalore': {'total': 180, 'floors': 3, 'location': (12.9345, 77.6112)}
+}
+
+
+def _row_label(row):
+    """Spreadsheet-style row label: A..Z, AA, AB, ..."""
+    label = ""
+    row += 1
+    while row:
+        row, rem = divmod(row - 1, 26)
+        label = chr(65 + rem) + label
+    return label
+
+
+def _floor_seed(facility_name, floor_num, seed):
+    return zlib.crc32(f"{seed}:{facility_name}:{floor_num}".encode())
+
+
+def type_code(spot_type):
+    """Integer code for a spot type name"""
+    return SPOT_TYPES.index(spot_type)
+
+
+class PreferenceIndex:
+    """Heaps of available spots ordered by distance, per preference and type
+
+    There is one heap per (point kind, type code) plus one per kind across
+    all types (type code None). Claims are handled lazily: spots that are no
+    longer available are discarded when they reach the top. Releases push
+    the spot back, so "best spot for preference X" is a heap peek.
+    """
+
+    def __init__(self, status, spot_type, distances):
+        self._status = status
+        self._type = spot_type
+        self._distances = distances
+        self._heaps = {}
+        self.rebuild()
+
+    def rebuild(self):
+        """Rebuild every heap from the current status column"""
+        available = np.flatnonzero(self._status == STATUS_AVAILABLE)
+        for kind, distance in self._distances.items():
+            for code in (None,) + tuple(range(len(SPOT_TYPES))):
+                idx = available if code is None else available[self._type[available] == code]
+                order = idx[np.argsort(distance[idx], kind='stable')]
+                # An ascending list already satisfies the heap invariant
+                self._heaps[(kind, code)] = list(zip(distance[order].tolist(), order.tolist()))
+        self._pushes = 0
+
+    def best(self, kind, code=None):
+        """Index of the closest available spot, or -1"""
+        heap = self._heaps[(kind, code)]
+        status = self._status
+        while heap and status[heap[0][1]] != STATUS_AVAILABLE:
+            heapq.heappop(heap)
+        return heap[0][1] if heap else -1
+
+    def push(self, idx):
+        """Record that a spot became available"""
+        code = int(self._type[idx])
+        for kind, distance in self._distances.items():
+            entry = (int(distance[idx]), idx)
+            heapq.heappush(self._heaps[(kind, None)], entry)
+            heapq.heappush(self._heaps[(kind, code)], entry)
+        # Repeated claim/release cycles leave stale duplicates behind
+        self._pushes += 1
+        if self._pushes > len(self._status):
+            self.rebuild()
+
+
+class SpotTable:
+    """Columnar spot storage for one floor
+
+    One NumPy array per attribute instead of one dict per spot, so filters
+    and "closest available of type T" are single vectorized passes.
+    """
+
+    def __init__(self, ids, row, col, spot_type, status, distance_to_entry):
+        self.ids = np.asarray(ids, dtype=str)
+        self.row = np.asarray(row, dtype=np.int16)
+        self.col = np.asarray(col, dtype=np.int16)
+        self.type = np.asarray(spot_type, dtype=np.int8)
+        self.status = np.asarray(status, dtype=np.int8)
+        self.distance_to_entry = np.asarray(distance_to_entry, dtype=np.int32)
+        self.rows = int(self.row.max()) + 1 if len(self.row) else 0
+        self.cols = int(self.col.max()) + 1 if len(self.col) else 0
+        self._positions = {spot_id: i for i, spot_id in enumerate(self.ids.tolist())}
+        # Grid lookup from (row, col) to spot index, -1 where there is no spot
+        self._cells = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        self._cells[self.row, self.col] = np.arange(len(self.ids), dtype=np.int32)
+        self.distances = {'entry': self.distance_to_entry}
+        self._index = None
+
+    @classmethod
+    def from_records(cls, spots):
+        """Build a table from a list of spot dicts"""
+        return cls(
+            [s['id'] for s in spots],
+            [s['row'] for s in spots],
+            [s['col'] for s in spots],
+            [type_code(s['type']) for s in spots],
+            [STATUS_NAMES.index(s['status']) for s in spots],
+            [s['distance_to_entry'] for s in spots]
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index_of(self, spot_id):
+        """Row index of a spot id, or -1 if unknown"""
+        return self._positions.get(spot_id, -1)
+
+    def at(self, cells):
+        """Spot indices at the given (row, col) cells, skipping cells with no spot"""
+        cells = np.asarray(cells, dtype=np.intp).reshape(-1, 2)
+        rows, cols = cells[:, 0], cells[:, 1]
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        found = self._cells[rows[inside], cols[inside]]
+        return found[found >= 0]
+
+    def available_mask(self, spot_type=None):
+        """Boolean mask of available spots, optionally of one type"""
+        mask = self.status == STATUS_AVAILABLE
+        if spot_type is not None:
+            mask &= self.type == type_code(spot_type)
+        return mask
+
+    def available_count(self):
+        return int(np.count_nonzero(self.status == STATUS_AVAILABLE))
+
+    def set_distances(self, distances):
+        """Install per-kind distance arrays and build the preference index"""
+        self.distances = {kind: np.asarray(d, dtype=np.int32) for kind, d in distances.items()}
+        if 'entry' in self.distances:
+            self.distance_to_entry = self.distances['entry']
+        self._index = PreferenceIndex(self.status, self.type, self.distances)
+
+    def set_status(self, idx, code):
+        """Change one spot's status code, keeping the index in step"""
+        self.status[idx] = code
+        if code == STATUS_AVAILABLE and self._index is not None:
+            self._index.push(idx)
+
+    def best_available(self, kind='entry', spot_type=None):
+        """Index of the available spot closest to a point kind, or -1"""
+        code = None if spot_type is None else type_code(spot_type)
+        if self._index is not None and kind in self.distances:
+            return self._index.best(kind, code)
+        return self.closest_available(spot_type, self.distances.get(kind))
+
+    def pick_available(self, kind=None, spot_type=None, exclude=None):
+        """Best spot for a point kind, or a random one when kind is None
+
+        ``exclude`` is an optional boolean mask of spots to skip, such as
+        those reserved for the next hour.
+        """
+        if exclude is not None and exclude.any():
+            return self.pick_free(self.available_mask() & ~exclude, kind, spot_type)
+        if kind is None:
+            return self.random_available(spot_type)
+        return self.best_available(kind, spot_type)
+
+    def pick_free(self, mask, kind=None, spot_type=None):
+        """Best spot among a candidate mask, regardless of current status"""
+        if spot_type is not None:
+            mask = mask & (self.type == type_code(spot_type))
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return -1
+        if kind is None:
+            return int(candidates[_rng.integers(len(candidates))])
+        distance = self.distances.get(kind, self.distance_to_entry)
+        return int(candidates[np.argmin(distance[candidates])])
+
+    def closest_available(self, spot_type=None, distance=None):
+        """Index of the available spot with the lowest distance, or -1"""
+        if distance is None:
+            distance = self.distance_to_entry
+        mask = self.available_mask(spot_type)
+        if not mask.any():
+            return -1
+        return int(np.argmin(np.where(mask, distance, _FAR)))
+
+    def random_available(self, spot_type=None, rng=None):
+        """Index of a uniformly chosen available spot, or -1"""
+        candidates = np.flatnonzero(self.available_mask(spot_type))
+        if not len(candidates):
+            return -1
+        return int(candidates[(rng or _rng).integers(len(candidates))])
+
+    def spot(self, idx):
+        """Single spot as a dict, for display"""
+        return {
+            'id': str(self.ids[idx]),
+            'row': int(self.row[idx]),
+            'col': int(self.col[idx]),
+            'status': STATUS_NAMES[self.status[idx]],
+            'type': SPOT_TYPES[self.type[idx]],
+            'distance_to_entry': int(self.distance_to_entry[idx])
+        }
+
+    def to_records(self):
+        """All spots as a list of dicts"""
+        return [self.spot(i) for i in range(len(self))]
+
+
+@METRICS.timed('generate_parking_spots')
+def generate_parking_spots(facility_name, floor_num, total_spots=40, seed=0):
+    """Generate a deterministic parking spot layout for a floor"""
+    rng = np.random.default_rng(_floor_seed(facility_name, floor_num, seed))
+    spot_num = np.arange(total_spots)
+    row, col = np.divmod(spot_num, FLOOR_COLS)
+    entry_col = FLOOR_COLS // 2
+
+    status = rng.choice([STATUS_AVAILABLE, STATUS_OCCUPIED], size=total_spots)
+    status[rng.random(total_spots) < 0.7] = STATUS_AVAILABLE  # 70% chance of being available for demo
+    spot_type = rng.choice(len(SPOT_TYPES), size=total_spots, p=SPOT_TYPE_WEIGHTS)
+    ids = [f"{floor_num}{_row_label(r)}{n + 1:02d}" for r, n in zip(row.tolist(), spot_num.tolist())]
+
+    return SpotTable(
+        ids, row, col, spot_type, status,
+        np.abs(row) + np.abs(col - entry_col)  # Manhattan distance from entry
+    )
+
+
+def default_points(rows, cols):
+    """Points of interest for a generated floor
+
+    The street entry (or, above the ground floor, the ramp landing) sits at
+    the top of the middle aisle, and the ramp up starts from the same spot.
+    The exit is at the far end of that aisle and the elevator halfway down
+    the left wall.
+    """
+    return {
+        'entry': [(0, cols // 2)],
+        'ramp': [(0, cols // 2)],
+        'exit': [(max(rows - 1, 0), cols // 2)],
+        'elevator': [(rows // 2, 0)]
+    }
+
+
+def floor_routing(table, layout):
+    """FloorRouter for a floor plus each point kind's lane distance to every spot
+
+    ``layout`` has the floor's ``points`` and optionally ``blocked``,
+    ``lanes``, ``one_way_cols`` and ``one_way_rows``, as in a layout file.
+    """
+    # The grid covers the spots and every point, lane and blocked cell
+    cells = [np.asarray(cells, dtype=np.intp).reshape(-1, 2) for cells in layout['points'].values()]
+    cells += [np.asarray(layout.get(key) or (), dtype=np.intp).reshape(-1, 2) for key in ('blocked', 'lanes')]
+    extent = np.concatenate(cells).max(axis=0, initial=-1) + 1
+    graph = FloorGraph(
+        max(table.rows, int(extent[0])),
+        max(table.cols, int(extent[1])),
+        blocked=layout.get('blocked'),
+        lanes=layout.get('lanes'),
+        one_way_cols=layout.get('one_way_cols'),
+        one_way_rows=layout.get('one_way_rows')
+    )
+    router = FloorRouter(graph, layout['points'])
+
+    # Distances along the lanes from each kind of point, replacing the
+    # straight-line estimate
+    cells = graph.cell(table.row.astype(np.intp), table.col.astype(np.intp))
+    distances = {}
+    for kind in router.kinds():
+        if kind != 'ramp':
+            distance = router.distance(kind)[cells]
+            distances[kind] = np.where(distance == UNREACHABLE, _FAR, distance)
+    return router, distances
+
+
+def load_layout_file(path):
+    """Load fixed spot layouts from a JSON file
+
+    The file maps facility name -> floor number -> floor. A floor is either
+    a list of spots, each with at least ``id``, ``row`` and ``col`` (missing
+    ``type`` defaults to Regular and ``status`` to available), or an object
+    with that list under ``spots`` plus optional routing keys: ``points``
+    (kind -> list of [row, col]), ``blocked`` and ``lanes`` cell lists and
+    ``one_way_cols``/``one_way_rows`` (aisle -> +1/-1).
+    """
+    with open(path) as f:
+        raw = json.load(f)
+
+    layouts = {}
+    for facility_name, floors in raw.items():
+        for floor_num, floor in floors.items():
+            if isinstance(floor, list):
+                floor = {'spots': floor}
+            spots = SpotTable.from_records([
+                {
+                    'id': str(s['id']),
+                    'row': int(s['row']),
+                    'col': int(s['col']),
+                    'status': s.get('status', 'available'),
+                    'type': s.get('type', 'Regular'),
+                    'distance_to_entry': 0
+                }
+                for s in floor['spots']
+            ])
+            layouts[(facility_name, int(floor_num))] = {
+                'spots': spots,
+                'points': floor.get('points') or default_points(spots.rows, spots.cols),
+                'blocked': [tuple(cell) for cell in floor.get('blocked', ())],
+                'lanes': [tuple(cell) for cell in floor['lanes']] if 'lanes' in floor else None,
+                'one_way_cols': {int(k): v for k, v in floor.get('one_way_cols', {}).items()},
+                'one_way_rows': {int(k): v for k, v in floor.get('one_way_rows', {}).items()}
+            }
+    return layouts
+
+
+def open_layouts(path):
+    """Fixed layouts from a JSON layout file or a compiled bundle directory"""
+    if os.path.isdir(path):
+        from .layouts import LayoutBundle
+        return LayoutBundle(path)
+    return load_layout_file(path)
+
+
+def layout_facilities(path):
+    """Facilities of the compiled bundle at ``path``, else DEFAULT_FACILITIES"""
+    if path and os.path.isdir(path):
+        from .layouts import LayoutBundle
+        return LayoutBundle(path).facilities
+    return DEFAULT_FACILITIES
+
+
+class InventoryStore:
+    """Process-wide spot inventory, built once per (facility, floor)
+
+    Floors are built lazily on first access, either from a layout file or by
+    seeded generation, and then mutated in place on claim/release. Each
+    floor carries a version number that is bumped on every change so callers
+    can cache derived views, and a FloorRouter whose distance fields are
+    computed once alongside the spots.
+
+    Every status change happens under that floor's lock, so concurrent
+    sessions never see a half-applied update and a spot can only be claimed
+    by one of them. Listeners registered with ``add_listener`` are called
+    under that lock with (facility, floor, spot index, old code, new code)
+    after each change.
+    """
+
+    def __init__(self, facilities, layout_path=None, seed=0):
+        self.facilities = facilities
+        self.seed = seed
+        self._layouts = open_layouts(layout_path) if layout_path else {}
+        self._floors = {}
+        self._routers = {}
+        self._facility_routers = {}
+        self._versions = {}
+        self._available = {}
+        self._floor_locks = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @METRICS.timed('build_floor')
+    def _build_floor(self, facility_name, floor_num):
+        layout = self._layouts.get((facility_name, floor_num))
+        if layout is not None and 'fields' in layout:
+            # Compiled bundle: spot distances and routes were computed at
+            # import, and the arrays are read-only views of the bundle files
+            table = SpotTable(layout['ids'], layout['row'], layout['col'], layout['type'], np.array(layout['status']),
+                              layout['distances']['entry'])
+            graph = FloorGraph(layout['rows'], layout['cols'], layout['blocked'], layout['lanes'],
+                               layout['one_way_cols'], layout['one_way_rows'])
+            table.set_distances(layout['distances'])
+            return table, FloorRouter(graph, layout['points'], fields=layout['fields'])
+        if layout is not None:
+            base = layout['spots']
+            table = SpotTable(base.ids, base.row, base.col, base.type, base.status.copy(), base.distance_to_entry)
+        else:
+            info = self.facilities[facility_name]
+            table = generate_parking_spots(facility_name, floor_num, info['total'] // info['floors'], seed=self.seed)
+            layout = {'points': default_points(table.rows, table.cols)}
+
+        router, distances = floor_routing(table, layout)
+        table.set_distances(distances)
+        return table, router
+
+    def floor(self, facility_name, floor_num):
+        """SpotTable for a floor; update it only through this store"""
+        key = (facility_name, floor_num)
+        table = self._floors.get(key)
+        if table is None:
+            with self._lock:
+                table = self._floors.get(key)
+                if table is None:
+                    table, self._routers[key] = self._build_floor(facility_name, floor_num)
+                    self._versions[key] = 0
+                    self._available[key] = table.available_count()
+                    self._floor_locks[key] = threading.Lock()
+                    self._floors[key] = table
+        return table
+
+    def router(self, facility_name, floor_num):
+        """FloorRouter with precomputed distance fields for a floor"""
+        self.floor(facility_name, floor_num)
+        return self._routers[(facility_name, floor_num)]
+
+    def facility_router(self, facility_name):
+        """FacilityRouter across every floor of a facility, built once"""
+        router = self._facility_routers.get(facility_name)
+        if router is None:
+            floors = range(1, self.facilities[facility_name]['floors'] + 1)
+            router = FacilityRouter({f: self.router(facility_name, f) for f in floors})
+            self._facility_routers[facility_name] = router
+        return router
+
+    @METRICS.timed('route')
+    def route(self, facility_name, floor_num, spot_id):
+        """Route to a spot: its (row, col) cells and the spot indices on it"""
+        table = self.floor(facility_name, floor_num)
+        idx = table.index_of(spot_id)
+        cells = self.router(facility_name, floor_num).route('entry', int(table.row[idx]), int(table.col[idx]))
+        return cells, table.at(cells)
+
+    def facility_route(self, facility_name, floor_num, spot_id):
+        """Route to a spot from the street: (floor, cells) segments up the ramps"""
+        table = self.floor(facility_name, floor_num)
+        idx = table.index_of(spot_id)
+        return self.facility_router(facility_name).route(floor_num, int(table.row[idx]), int(table.col[idx]))
+
+    def version(self, facility_name, floor_num):
+        """Change counter for a floor, bumped on every status update"""
+        self.floor(facility_name, floor_num)
+        return self._versions[(facility_name, floor_num)]
+
+    def versions(self):
+        """{(facility, floor): version} for every floor built so far"""
+        return dict(self._versions)
+
+    def available(self, facility_name, floor_num=None):
+        """Available spots on one floor, or across the whole facility"""
+        if floor_num is not None:
+            self.floor(facility_name, floor_num)
+            return self._available[(facility_name, floor_num)]
+        return sum(self.available(facility_name, f) for f in range(1, self.facilities[facility_name]['floors'] + 1))
+
+    def facility_counts(self):
+        """{facility: {'total', 'available', 'floors'}} from the live inventory"""
+        counts = {}
+        for facility_name, info in self.facilities.items():
+            floors = range(1, info['floors'] + 1)
+            counts[facility_name] = {
+                'total': sum(len(self.floor(facility_name, f)) for f in floors),
+                'available': sum(self.available(facility_name, f) for f in floors),
+                'floors': info['floors']
+            }
+        return counts
+
+    def add_listener(self, callback):
+        """Call ``callback(facility, floor, idx, old, new)`` on every status change"""
+        self._listeners.append(callback)
+
+    def _apply(self, key, table, idx, code):
+        """Write one status change; caller holds the floor lock"""
+        old = table.status[idx]
+        if old == code:
+            return
+        table.set_status(idx, code)
+        if old == STATUS_AVAILABLE:
+            self._available[key] -= 1
+        elif code == STATUS_AVAILABLE:
+            self._available[key] += 1
+        self._versions[key] += 1
+        for callback in self._listeners:
+            callback(key[0], key[1], idx, old, code)
+
+    def _compare_and_set(self, facility_name, floor_num, spot_id, expected, code):
+        key = (facility_name, floor_num)
+        table = self.floor(facility_name, floor_num)
+        idx = table.index_of(spot_id)
+        if idx < 0:
+            return False
+        with self._floor_locks[key]:
+            if table.status[idx] != expected:
+                return False
+            self._apply(key, table, idx, code)
+        return True
+
+    def set_status(self, facility_name, floor_num, spot_id, status):
+        """Update a spot's status unconditionally; False for unknown spots"""
+        key = (facility_name, floor_num)
+        table = self.floor(facility_name, floor_num)
+        idx = table.index_of(spot_id)
+        if idx < 0:
+            return False
+        with self._floor_locks[key]:
+            self._apply(key, table, idx, STATUS_NAMES.index(status))
+        return True
+
+    def apply_statuses(self, facility_name, floor_num, idx, codes):
+        """Write a batch of status codes to spot indices; returns how many changed"""
+        key = (facility_name, floor_num)
+        table = self.floor(facility_name, floor_num)
+        status = table.status
+        changed = 0
+        with self._floor_locks[key]:
+            for i, code in zip(idx.tolist(), codes.tolist()):
+                if status[i] != code:
+                    self._apply(key, table, i, code)
+                    changed += 1
+        return changed
+
+    def find_available(self, facility_name, floor_num, kind=None, spot_type=None, exclude=None):
+        """Index of the best available spot without claiming it, or -1"""
+        key = (facility_name, floor_num)
+        table = self.floor(facility_name, floor_num)
+        # The preference heaps are trimmed on read, so even lookups lock
+        with self._floor_locks[key]:
+            return table.pick_available(kind, spot_type, exclude)
+
+    def claim_best(self, facility_name, floor_num, kind=None, spot_type=None, exclude=None):
+        """Atomically pick and occupy the best available spot; index or -1"""
+        key = (facility_name, floor_num)
+        table = self.floor(facility_name, floor_num)
+        with self._floor_locks[key]:
+            idx = table.pick_available(kind, spot_type, exclude)
+            if idx >= 0:
+                self._apply(key, table, idx, STATUS_OCCUPIED)
+        return idx
+
+    def claim(self, facility_name, floor_num, spot_id):
+        """Occupy a spot only if it is still available (compare-and-set)"""
+        return self._compare_and_set(facility_name, floor_num, spot_id, STATUS_AVAILABLE, STATUS_OCCUPIED)
+
+    def release(self, facility_name, floor_num, spot_id):
+        """Return an occupied spot to the available pool (compare-and-set)"""
+        return self._compare_and_set(facility_name, floor_num, spot_id, STATUS_OCCUPIED, STATUS_AVAILABLE)
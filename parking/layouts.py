@@ -0,0 +1,401 @@
+"""Bulk facility layout import into compact memory-mapped bundles
+
+Layouts exported from CAD or drawn in a spreadsheet are read from CSV or
+GeoJSON, validated, and compiled into a bundle directory: one ``.npy`` file
+per column holding every floor of every facility back to back, plus a
+``manifest.json`` with each floor's offsets. Compiling runs the lane
+searches once, so the bundle also stores every spot's distance to each
+point of interest and the distance fields used for routes. Loading a floor
+is then a few slices of memory-mapped arrays; the pages are shared
+read-only by every worker process that opens the same bundle.
+
+CSV columns are ``facility, floor, kind, row, col`` plus ``id``, ``type``
+and ``status`` for spots, ``direction`` (+1/-1) for one-way aisles and
+``lat``, ``lon`` for the facility location. ``kind`` is one of:
+
+- ``spot``: a parking spot (``id`` is generated from the cell if blank)
+- ``lane`` / ``blocked``: a drive-through or impassable cell
+- ``one_way_col`` / ``one_way_row``: an aisle (``col`` or ``row``) and its
+  direction
+- ``facility``: the facility's location; ``floor``, ``row`` and ``col``
+  are ignored
+- anything else (``entry``, ``ramp``, ``exit``, ``elevator``, ...): a point
+  of interest at the cell
+
+GeoJSON features carry the same fields as properties, with x as column and
+y as row in units of ``cell_size``. Points give one cell, LineStrings every
+cell along them, and Polygons their centroid (spots and points of
+interest) or every cell in their bounding box (lanes and blocked areas).
+Facility locations are Points in longitude, latitude order.
+
+A floor with no lane cells is an open deck where every cell can be driven
+through, and one with no points of interest gets the generated floors'
+entry, ramp, exit and elevator.
+
+Compile with:
+
+    python -m parking.layouts OUT_DIR layout.csv [more.geojson ...]
+
+and point ``PARKING_LAYOUT_FILE`` at ``OUT_DIR``.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from .inventory import (STATUS_NAMES, SPOT_TYPES, SpotTable, _FAR, _row_label, default_points,
+                        floor_routing)
+from .routing import UNREACHABLE
+
+BUNDLE_VERSION = 1
+MANIFEST = 'manifest.json'
+# Bundle arrays, stored one file each as NAME.npy
+ARRAYS = ('ids', 'row', 'col', 'type', 'status', 'distances', 'field_distance', 'field_parent', 'blocked',
+          'lanes')
+CELL_KINDS = ('lane', 'blocked')
+
+
+def _facility(features, name):
+    return features.setdefault(name, {'location': None, 'floors': {}})
+
+
+def _floor(features, facility_name, floor_num):
+    return _facility(features, facility_name)['floors'].setdefault(int(floor_num), {
+        'spots': [], 'points': {}, 'blocked': [], 'lanes': [], 'one_way_cols': {}, 'one_way_rows': {}
+    })
+
+
+def _add(features, props, cells):
+    """Record one feature's cells under its facility and floor"""
+    kind = props['kind']
+    if kind == 'facility':
+        return
+    floor = _floor(features, props['facility'], props['floor'])
+    if kind == 'spot':
+        for row, col in cells:
+            floor['spots'].append({
+                'id': str(props['id']) if props.get('id') not in (None, '') else None,
+                'row': row,
+                'col': col,
+                'type': props.get('type') or 'Regular',
+                'status': props.get('status') or 'available'
+            })
+    elif kind in CELL_KINDS:
+        floor['lanes' if kind == 'lane' else 'blocked'].extend(cells)
+    elif kind == 'one_way_col':
+        floor['one_way_cols'][cells[0][1]] = int(props['direction'])
+    elif kind == 'one_way_row':
+        floor['one_way_rows'][cells[0][0]] = int(props['direction'])
+    else:
+        floor['points'].setdefault(kind, []).extend(cells)
+
+
+def read_csv(path, features=None):
+    """Add the layout rows of a CSV file to ``features`` (a new dict if None)"""
+    features = {} if features is None else features
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, record in enumerate(csv.DictReader(f), start=2):
+            record = {key: (value or '').strip() for key, value in record.items() if key}
+            try:
+                if record['kind'] == 'facility':
+                    _facility(features, record['facility'])['location'] = (float(record['lat']),
+                                                                          float(record['lon']))
+                    continue
+                row = int(record['row']) if record.get('row') else 0
+                col = int(record['col']) if record.get('col') else 0
+                _add(features, record, [(row, col)])
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{path}:{line}: {e!r}") from None
+    return features
+
+
+def _line_cells(points):
+    """Every cell along a polyline of (row, col) float points"""
+    cells = [(round(points[0][0]), round(points[0][1]))]
+    for (r0, c0), (r1, c1) in zip(points, points[1:]):
+        steps = max(round(abs(r1 - r0)), round(abs(c1 - c0)), 1)
+        for step in range(1, steps + 1):
+            t = step / steps
+            cells.append((round(r0 + (r1 - r0) * t), round(c0 + (c1 - c0) * t)))
+    # Keep the drawing order, without repeats where segments meet
+    return list(dict.fromkeys(cells))
+
+
+def _geometry_cells(geometry, kind, cell_size):
+    shape = geometry['type']
+    coords = geometry['coordinates']
+    if shape == 'Point':
+        coords = [coords]
+    elif shape == 'Polygon':
+        coords = coords[0]
+    elif shape != 'LineString':
+        raise ValueError(f"unsupported geometry {shape}")
+    points = [(y / cell_size, x / cell_size) for x, y, *_ in coords]
+
+    if shape == 'Polygon':
+        if kind in CELL_KINDS:
+            rows, cols = zip(*points)
+            return [(row, col) for row in range(round(min(rows)), round(max(rows)) + 1)
+                    for col in range(round(min(cols)), round(max(cols)) + 1)]
+        # The closing vertex repeats the first
+        ring = points[:-1] if len(points) > 1 and points[0] == points[-1] else points
+        return [(round(sum(r for r, _ in ring) / len(ring)), round(sum(c for _, c in ring) / len(ring)))]
+    return _line_cells(points)
+
+
+def read_geojson(path, features=None, cell_size=1.0):
+    """Add the features of a GeoJSON FeatureCollection to ``features``"""
+    features = {} if features is None else features
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+    for n, feature in enumerate(collection.get('features', [])):
+        props = {key: value for key, value in (feature.get('properties') or {}).items() if value is not None}
+        try:
+            if props['kind'] == 'facility':
+                lon, lat = feature['geometry']['coordinates'][:2]
+                _facility(features, props['facility'])['location'] = (float(lat), float(lon))
+                continue
+            _add(features, props, _geometry_cells(feature['geometry'], props['kind'], cell_size))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: feature {n}: {e!r}") from None
+    return features
+
+
+def read_layouts(paths, cell_size=1.0):
+    """Features from any mix of CSV and GeoJSON files"""
+    features = {}
+    for path in paths:
+        if path.lower().endswith('.csv'):
+            read_csv(path, features)
+        else:
+            read_geojson(path, features, cell_size)
+    return features
+
+
+def _check_floor(facility_name, floor_num, floor):
+    where = f"{facility_name} floor {floor_num}"
+    if not floor['spots']:
+        raise ValueError(f"{where}: no spots")
+    cells = [(s['row'], s['col']) for s in floor['spots']]
+    cells += [cell for key in ('blocked', 'lanes') for cell in floor[key]]
+    cells += [cell for kind_cells in floor['points'].values() for cell in kind_cells]
+    if min(min(cell) for cell in cells) < 0:
+        raise ValueError(f"{where}: negative row or column")
+    if floor['points'] and 'entry' not in floor['points']:
+        raise ValueError(f"{where}: no entry point")
+    seen_ids = set()
+    seen_cells = set()
+    blocked = set(floor['blocked'])
+    for spot in floor['spots']:
+        if spot['id'] is None:
+            spot['id'] = f"{floor_num}{_row_label(spot['row'])}{spot['col'] + 1:02d}"
+        if spot['id'] in seen_ids:
+            raise ValueError(f"{where}: duplicate spot id {spot['id']}")
+        if (spot['row'], spot['col']) in seen_cells:
+            raise ValueError(f"{where}: two spots at {(spot['row'], spot['col'])}")
+        if (spot['row'], spot['col']) in blocked:
+            raise ValueError(f"{where}: spot {spot['id']} is on a blocked cell")
+        if spot['type'] not in SPOT_TYPES:
+            raise ValueError(f"{where}: unknown spot type {spot['type']}")
+        if spot['status'] not in STATUS_NAMES:
+            raise ValueError(f"{where}: unknown status {spot['status']}")
+        seen_ids.add(spot['id'])
+        seen_cells.add((spot['row'], spot['col']))
+
+
+def validate(features):
+    """Raise ValueError on a layout that cannot be compiled
+
+    Floors must be numbered 1..N, spot ids and cells unique on a floor and
+    clear of blocked cells, and a floor with points of interest must have
+    an entry. Blank spot ids are
+    filled in, in place.
+    """
+    if not features:
+        raise ValueError("no facilities")
+    for facility_name, facility in features.items():
+        floors = sorted(facility['floors'])
+        if floors != list(range(1, len(floors) + 1)):
+            raise ValueError(f"{facility_name}: floors must be numbered 1..N, got {floors}")
+        for floor_num in floors:
+            _check_floor(facility_name, floor_num, facility['floors'][floor_num])
+
+
+def _floor_layout(floor):
+    spots = floor['spots']
+    table = SpotTable([s['id'] for s in spots], [s['row'] for s in spots], [s['col'] for s in spots],
+                      [SPOT_TYPES.index(s['type']) for s in spots],
+                      [STATUS_NAMES.index(s['status']) for s in spots], np.zeros(len(spots)))
+    layout = {
+        'points': floor['points'] or default_points(table.rows, table.cols),
+        'blocked': floor['blocked'],
+        'lanes': floor['lanes'] or None,
+        'one_way_cols': floor['one_way_cols'],
+        'one_way_rows': floor['one_way_rows']
+    }
+    return table, layout
+
+
+def compile_bundle(features, out_dir):
+    """Validate ``features``, run each floor's lane searches and write the bundle
+
+    Returns the manifest.
+    """
+    validate(features)
+    built = []
+    kinds = []
+    for facility_name in sorted(features):
+        for floor_num, floor in sorted(features[facility_name]['floors'].items()):
+            table, layout = _floor_layout(floor)
+            router, distances = floor_routing(table, layout)
+            kinds += [kind for kind in router.kinds() if kind not in kinds]
+            built.append((facility_name, floor_num, table, layout, router, distances))
+
+    total_spots = sum(len(table) for _, _, table, _, _, _ in built)
+    total_cells = sum(router.graph.rows * router.graph.cols for *_, router, _ in built)
+    distances_out = np.full((len(kinds), total_spots), _FAR, dtype=np.int32)
+    field_distance = np.full((len(kinds), total_cells), UNREACHABLE, dtype=np.int32)
+    field_parent = np.full((len(kinds), total_cells), UNREACHABLE, dtype=np.int32)
+    columns = {key: [] for key in ('ids', 'row', 'col', 'type', 'status', 'blocked', 'lanes')}
+    manifest = {'version': BUNDLE_VERSION, 'kinds': kinds, 'facilities': {}, 'floors': []}
+    spot_offset = cell_offset = blocked_offset = lane_offset = 0
+    for facility_name, floor_num, table, layout, router, distances in built:
+        n_spots = len(table)
+        n_cells = router.graph.rows * router.graph.cols
+        blocked = np.asarray(layout['blocked'], dtype=np.int16).reshape(-1, 2)
+        lanes = np.asarray(layout['lanes'] or (), dtype=np.int16).reshape(-1, 2)
+        for key, values in (('ids', table.ids), ('row', table.row), ('col', table.col), ('type', table.type),
+                            ('status', table.status), ('blocked', blocked), ('lanes', lanes)):
+            columns[key].append(values)
+        for kind, (dist, parent) in router.fields().items():
+            k = kinds.index(kind)
+            field_distance[k, cell_offset:cell_offset + n_cells] = dist
+            field_parent[k, cell_offset:cell_offset + n_cells] = parent
+            if kind in distances:
+                distances_out[k, spot_offset:spot_offset + n_spots] = distances[kind]
+        manifest['floors'].append({
+            'facility': facility_name,
+            'floor': floor_num,
+            'rows': router.graph.rows,
+            'cols': router.graph.cols,
+            'spots': [spot_offset, n_spots],
+            'cells': cell_offset,
+            'blocked': [blocked_offset, len(blocked)],
+            'lanes': [lane_offset, len(lanes)] if layout['lanes'] is not None else None,
+            'points': {kind: [list(cell) for cell in cells] for kind, cells in router.points.items()},
+            'distance_kinds': sorted(distances),
+            'one_way_cols': layout['one_way_cols'],
+            'one_way_rows': layout['one_way_rows']
+        })
+        spot_offset += n_spots
+        cell_offset += n_cells
+        blocked_offset += len(blocked)
+        lane_offset += len(lanes)
+
+    for facility_name in sorted(features):
+        facility = features[facility_name]
+        manifest['facilities'][facility_name] = {
+            'total': sum(len(f['spots']) for f in facility['floors'].values()),
+            'floors': len(facility['floors'])
+        }
+        if facility['location'] is not None:
+            manifest['facilities'][facility_name]['location'] = list(facility['location'])
+
+    arrays = {key: np.concatenate(values) for key, values in columns.items()}
+    arrays.update(distances=distances_out, field_distance=field_distance, field_parent=field_parent)
+    os.makedirs(out_dir, exist_ok=True)
+    for key in ARRAYS:
+        np.save(os.path.join(out_dir, key + '.npy'), arrays[key])
+    # The manifest goes last, so a bundle with one is complete
+    with open(os.path.join(out_dir, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+class LayoutBundle:
+    """Read-only view of a compiled layout bundle
+
+    Arrays are memory-mapped, so opening a bundle reads only the manifest
+    and ``get`` returns slices without copying. Behaves like the dict from
+    ``load_layout_file`` for ``InventoryStore``: ``get((facility, floor))``
+    returns the floor's layout, with ``fields`` holding the precomputed
+    distance fields.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != BUNDLE_VERSION:
+            raise ValueError(f"{path}: layout bundle version {manifest.get('version')}, "
+                             f"expected {BUNDLE_VERSION}; compile it again")
+        self.path = path
+        self.kinds = manifest['kinds']
+        self.facilities = {
+            name: {**info, 'location': tuple(info['location'])} if 'location' in info else dict(info)
+            for name, info in manifest['facilities'].items()
+        }
+        self._floors = {(floor['facility'], floor['floor']): floor for floor in manifest['floors']}
+        self._arrays = {key: np.load(os.path.join(path, key + '.npy'), mmap_mode='r') for key in ARRAYS}
+
+    def __len__(self):
+        return len(self._floors)
+
+    def __contains__(self, key):
+        return key in self._floors
+
+    def get(self, key, default=None):
+        floor = self._floors.get(key)
+        if floor is None:
+            return default
+        arrays = self._arrays
+        start, n_spots = floor['spots']
+        spots = slice(start, start + n_spots)
+        cells = slice(floor['cells'], floor['cells'] + floor['rows'] * floor['cols'])
+        blocked_start, n_blocked = floor['blocked']
+        layout = {
+            'ids': arrays['ids'][spots],
+            'row': arrays['row'][spots],
+            'col': arrays['col'][spots],
+            'type': arrays['type'][spots],
+            'status': arrays['status'][spots],
+            'rows': floor['rows'],
+            'cols': floor['cols'],
+            'points': floor['points'],
+            'blocked': arrays['blocked'][blocked_start:blocked_start + n_blocked],
+            'lanes': None,
+            'one_way_cols': {int(k): v for k, v in floor['one_way_cols'].items()},
+            'one_way_rows': {int(k): v for k, v in floor['one_way_rows'].items()},
+            'distances': {kind: arrays['distances'][self.kinds.index(kind), spots]
+                          for kind in floor['distance_kinds']},
+            'fields': {kind: (arrays['field_distance'][self.kinds.index(kind), cells],
+                              arrays['field_parent'][self.kinds.index(kind), cells])
+                       for kind in floor['points']}
+        }
+        if floor['lanes'] is not None:
+            lane_start, n_lanes = floor['lanes']
+            layout['lanes'] = arrays['lanes'][lane_start:lane_start + n_lanes]
+        return layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile CSV/GeoJSON facility layouts into a layout bundle")
+    parser.add_argument('out_dir')
+    parser.add_argument('inputs', nargs='+', help=".csv or .geojson layout files")
+    parser.add_argument('--cell-size', type=float, default=1.0, help="GeoJSON units per grid cell")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = compile_bundle(read_layouts(args.inputs, args.cell_size), args.out_dir)
+    elapsed = time.perf_counter() - started
+    size = sum(os.path.getsize(os.path.join(args.out_dir, name)) for name in os.listdir(args.out_dir))
+    spots = sum(info['total'] for info in manifest['facilities'].values())
+    print(f"{len(manifest['facilities'])} facilities, {len(manifest['floors'])} floors, {spots} spots "
+          f"compiled in {elapsed:.2f}s to {args.out_dir} ({math.ceil(size / 1024)} KiB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Change feed of spot status updates for live views
+
+Live views poll on a short interval. Rather than rescanning a floor, a
+client remembers the floor version it last drew and asks the feed what
+changed since then.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class ChangeFeed:
+    """Bounded per-floor log of (version, spot index, new status code)
+
+    Entries are appended from an InventoryStore listener, so versions match
+    ``InventoryStore.version``. Each floor keeps the last ``capacity``
+    changes; a client further behind than that has to redraw in full.
+    """
+
+    def __init__(self, inventory, capacity=1024):
+        self.inventory = inventory
+        self.capacity = capacity
+        self._floors = {}
+        self._lock = threading.Lock()
+        inventory.add_listener(self._on_change)
+
+    def _on_change(self, facility_name, floor_num, idx, old, new):
+        key = (facility_name, floor_num)
+        # The store bumps the floor version before calling listeners
+        version = self.inventory.version(facility_name, floor_num)
+        with self._lock:
+            log = self._floors.get(key)
+            if log is None:
+                log = self._floors[key] = deque(maxlen=self.capacity)
+            log.append((version, idx, new))
+
+    def changes_since(self, facility_name, floor_num, version):
+        """(current version, spot indices, new codes) for changes after ``version``
+
+        A spot changed more than once appears once with its latest code.
+        Returns None when the feed no longer reaches back to ``version``.
+        """
+        current = self.inventory.version(facility_name, floor_num)
+        with self._lock:
+            log = list(self._floors.get((facility_name, floor_num), ()))
+        if current == version:
+            return current, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.int8)
+        entries = [(v, idx, code) for v, idx, code in log if version < v <= current]
+        if len(entries) < current - version:
+            return None
+        latest = {idx: code for _, idx, code in entries}
+        return (current, np.fromiter(latest.keys(), dtype=np.intp, count=len(latest)),
+                np.fromiter(latest.values(), dtype=np.int8, count=len(latest)))
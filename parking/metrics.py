@@ -0,0 +1,234 @@
+"""Timers and counters for the app's hot paths
+
+``METRICS`` is the process-wide registry the parking modules time
+themselves against. It starts disabled, and then a timed function costs one
+attribute check per call and ``timer()`` hands back a shared no-op context.
+Once enabled, every timer keeps a call count and total for Prometheus
+export, a rolling window of recent durations for percentiles, and the time
+spent in the calling thread's current rerun for a per-rerun breakdown.
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.key = (name, labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._observe(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Registry of timers, counters and tracked values
+
+    Timers and counters are keyed by name plus optional labels, which show
+    up as Prometheus labels on export.
+    """
+
+    def __init__(self, window=1000, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self._timers = {}
+        self._counters = {}
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _observe(self, key, seconds):
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                timer = self._timers[key] = [0, 0.0, deque(maxlen=self.window)]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2].append(seconds)
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run[key[0]] = run.get(key[0], 0.0) + seconds
+
+    def timer(self, name, **labels):
+        """Context manager timing its block"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, tuple(sorted(labels.items())))
+
+    def timed(self, name):
+        """Decorator timing every call of a function"""
+        def decorate(func):
+            key = (name, ())
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._observe(key, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def count(self, name, n=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def track(self, name, read, kind='gauge'):
+        """Export ``read()`` under ``name``; ``kind`` is 'gauge' or 'counter'"""
+        self._tracked[name] = (read, kind)
+
+    def start_run(self):
+        """Start collecting the time each timer spends in this thread's rerun"""
+        if self.enabled:
+            self._local.run = {'_started': time.perf_counter()}
+
+    def finish_run(self, page):
+        """Record the rerun under ``rerun{page=...}`` and return its breakdown
+
+        The breakdown maps timer names to seconds, plus 'total'. Timed calls
+        nest (a map build inside a page), so the parts can add up to more
+        than the total. Returns None when disabled or no run was started.
+        """
+        run = getattr(self._local, 'run', None)
+        self._local.run = None
+        if not self.enabled or run is None:
+            return None
+        total = time.perf_counter() - run.pop('_started')
+        self._observe(('rerun', (('page', page),)), total)
+        run['total'] = total
+        return run
+
+    def summary(self):
+        """{(name, labels): {'count', 'total', 'p50', 'p95', 'p99'}} over the rolling window"""
+        with self._lock:
+            timers = {key: (count, total, list(recent)) for key, (count, total, recent) in self._timers.items()}
+        summary = {}
+        for key, (count, total, recent) in timers.items():
+            p50, p95, p99 = np.percentile(recent, [q * 100 for q in QUANTILES])
+            summary[key] = {'count': count, 'total': total, 'p50': p50, 'p95': p95, 'p99': p99}
+        return summary
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def prometheus(self, prefix='parking_'):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        by_name = {}
+        for (name, labels), stats in sorted(self.summary().items()):
+            by_name.setdefault(name, []).append((labels, stats))
+        for name, series in by_name.items():
+            metric = _metric_name(prefix + name + '_seconds')
+            lines.append(f"# TYPE {metric} summary")
+            for labels, stats in series:
+                for q in QUANTILES:
+                    lines.append(f"{metric}{_labels(labels + (('quantile', q),))} {stats[f'p{round(q * 100)}']:.6g}")
+                lines.append(f"{metric}_sum{_labels(labels)} {stats['total']:.6g}")
+                lines.append(f"{metric}_count{_labels(labels)} {stats['count']}")
+        counters = {}
+        for (name, labels), value in sorted(self.counters().items()):
+            counters.setdefault(name, []).append((labels, value))
+        for name, series in counters.items():
+            metric = _metric_name(prefix + name + '_total')
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{_labels(labels)} {value}" for labels, value in series)
+        for name, (read, kind) in sorted(self._tracked.items()):
+            metric = _metric_name(prefix + name)
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {read()}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the export to ``path`` atomically, for a node exporter textfile collector"""
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_:]', '_', name)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def export_file(metrics, path, interval=15.0, stop=None):
+    """Rewrite the Prometheus export at ``path`` every ``interval`` seconds until ``stop`` is set
+
+    Meant to run on its own thread.
+    """
+    stop = stop or threading.Event()
+    while not stop.wait(interval):
+        metrics.write_prometheus(path)
+
+
+def serve_http(metrics, host='127.0.0.1', port=0):
+    """Serve the Prometheus export at /metrics on a daemon thread
+
+    Returns the server; ``server.server_address`` has the bound port and
+    ``server.shutdown()`` stops it.
+    """
+    # Imported here so the app does not pay for http.server unless serving
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+METRICS = Metrics()
@@ -0,0 +1,240 @@
+"""Plotly floor map rendering"""
+import numpy as np
+import plotly.graph_objects as go
+
+from .inventory import SPOT_TYPES, STATUS_NAMES, default_points
+from .metrics import METRICS
+
+# Color mapping
+COLOR_MAP = {
+    'available': '#00D66A',
+    'occupied': '#FF4B4B',
+    'assigned': '#FFB800'
+}
+ROUTE_COLOR = '#FFB800'
+# Marker label, color and symbol for each kind of point of interest
+POINT_STYLES = {
+    'entry': ('ENTRY', '#4A90E2', 'triangle-up'),
+    'exit': ('EXIT', '#FF8C42', 'triangle-down'),
+    'elevator': ('LIFT', '#B07CFF', 'diamond')
+}
+SPOT_LINE_COLOR = '#333'
+
+# Above this many spots the per-marker labels are unreadable and only bloat
+# the payload, so ids are left to the hover text
+MAX_LABELLED_SPOTS = 500
+
+# Marker colors are sent as small integer codes with a stepped colorscale:
+# plotly validates every entry of a string color array, which dominates build
+# time on large floors
+_ASSIGNED_CODE = len(STATUS_NAMES)
+_MARKER_COLORS = [COLOR_MAP[name] for name in STATUS_NAMES] + [COLOR_MAP['assigned']]
+_LINE_COLORS = [SPOT_LINE_COLOR, ROUTE_COLOR]
+_STATUS_LABELS = np.array(STATUS_NAMES, dtype=object)
+_TYPE_LABELS = np.array(SPOT_TYPES, dtype=object)
+
+
+@METRICS.timed('create_parking_map')
+def create_parking_map(spots, assigned_spot=None, route_spots=None, mode='single', route_cells=None,
+                       points=None):
+    """Create interactive parking lot visualization
+
+    ``mode='single'`` draws every spot in one marker trace plus one route
+    trace; ``mode='per_spot'`` keeps the original one-trace-per-spot figure
+    for comparison. ``route_cells`` is the (row, col) path for the route
+    line, which can run along lanes between spots; it defaults to the route
+    spots themselves. ``points`` maps point kinds to their cells and
+    defaults to the generated floor's entry, exit and elevator.
+    """
+    if points is None:
+        points = default_points(spots.rows, spots.cols)
+    entry = _marker_position(points['entry'][0], spots.rows, spots.cols)
+
+    if mode == 'per_spot':
+        fig = _per_spot_figure(spots, assigned_spot, route_spots)
+    else:
+        fig = _single_trace_figure(spots, assigned_spot, route_spots, route_cells, entry)
+
+    # Add entry, exit and elevator markers
+    markers = [(kind, _marker_position(cell, spots.rows, spots.cols))
+               for kind, cells in points.items() if kind in POINT_STYLES for cell in cells]
+    fig.add_trace(go.Scatter(
+        x=[pos[1] for _, pos in markers],
+        y=[pos[0] for _, pos in markers],
+        mode='markers+text',
+        marker=dict(
+            size=25,
+            color=[POINT_STYLES[kind][1] for kind, _ in markers],
+            symbol=[POINT_STYLES[kind][2] for kind, _ in markers]
+        ),
+        text=[POINT_STYLES[kind][0] for kind, _ in markers],
+        textposition='bottom center',
+        textfont=dict(size=12, color=[POINT_STYLES[kind][1] for kind, _ in markers], family='Arial Black'),
+        hoverinfo='skip',
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        title="Parking Lot Layout",
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-2, spots.cols + 1]),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False, range=[-2, spots.rows + 1]),
+        plot_bgcolor='#1E1E1E',
+        paper_bgcolor='#0E1117',
+        height=500,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+
+    return fig
+
+
+@METRICS.timed('create_availability_chart')
+def create_availability_chart(facility_counts):
+    """Stacked available/occupied bars per facility
+
+    Built with graph_objects rather than plotly.express, which would pull
+    in pandas for a four-bar chart.
+    """
+    names = list(facility_counts)
+    available = [counts['available'] for counts in facility_counts.values()]
+    occupied = [counts['total'] - counts['available'] for counts in facility_counts.values()]
+    fig = go.Figure([
+        go.Bar(name='Available', x=names, y=available, marker_color=COLOR_MAP['available']),
+        go.Bar(name='Occupied', x=names, y=occupied, marker_color=COLOR_MAP['occupied'])
+    ])
+    fig.update_layout(
+        title="Real-time Parking Availability",
+        barmode='stack',
+        xaxis_title="Facility",
+        yaxis_title="Spots",
+        legend_title_text="",
+        plot_bgcolor='#0E1117',
+        paper_bgcolor='#0E1117'
+    )
+    return fig
+
+
+def _stepped_colorscale(colors):
+    """Colorscale mapping integer code i (of len(colors)) to colors[i]"""
+    scale = []
+    for i, color in enumerate(colors):
+        scale.append([i / len(colors), color])
+        scale.append([(i + 1) / len(colors), color])
+    return scale
+
+
+def _marker_position(cell, rows, cols):
+    """Draw a point on the floor edge just outside the spot grid"""
+    row, col = cell
+    if row == 0:
+        return row - 1, col
+    if row == rows - 1:
+        return row + 1, col
+    if col == 0:
+        return row, col - 1
+    if col == cols - 1:
+        return row, col + 1
+    return row, col
+
+
+def _single_trace_figure(spots, assigned_spot, route_spots, route_cells, entry):
+    n = len(spots)
+    color = spots.status.astype(np.int8)
+    size = np.full(n, 15, dtype=np.int8)
+    line_width = np.ones(n, dtype=np.int8)
+    line_color = np.zeros(n, dtype=np.int8)
+
+    route_idx = np.array([spots.index_of(spot_id) for spot_id in route_spots or []], dtype=np.intp)
+    route_idx = route_idx[route_idx >= 0]
+    line_width[route_idx] = 3
+    line_color[route_idx] = 1
+
+    assigned_idx = spots.index_of(assigned_spot) if assigned_spot else -1
+    if assigned_idx >= 0:
+        color[assigned_idx] = _ASSIGNED_CODE
+        size[assigned_idx] = 20
+
+    labelled = n <= MAX_LABELLED_SPOTS
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=spots.col,
+        y=spots.row,
+        mode='markers+text' if labelled else 'markers',
+        marker=dict(
+            size=size,
+            color=color,
+            colorscale=_stepped_colorscale(_MARKER_COLORS),
+            cmin=-0.5,
+            cmax=len(_MARKER_COLORS) - 0.5,
+            symbol='square',
+            line=dict(
+                width=line_width,
+                color=line_color,
+                colorscale=_stepped_colorscale(_LINE_COLORS),
+                cmin=-0.5,
+                cmax=len(_LINE_COLORS) - 0.5
+            )
+        ),
+        text=spots.ids if labelled else None,
+        textposition='middle center',
+        textfont=dict(size=8, color='white'),
+        customdata=np.column_stack([spots.ids, _STATUS_LABELS[spots.status], _TYPE_LABELS[spots.type]]),
+        hovertemplate="<b>Spot: %{customdata[0]}</b><br>" +
+                      "Status: %{customdata[1]}<br>" +
+                      "Type: %{customdata[2]}<br>" +
+                      "<extra></extra>",
+        showlegend=False
+    ))
+
+    if route_cells is None:
+        route_cells = np.column_stack([spots.row[route_idx], spots.col[route_idx]])
+    route_cells = np.asarray(route_cells).reshape(-1, 2)
+    if len(route_cells):
+        # Route overlay drawn from the entry marker along the route cells
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([[entry[1]], route_cells[:, 1]]),
+            y=np.concatenate([[entry[0]], route_cells[:, 0]]),
+            mode='lines',
+            line=dict(width=3, color=ROUTE_COLOR, dash='dot'),
+            hoverinfo='skip',
+            showlegend=False
+        ))
+
+    return fig
+
+
+def _per_spot_figure(spots, assigned_spot, route_spots):
+    fig = go.Figure()
+
+    for spot in spots.to_records():
+        color = COLOR_MAP.get(spot['status'], '#00D66A')
+
+        if assigned_spot and spot['id'] == assigned_spot:
+            color = COLOR_MAP['assigned']
+            marker_size = 20
+        else:
+            marker_size = 15
+
+        # Check if spot is on the route
+        is_on_route = route_spots and spot['id'] in route_spots
+
+        fig.add_trace(go.Scatter(
+            x=[spot['col']],
+            y=[spot['row']],
+            mode='markers+text',
+            marker=dict(
+                size=marker_size,
+                color=color,
+                symbol='square',
+                line=dict(width=3, color=ROUTE_COLOR) if is_on_route else dict(width=1, color=SPOT_LINE_COLOR)
+            ),
+            text=spot['id'],
+            textposition='middle center',
+            textfont=dict(size=8, color='white'),
+            hovertemplate=f"<b>Spot: {spot['id']}</b><br>" +
+                          f"Status: {spot['status']}<br>" +
+                          f"Type: {spot['type']}<br>" +
+                          "<extra></extra>",
+            showlegend=False
+        ))
+
+    return fig
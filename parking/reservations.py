@@ -0,0 +1,143 @@
+"""Future spot reservations for Pre-Book conflict detection"""
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from .inventory import STATUS_AVAILABLE
+
+# Reservation keys pack (spot index, start minute) into one sortable int64
+_SPOT_SHIFT = np.int64(1 << 40)
+# Minutes between sweeps of finished reservations
+EXPIRE_EVERY = 15
+
+
+def to_minute(when):
+    """Minutes since the epoch for a naive local datetime"""
+    return int(when.timestamp() // 60)
+
+
+class FloorReservations:
+    """Sorted interval arrays for every spot on one floor
+
+    Reservations are kept in two parallel arrays, packed (spot, start) keys
+    and end minutes, ordered by key.
+    Per spot they never overlap, so the reservation with the latest start
+    before a window's end is the only one that can collide with it. That
+    makes a conflict check a binary search, and checking every spot on the
+    floor one vectorized searchsorted.
+    """
+
+    def __init__(self, n_spots):
+        self.n_spots = n_spots
+        self.keys = np.empty(0, dtype=np.int64)
+        self.ends = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def busy_mask(self, start, end, spots=None):
+        """Boolean mask of spots with a reservation overlapping [start, end)"""
+        spots = np.arange(self.n_spots, dtype=np.int64) if spots is None else np.asarray(spots, dtype=np.int64)
+        if not len(self.keys):
+            return np.zeros(len(spots), dtype=bool)
+        pos = np.searchsorted(self.keys, spots * _SPOT_SHIFT + end, side='left') - 1
+        valid = pos >= 0
+        pos = np.where(valid, pos, 0)
+        return valid & (self.keys[pos] // _SPOT_SHIFT == spots) & (self.ends[pos] > start)
+
+    def add(self, spot, start, end):
+        """Insert a reservation; False if it overlaps an existing one"""
+        if end <= start or self.busy_mask(start, end, [spot])[0]:
+            return False
+        key = spot * _SPOT_SHIFT + start
+        pos = np.searchsorted(self.keys, key)
+        self.keys = np.insert(self.keys, pos, key)
+        self.ends = np.insert(self.ends, pos, end)
+        return True
+
+    def expire(self, before):
+        """Forget reservations that ended at or before ``before``"""
+        keep = self.ends > before
+        self.keys = self.keys[keep]
+        self.ends = self.ends[keep]
+
+
+class ReservationCalendar:
+    """Reservations for every floor, checked and inserted atomically
+
+    The calendar resolves spots through the InventoryStore, so spot indices
+    line up with the floor's SpotTable. Finished reservations are swept
+    out every EXPIRE_EVERY minutes by reserve_best, so the arrays only hold
+    current and future windows.
+    """
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self._floors = {}
+        self._lock = threading.Lock()
+        self._expired_at = 0
+
+    def floor(self, facility_name, floor_num):
+        key = (facility_name, floor_num)
+        floor = self._floors.get(key)
+        if floor is None:
+            table = self.inventory.floor(facility_name, floor_num)
+            floor = self._floors.setdefault(key, FloorReservations(len(table)))
+        return floor
+
+    def load(self, rows):
+        """Bulk-load reservations from (facility, floor, spot_id, start, end) rows"""
+        with self._lock:
+            for facility_name, floor_num, spot_id, start, end in rows:
+                if facility_name not in self.inventory.facilities:
+                    continue
+                idx = self.inventory.floor(facility_name, floor_num).index_of(spot_id)
+                if idx >= 0:
+                    self.floor(facility_name, floor_num).add(idx, to_minute(start), to_minute(end))
+
+    def busy_mask(self, facility_name, floor_num, start, end):
+        """Spots on a floor already reserved for part of [start, end)"""
+        with self._lock:
+            return self.floor(facility_name, floor_num).busy_mask(to_minute(start), to_minute(end))
+
+    def reserve(self, facility_name, floor_num, spot_id, start, end):
+        """Reserve one spot; False if it is unknown or already taken then"""
+        idx = self.inventory.floor(facility_name, floor_num).index_of(spot_id)
+        if idx < 0:
+            return False
+        with self._lock:
+            return self.floor(facility_name, floor_num).add(idx, to_minute(start), to_minute(end))
+
+    def reserve_best(self, facility_name, floor_num, start, end, kind=None, spot_type=None):
+        """Atomically reserve the best free spot for a window; index or -1
+
+        Spots are ranked by distance to the preferred point kind, or picked
+        at random when kind is None, among those of ``spot_type`` with no
+        overlapping reservation. A window that has already started also
+        needs the spot to be free right now.
+        """
+        table = self.inventory.floor(facility_name, floor_num)
+        start_min, end_min = to_minute(start), to_minute(end)
+        now = datetime.now()
+        with self._lock:
+            if to_minute(now) - self._expired_at >= EXPIRE_EVERY:
+                self._expire(to_minute(now))
+            floor = self.floor(facility_name, floor_num)
+            mask = ~floor.busy_mask(start_min, end_min)
+            if start <= now:
+                mask &= table.status == STATUS_AVAILABLE
+            idx = table.pick_free(mask, kind, spot_type)
+            if idx >= 0:
+                floor.add(idx, start_min, end_min)
+        return idx
+
+    def expire(self, now=None):
+        """Drop finished reservations from every floor"""
+        with self._lock:
+            self._expire(to_minute(now or datetime.now()))
+
+    def _expire(self, cutoff):
+        for floor in self._floors.values():
+            floor.expire(cutoff)
+        self._expired_at = cutoff
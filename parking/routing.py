@@ -0,0 +1,217 @@
+"""Grid routing over each floor's drive lanes
+
+A floor is a grid of cells. Open cells can be driven to; "lane" cells can
+also be driven through. Breadth-first distance fields are computed once per
+point of interest (entry, ramp, ...) when the floor is loaded, so any later
+route or distance query is a table lookup plus a walk back along the parent
+pointers.
+"""
+from collections import deque
+
+import numpy as np
+
+UNREACHABLE = -1
+RAMP_COST = 10  # Cells of driving charged per floor climbed
+
+# (row, col) step for each move direction
+_MOVES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _cells(cells):
+    """(n, 2) int array of (row, col) cells from any sequence of pairs"""
+    return np.asarray(cells if cells is not None else (), dtype=np.intp).reshape(-1, 2)
+
+
+class FloorGraph:
+    """Directed grid graph of drivable cells on one floor
+
+    ``blocked`` cells (pillars, walls) can never be entered. ``lanes`` marks
+    the cells that may be driven through; when omitted every open cell is a
+    lane, which matches the open-deck generated layouts. ``one_way_cols`` and
+    ``one_way_rows`` map an aisle to its allowed direction (+1 towards higher
+    indices, -1 towards lower).
+    """
+
+    def __init__(self, rows, cols, blocked=None, lanes=None, one_way_cols=None, one_way_rows=None):
+        self.rows = rows
+        self.cols = cols
+        self.open = np.ones((rows, cols), dtype=bool)
+        blocked = _cells(blocked)
+        self.open[blocked[:, 0], blocked[:, 1]] = False
+        if lanes is None:
+            self.lanes = self.open.copy()
+        else:
+            lanes = _cells(lanes)
+            self.lanes = np.zeros((rows, cols), dtype=bool)
+            self.lanes[lanes[:, 0], lanes[:, 1]] = True
+            self.lanes &= self.open
+        self.one_way_cols = dict(one_way_cols or {})
+        self.one_way_rows = dict(one_way_rows or {})
+        # Built on the first search; floors loaded with precomputed distance
+        # fields never need it
+        self._neighbours = None
+
+    def _build_adjacency(self):
+        open_cells = self.open.ravel()
+        adjacency = []
+        for idx in range(self.rows * self.cols):
+            row, col = divmod(idx, self.cols)
+            out = []
+            if open_cells[idx]:
+                for d_row, d_col in _MOVES:
+                    n_row, n_col = row + d_row, col + d_col
+                    if not (0 <= n_row < self.rows and 0 <= n_col < self.cols):
+                        continue
+                    if d_row and self.one_way_cols.get(col, d_row) != d_row:
+                        continue
+                    if d_col and self.one_way_rows.get(row, d_col) != d_col:
+                        continue
+                    n_idx = n_row * self.cols + n_col
+                    if open_cells[n_idx]:
+                        out.append(n_idx)
+            adjacency.append(tuple(out))
+        return adjacency
+
+    def cell(self, row, col):
+        """Flat cell index"""
+        return row * self.cols + col
+
+    def distance_field(self, sources):
+        """BFS distances and parent pointers from the nearest source cell
+
+        Returns two flat int32 arrays over all cells; unreachable cells have
+        distance UNREACHABLE and every source is its own parent.
+        """
+        n = self.rows * self.cols
+        dist = np.full(n, UNREACHABLE, dtype=np.int32)
+        parent = np.full(n, UNREACHABLE, dtype=np.int32)
+        lanes = self.lanes.ravel().tolist()
+        dist_list = dist.tolist()
+        parent_list = parent.tolist()
+        queue = deque()
+        for row, col in sources:
+            idx = self.cell(row, col)
+            if self.open[row, col] and dist_list[idx] == UNREACHABLE:
+                dist_list[idx] = 0
+                parent_list[idx] = idx
+                queue.append(idx)
+
+        if self._neighbours is None:
+            self._neighbours = self._build_adjacency()
+        neighbours = self._neighbours
+        while queue:
+            idx = queue.popleft()
+            step = dist_list[idx] + 1
+            for n_idx in neighbours[idx]:
+                if dist_list[n_idx] == UNREACHABLE:
+                    dist_list[n_idx] = step
+                    parent_list[n_idx] = idx
+                    # Parking cells are destinations, not through-routes
+                    if lanes[n_idx]:
+                        queue.append(n_idx)
+
+        dist[:] = dist_list
+        parent[:] = parent_list
+        return dist, parent
+
+
+class FloorRouter:
+    """Precomputed distance fields from a floor's points of interest
+
+    ``points`` maps a kind ('entry', 'ramp', ...) to the (row, col) cells
+    where it is located. Each kind gets one multi-source field, so queries
+    are answered against whichever point of that kind is nearest.
+    ``fields`` takes fields computed earlier ({kind: (distance, parent)},
+    as from ``fields()``) instead of searching again.
+    """
+
+    def __init__(self, graph, points, fields=None):
+        self.graph = graph
+        self.points = {kind: [tuple(cell) for cell in cells] for kind, cells in points.items()}
+        if fields is None:
+            fields = {kind: graph.distance_field(cells) for kind, cells in self.points.items()}
+        self._fields = fields
+
+    def fields(self):
+        return dict(self._fields)
+
+    def kinds(self):
+        return list(self._fields)
+
+    def distance(self, kind):
+        """Flat per-cell distance array from the nearest point of ``kind``"""
+        return self._fields[kind][0]
+
+    def distance_to(self, kind, row, col):
+        return int(self._fields[kind][0][self.graph.cell(row, col)])
+
+    def route(self, kind, row, col):
+        """(row, col) cells from the nearest ``kind`` point to the target
+
+        The start cell is excluded and the target included, as an (n, 2)
+        int array; empty if the target is the start or unreachable.
+        """
+        dist, parent = self._fields[kind]
+        idx = self.graph.cell(row, col)
+        if dist[idx] <= 0:
+            return np.empty((0, 2), dtype=np.intp)
+        path = np.empty(dist[idx], dtype=np.intp)
+        for step in range(dist[idx] - 1, -1, -1):
+            path[step] = idx
+            idx = parent[idx]
+        return np.column_stack(np.divmod(path, self.graph.cols))
+
+
+class FacilityRouter:
+    """Multi-floor routing from the street entry via ramps
+
+    Floor 1's 'entry' points are the street entrance; on upper floors they
+    are where the ramp from the floor below arrives. Each floor's 'ramp'
+    points lead to the next floor up.
+    """
+
+    def __init__(self, floor_routers, ramp_cost=RAMP_COST):
+        self.floors = dict(floor_routers)
+        self.ramp_cost = ramp_cost
+        # Cost of arriving at each floor's entry points from the street
+        self._arrival = {}
+        cost = 0
+        for floor_num in sorted(self.floors):
+            self._arrival[floor_num] = cost
+            ramp = self._nearest_ramp(floor_num)
+            if ramp is None:
+                break
+            cost += self.floors[floor_num].distance_to('entry', *ramp) + ramp_cost
+
+    def _nearest_ramp(self, floor_num):
+        """Up-ramp cell reachable from the floor's entry, or None"""
+        router = self.floors[floor_num]
+        reachable = [cell for cell in router.points.get('ramp', ()) if router.distance_to('entry', *cell) >= 0]
+        if not reachable:
+            return None
+        return min(reachable, key=lambda cell: router.distance_to('entry', *cell))
+
+    def arrival(self, floor_num):
+        """Driving distance from the street to a floor's entry points, or UNREACHABLE"""
+        return self._arrival.get(floor_num, UNREACHABLE)
+
+    def distance(self, floor_num, row, col):
+        """Driving distance from the street entry, or UNREACHABLE"""
+        if floor_num not in self._arrival:
+            return UNREACHABLE
+        on_floor = self.floors[floor_num].distance_to('entry', row, col)
+        return UNREACHABLE if on_floor < 0 else self._arrival[floor_num] + on_floor
+
+    def route(self, floor_num, row, col):
+        """Per-floor route segments as a list of (floor, cells) pairs
+
+        Lower floors contribute the path from their entry to the up ramp,
+        the target floor the path from the ramp landing to the spot. A floor
+        the ramps do not reach gets only its own segment.
+        """
+        segments = []
+        lower_floors = sorted(f for f in self._arrival if f < floor_num) if floor_num in self._arrival else []
+        for lower in lower_floors:
+            segments.append((lower, self.floors[lower].route('entry', *self._nearest_ramp(lower))))
+        segments.append((floor_num, self.floors[floor_num].route('entry', row, col)))
+        return segments
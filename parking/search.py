@@ -0,0 +1,120 @@
+"""Best available spot across the floors of a facility and nearby facilities
+
+Every floor's SpotTable keeps its available spots in heaps ordered by lane
+distance from each kind of point, per spot type, so the best spot on one
+floor is a heap peek. A facility-wide search adds each floor's driving
+cost from the street (through the ramps, from the FacilityRouter) to that
+floor's best spot and takes the cheapest. Floors are visited nearest
+first and the search stops at the first floor whose drive alone costs more
+than the best spot found, so a query is usually one or two peeks. A
+geometric index over (floor, row, col) would rank by straight-line
+distance, which is wrong on a floor of one-way aisles and blocked cells,
+so the heaps are the index.
+
+When the whole facility is full, facilities within ``nearby_km`` of it are
+tried nearest first, by great-circle distance between their locations.
+"""
+import math
+
+from .routing import UNREACHABLE
+
+EARTH_RADIUS_KM = 6371.0
+# Fall back to facilities within this distance of the chosen one
+NEARBY_KM = 25.0
+
+
+def haversine_km(a, b):
+    """Great-circle distance between two (latitude, longitude) points"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+class SpotSearch:
+    """Facility-wide and nearby-facility spot search over an InventoryStore
+
+    Floors are ranked on ``inventory``; claims go to ``claims`` (the
+    inventory itself, or a ShardedInventory with ``inventory`` as its
+    replica). ``exclude`` arguments are callables
+    ``exclude(facility, floor)`` returning a boolean mask of spots to skip,
+    or None.
+    """
+
+    def __init__(self, inventory, claims=None, nearby_km=NEARBY_KM):
+        self.inventory = inventory
+        self.claims = claims or inventory
+        self.nearby_km = nearby_km
+        located = {name: info['location'] for name, info in inventory.facilities.items() if 'location' in info}
+        self._arrival_order = {}
+        self._nearby = {}
+        for name, location in located.items():
+            distances = [(haversine_km(location, other_location), other)
+                         for other, other_location in located.items() if other != name]
+            self._nearby[name] = [(other, km) for km, other in sorted(distances) if km <= nearby_km]
+
+    def nearby(self, facility_name):
+        """[(facility, km)] within ``nearby_km``, nearest first"""
+        return self._nearby.get(facility_name, [])
+
+    def _floors_by_arrival(self, facility_name):
+        """[(driving distance, floor)] for the reachable floors, nearest first"""
+        floors = self._arrival_order.get(facility_name)
+        if floors is None:
+            router = self.inventory.facility_router(facility_name)
+            floors = range(1, self.inventory.facilities[facility_name]['floors'] + 1)
+            floors = sorted((router.arrival(f), f) for f in floors if router.arrival(f) != UNREACHABLE)
+            self._arrival_order[facility_name] = floors
+        return floors
+
+    def _best(self, facility_name, kind, spot_type, exclude, skip=()):
+        best = None
+        for arrival, floor_num in self._floors_by_arrival(facility_name):
+            # Every spot on this floor and the ones after it costs at least
+            # the drive there
+            if best is not None and arrival >= best[2]:
+                break
+            if floor_num in skip or not self.inventory.available(facility_name, floor_num):
+                continue
+            mask = exclude(facility_name, floor_num) if exclude else None
+            idx = self.inventory.find_available(facility_name, floor_num, kind, spot_type, mask)
+            if idx < 0:
+                continue
+            cost = arrival
+            if kind is not None:
+                table = self.inventory.floor(facility_name, floor_num)
+                cost += int(table.distances.get(kind, table.distance_to_entry)[idx])
+            if best is None or cost < best[2]:
+                best = (floor_num, idx, cost, mask)
+        return best
+
+    def best(self, facility_name, kind=None, spot_type=None, exclude=None):
+        """(floor, spot index, cost) of the best spot anywhere in the facility, or None
+
+        The cost is the driving distance to the floor plus the floor's
+        distance to the ``kind`` point; with no kind, the nearest floor with
+        space wins and the spot is a random available one.
+        """
+        best = self._best(facility_name, kind, spot_type, exclude)
+        return best[:3] if best else None
+
+    def claim(self, facility_name, kind=None, spot_type=None, exclude=None, nearby=True):
+        """Occupy the best spot in the facility, else in the nearest facility with one
+
+        Returns (facility, floor, spot index), or None when nothing is free.
+        Each claim is atomic on its floor; if another session takes the
+        ranked spot first, that floor's next best is claimed instead, or
+        the facility is ranked again without the floor that ran out.
+        """
+        facilities = [facility_name] + ([other for other, _ in self.nearby(facility_name)] if nearby else [])
+        for name in facilities:
+            full = set()
+            while True:
+                best = self._best(name, kind, spot_type, exclude, full)
+                if best is None:
+                    break
+                floor_num, _, _, mask = best
+                idx = self.claims.claim_best(name, floor_num, kind, spot_type, mask)
+                if idx >= 0:
+                    return name, floor_num, idx
+                full.add(floor_num)
+        return None
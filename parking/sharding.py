@@ -0,0 +1,297 @@
+"""Facility inventory partitioned across worker processes
+
+Each shard worker owns the InventoryStore and ReservationCalendar for the
+facilities that hash to it and serves them over a local Unix socket. App
+processes talk to the shards through ShardedInventory, which routes every
+call by facility. Because every claim and reservation for a facility goes
+through one owner, claims stay atomic across any number of app workers.
+
+App processes keep their own InventoryStore as a read replica for maps,
+routes and aggregates, and ``ShardedInventory.sync`` copies shard status
+changes into it. Calls are pickled, so both ends must share a secret key
+(PARKING_SHARD_AUTHKEY) and the socket directory must belong to the user
+running them and be closed to everyone else. Run the shards with:
+
+    PARKING_SHARD_AUTHKEY=... python -m parking.sharding --shards 4 --socket-dir /tmp/parking-shards
+"""
+import argparse
+import multiprocessing
+import os
+import stat
+import threading
+import time
+import zlib
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, wait
+
+import numpy as np
+
+from .inventory import DEFAULT_FACILITIES, InventoryStore, layout_facilities
+from .reservations import ReservationCalendar
+
+
+def shard_for(facility_name, n_shards):
+    """Shard number owning a facility, stable across processes"""
+    return zlib.crc32(facility_name.encode()) % n_shards
+
+
+def shard_address(socket_dir, shard):
+    return os.path.join(socket_dir, f"shard-{shard}.sock")
+
+
+def partition(facilities, n_shards):
+    """{shard: facilities dict} for every shard, empty ones included"""
+    shards = {shard: {} for shard in range(n_shards)}
+    for facility_name, info in facilities.items():
+        shards[shard_for(facility_name, n_shards)][facility_name] = info
+    return shards
+
+
+class ShardError(RuntimeError):
+    """A shard worker failed to execute a call"""
+
+
+def shard_authkey(authkey=None):
+    """Shared key for shard connections: ``authkey``, else PARKING_SHARD_AUTHKEY
+
+    Connections are authenticated with it before anything is unpickled.
+    """
+    if authkey is None:
+        authkey = os.environ.get('PARKING_SHARD_AUTHKEY')
+    if not authkey:
+        raise ShardError("shard connections need a shared key; set PARKING_SHARD_AUTHKEY")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+def secure_socket_dir(socket_dir, create=False):
+    """Make sure only this user can reach the sockets in ``socket_dir``
+
+    A directory someone else created first (at a predictable /tmp path)
+    could hold their sockets in place of the shards'.
+    """
+    if create:
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    info = os.lstat(socket_dir)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise ShardError(f"{socket_dir} is not a directory owned by this user")
+    if info.st_mode & 0o077:
+        raise ShardError(f"{socket_dir} is open to other users; use a private directory (mode 700)")
+
+
+def _handlers(store, calendar):
+    def statuses(facility_name, floor_num):
+        return store.version(facility_name, floor_num), store.floor(facility_name, floor_num).status.copy()
+
+    def claim_best(facility_name, floor_num, kind=None, spot_type=None, exclude=None):
+        return int(store.claim_best(facility_name, floor_num, kind, spot_type, exclude))
+
+    def reserve_best(facility_name, floor_num, start, end, kind=None, spot_type=None):
+        return int(calendar.reserve_best(facility_name, floor_num, start, end, kind, spot_type))
+
+    return {
+        'claim_best': claim_best,
+        'claim': store.claim,
+        'release': store.release,
+        'set_status': store.set_status,
+        'available': store.available,
+        'facility_counts': store.facility_counts,
+        'floor_versions': store.versions,
+        'statuses': statuses,
+        'reserve_best': reserve_best,
+        'busy_mask': calendar.busy_mask,
+    }
+
+
+def serve_shard(address, facilities, layout_path=None, seed=0, db_path=None, authkey=None):
+    """Own ``facilities`` and answer calls on ``address`` until killed
+
+    One thread accepts connections; the main loop multiplexes every client
+    connection and runs calls one at a time, so the store sees no
+    concurrency from its own clients. Clients must present ``authkey``
+    (see ``shard_authkey``).
+    """
+    authkey = shard_authkey(authkey)
+    store = InventoryStore(facilities, layout_path=layout_path, seed=seed)
+    calendar = ReservationCalendar(store)
+    if db_path:
+        from .storage import BookingStore
+        calendar.load(BookingStore(db_path).upcoming_reservations())
+    handlers = _handlers(store, calendar)
+
+    if os.path.exists(address):
+        os.remove(address)
+    listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    connections = []
+    lock = threading.Lock()
+
+    def accept():
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError):
+                # A client without the key, or one that hung up mid-handshake
+                continue
+            with lock:
+                connections.append(conn)
+
+    threading.Thread(target=accept, name='shard-accept', daemon=True).start()
+    while True:
+        with lock:
+            current = list(connections)
+        if not current:
+            time.sleep(0.05)
+            continue
+        for conn in wait(current, timeout=0.05):
+            try:
+                method, args = conn.recv()
+            except (EOFError, OSError):
+                with lock:
+                    connections.remove(conn)
+                continue
+            try:
+                reply = (True, handlers[method](*args))
+            except Exception as exc:
+                reply = (False, f"{type(exc).__name__}: {exc}")
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                # The client hung up before reading its reply
+                with lock:
+                    connections.remove(conn)
+                conn.close()
+
+
+def start_shards(n_shards, socket_dir, facilities=DEFAULT_FACILITIES, layout_path=None, seed=0, db_path=None,
+                 authkey=None, timeout=30):
+    """Spawn one worker process per shard and wait until all are listening"""
+    authkey = shard_authkey(authkey)
+    secure_socket_dir(socket_dir, create=True)
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for shard, owned in partition(facilities, n_shards).items():
+        address = shard_address(socket_dir, shard)
+        if os.path.exists(address):
+            os.remove(address)
+        process = context.Process(target=serve_shard, name=f'parking-shard-{shard}', daemon=True,
+                                  args=(address, owned, layout_path, seed, db_path, authkey))
+        process.start()
+        processes.append(process)
+    deadline = time.monotonic() + timeout
+    for shard in range(n_shards):
+        while not os.path.exists(shard_address(socket_dir, shard)):
+            if time.monotonic() > deadline:
+                raise ShardError(f"shard {shard} did not start")
+            time.sleep(0.01)
+    return processes
+
+
+class ShardedInventory:
+    """Routes inventory and reservation calls to the shard owning each facility
+
+    Mirrors the InventoryStore/ReservationCalendar methods the page handlers
+    use. Every calling thread gets its own connection per shard, opened with
+    ``authkey`` (see ``shard_authkey``) after checking ``socket_dir``. A
+    connection that fails is dropped and the call retried once on a new
+    one, so clients recover when a shard restarts.
+    """
+
+    def __init__(self, facilities, socket_dir, n_shards, authkey=None):
+        self.facilities = facilities
+        self.socket_dir = socket_dir
+        self.n_shards = n_shards
+        self.authkey = shard_authkey(authkey)
+        self._local = threading.local()
+        self._synced = {}
+        self._sync_lock = threading.Lock()
+
+    def _call(self, shard, method, *args):
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        for attempt in range(2):
+            conn = connections.get(shard)
+            try:
+                if conn is None:
+                    secure_socket_dir(self.socket_dir)
+                    conn = connections[shard] = Client(shard_address(self.socket_dir, shard), family='AF_UNIX',
+                                                       authkey=self.authkey)
+                conn.send((method, args))
+                ok, result = conn.recv()
+                break
+            except (EOFError, OSError) as exc:
+                connections.pop(shard, None)
+                if conn is not None:
+                    conn.close()
+                if attempt:
+                    raise ShardError(f"shard {shard} unreachable: {exc}") from exc
+        if not ok:
+            raise ShardError(result)
+        return result
+
+    def _route(self, method, facility_name, *args):
+        return self._call(shard_for(facility_name, self.n_shards), method, facility_name, *args)
+
+    def claim_best(self, facility_name, floor_num, kind=None, spot_type=None, exclude=None):
+        return self._route('claim_best', facility_name, floor_num, kind, spot_type, exclude)
+
+    def claim(self, facility_name, floor_num, spot_id):
+        return self._route('claim', facility_name, floor_num, spot_id)
+
+    def release(self, facility_name, floor_num, spot_id):
+        return self._route('release', facility_name, floor_num, spot_id)
+
+    def set_status(self, facility_name, floor_num, spot_id, status):
+        return self._route('set_status', facility_name, floor_num, spot_id, status)
+
+    def available(self, facility_name, floor_num=None):
+        return self._route('available', facility_name, floor_num)
+
+    def reserve_best(self, facility_name, floor_num, start, end, kind=None, spot_type=None):
+        return self._route('reserve_best', facility_name, floor_num, start, end, kind, spot_type)
+
+    def busy_mask(self, facility_name, floor_num, start, end):
+        return self._route('busy_mask', facility_name, floor_num, start, end)
+
+    def facility_counts(self):
+        counts = {}
+        for shard in range(self.n_shards):
+            counts.update(self._call(shard, 'facility_counts'))
+        return counts
+
+    def sync(self, replica):
+        """Copy status changes on every shard into a local InventoryStore replica
+
+        One call per shard lists floor versions; only floors that moved
+        since the last sync are fetched. Changes go through the replica's
+        normal update path, so its listeners see them.
+        """
+        with self._sync_lock:
+            changed = 0
+            for shard in range(self.n_shards):
+                for (facility_name, floor_num), version in self._call(shard, 'floor_versions').items():
+                    if self._synced.get((facility_name, floor_num)) == version:
+                        continue
+                    version, status = self._call(shard, 'statuses', facility_name, floor_num)
+                    changed += replica.apply_statuses(facility_name, floor_num, np.arange(len(status)), status)
+                    self._synced[(facility_name, floor_num)] = version
+            return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run parking inventory shard workers")
+    parser.add_argument('--shards', type=int, default=os.cpu_count())
+    parser.add_argument('--socket-dir', default=os.environ.get('PARKING_SHARD_DIR', '/tmp/parking-shards'))
+    parser.add_argument('--layout-file', default=os.environ.get('PARKING_LAYOUT_FILE'))
+    parser.add_argument('--db', default=os.environ.get('PARKING_DB_PATH', 'parking.db'),
+                        help="database to load upcoming reservations from")
+    args = parser.parse_args()
+
+    processes = start_shards(args.shards, args.socket_dir, layout_facilities(args.layout_file),
+                             layout_path=args.layout_file, db_path=args.db)
+    print(f"{args.shards} shards listening in {args.socket_dir}")
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""SQLite persistence for users, parking sessions and bookings"""
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    phone TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    vehicle TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    facility TEXT NOT NULL,
+    floor TEXT NOT NULL,
+    spot TEXT NOT NULL,
+    entry_ts TEXT NOT NULL,
+    exit_ts TEXT,
+    status TEXT NOT NULL,
+    spot_type TEXT,
+    fee REAL
+);
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    session_id INTEGER REFERENCES sessions(id),
+    facility TEXT NOT NULL,
+    floor TEXT,
+    spot TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT,
+    duration INTEGER,
+    type TEXT,
+    status TEXT NOT NULL,
+    entry_time TEXT,
+    exit_time TEXT,
+    start_ts TEXT,
+    end_ts TEXT,
+    fee REAL,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_bookings_user ON bookings (user_id, id);
+CREATE INDEX IF NOT EXISTS idx_bookings_user_status ON bookings (user_id, status, id);
+CREATE INDEX IF NOT EXISTS idx_bookings_facility_date ON bookings (facility, date);
+CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings (date);
+CREATE INDEX IF NOT EXISTS idx_bookings_status_end ON bookings (status, end_ts);
+CREATE INDEX IF NOT EXISTS idx_bookings_session ON bookings (session_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_status ON sessions (user_id, status);
+CREATE INDEX IF NOT EXISTS idx_sessions_status ON sessions (status);
+CREATE INDEX IF NOT EXISTS idx_sessions_facility_entry ON sessions (facility, entry_ts);
+"""
+
+BOOKING_COLUMNS = ('facility', 'floor', 'spot', 'date', 'time', 'duration', 'type', 'status',
+                   'entry_time', 'exit_time', 'start_ts', 'end_ts', 'fee')
+# Timestamps are kept for queries and billing, not shown in history
+DISPLAY_COLUMNS = ('id',) + tuple(col for col in BOOKING_COLUMNS if col not in ('start_ts', 'end_ts'))
+
+# Columns added after the first schema; created on databases that predate them
+MIGRATIONS = {
+    'sessions': (('spot_type', 'TEXT'), ('fee', 'REAL')),
+    'bookings': (('start_ts', 'TEXT'), ('end_ts', 'TEXT'), ('fee', 'REAL'))
+}
+
+DISPLAY_DATE = "%d %b %Y"
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class BookingStore:
+    """Durable booking history in a single SQLite file
+
+    Each thread (Streamlit runs every session's script on its own thread)
+    gets its own connection. The database runs in WAL mode so readers never
+    block the writer, and bulk inserts go through executemany in a single
+    transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            self._migrate(conn)
+            conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _migrate(conn):
+        for table, columns in MIGRATIONS.items():
+            existing = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if not existing:
+                continue
+            for name, sql_type in columns:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # Users
+
+    def upsert_user(self, phone, name, vehicle):
+        """Create or update a user keyed by phone number; returns the user id"""
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO users (phone, name, vehicle, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(phone) DO UPDATE SET name = excluded.name, vehicle = excluded.vehicle",
+                (phone, name, vehicle, _now())
+            )
+            return conn.execute("SELECT id FROM users WHERE phone = ?", (phone,)).fetchone()['id']
+
+    # Parking sessions
+
+    def start_session(self, user_id, facility, floor, spot, entry_ts=None, spot_type=None):
+        """Record a car entering a spot; returns the session id"""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO sessions (user_id, facility, floor, spot, entry_ts, status, spot_type) "
+                "VALUES (?, ?, ?, ?, ?, 'active', ?)",
+                (user_id, facility, floor, spot, entry_ts or _now(), spot_type)
+            )
+            return cur.lastrowid
+
+    def end_session(self, session_id, exit_ts=None, fee=None):
+        """Close an active session and add it to the booking history
+
+        Only the first call for a session succeeds, so callers release the
+        spot only when this returns the completed session row (None if it
+        was no longer active).
+        """
+        exit_ts = exit_ts or _now()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE sessions SET exit_ts = ?, fee = ?, status = 'completed' WHERE id = ? AND status = 'active'",
+                (exit_ts, fee, session_id)
+            )
+            if not cur.rowcount:
+                return None
+            session = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            entry = datetime.fromisoformat(session['entry_ts'])
+            exit_time = datetime.fromisoformat(exit_ts)
+            conn.execute(
+                "INSERT INTO bookings (user_id, session_id, facility, floor, spot, date, time, duration, type, "
+                "status, entry_time, exit_time, start_ts, end_ts, fee, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'Completed', ?, ?, ?, ?, ?, ?)",
+                (session['user_id'], session_id, session['facility'], session['floor'], session['spot'],
+                 entry.date().isoformat(), entry.strftime("%I:%M %p"),
+                 round((exit_time - entry).total_seconds() / 3600, 2), session['spot_type'],
+                 entry.strftime("%I:%M %p"), exit_time.strftime("%I:%M %p"), session['entry_ts'], exit_ts, fee,
+                 _now())
+            )
+        return dict(session)
+
+    def completed_sessions(self, facility, date_from, date_to):
+        """(id, entry_ts, exit_ts, spot_type, fee) rows for sessions entered in [date_from, date_to)"""
+        return self._conn().execute(
+            "SELECT id, entry_ts, exit_ts, spot_type, fee FROM sessions "
+            "WHERE facility = ? AND entry_ts >= ? AND entry_ts < ? AND status = 'completed'",
+            (facility, date_from, date_to)
+        ).fetchall()
+
+    def update_session_fees(self, rows):
+        """Save (fee, session id) pairs on the sessions and their history rows"""
+        rows = list(rows)
+        with self._conn() as conn:
+            conn.executemany("UPDATE sessions SET fee = ? WHERE id = ?", rows)
+            conn.executemany("UPDATE bookings SET fee = ? WHERE session_id = ?", rows)
+
+    def active_session(self, user_id):
+        """The user's open parking session as a dict, or None"""
+        row = self._conn().execute(
+            "SELECT * FROM sessions WHERE user_id = ? AND status = 'active' ORDER BY id DESC LIMIT 1",
+            (user_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def active_sessions(self):
+        """Every open session, e.g. to re-occupy spots after a restart"""
+        return [dict(row) for row in self._conn().execute("SELECT * FROM sessions WHERE status = 'active'")]
+
+    # Bookings
+
+    def add_booking(self, user_id, booking):
+        """Insert one booking dict; ``date`` is an ISO date string"""
+        return self.add_bookings(user_id, [booking])[0]
+
+    def add_bookings(self, user_id, bookings):
+        """Insert many bookings in one transaction; returns their ids"""
+        created = _now()
+        rows = [(user_id,) + tuple(b.get(col) for col in BOOKING_COLUMNS) + (created,) for b in bookings]
+        with self._conn() as conn:
+            ids = []
+            for row in rows:
+                ids.append(conn.execute(
+                    f"INSERT INTO bookings (user_id, {', '.join(BOOKING_COLUMNS)}, created_at) "
+                    f"VALUES ({', '.join('?' * (len(BOOKING_COLUMNS) + 2))})",
+                    row
+                ).lastrowid)
+        return ids
+
+    def bulk_insert_bookings(self, rows):
+        """Fast path for imports: (user_id, *BOOKING_COLUMNS) tuples via executemany"""
+        created = _now()
+        with self._conn() as conn:
+            conn.executemany(
+                f"INSERT INTO bookings (user_id, {', '.join(BOOKING_COLUMNS)}, created_at) "
+                f"VALUES ({', '.join('?' * (len(BOOKING_COLUMNS) + 2))})",
+                (tuple(row) + (created,) for row in rows)
+            )
+
+    def upcoming_reservations(self, after=None):
+        """(facility, floor number, spot, start, end) for confirmed bookings ending after ``after``"""
+        rows = self._conn().execute(
+            "SELECT facility, floor, spot, start_ts, end_ts FROM bookings "
+            "WHERE status = 'Confirmed' AND end_ts > ?",
+            ((after or datetime.now()).isoformat(timespec='seconds'),)
+        )
+        return [
+            (row['facility'], int(row['floor'].split()[1]), row['spot'],
+             datetime.fromisoformat(row['start_ts']), datetime.fromisoformat(row['end_ts']))
+            for row in rows
+        ]
+
+    def occupancy_intervals(self, before=None):
+        """(facility, floor number, start, end) ISO rows for stays that began before ``before``
+
+        Completed sessions plus reservations with a recorded window; the
+        history rows written when a session ends duplicate the former and
+        are skipped.
+        """
+        before = (before or datetime.now()).isoformat(timespec='seconds')
+        rows = self._conn().execute(
+            "SELECT facility, floor, entry_ts, exit_ts FROM sessions WHERE status = 'completed' AND entry_ts < ? "
+            "UNION ALL "
+            "SELECT facility, floor, start_ts, end_ts FROM bookings "
+            "WHERE status IN ('Confirmed', 'Completed') AND session_id IS NULL AND start_ts IS NOT NULL "
+            "AND start_ts < ?",
+            (before, before)
+        )
+        return [(facility, int(floor.split()[1]), start, end) for facility, floor, start, end in rows]
+
+    def _where(self, user_id, facility, status, date_from, date_to):
+        clauses, params = ["user_id = ?"], [user_id]
+        for clause, value in (("facility = ?", facility), ("status = ?", status),
+                              ("date >= ?", date_from), ("date <= ?", date_to)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def count_bookings(self, user_id, facility=None, status=None, date_from=None, date_to=None):
+        """Number of bookings matching the filters, answered from the indexes"""
+        where, params = self._where(user_id, facility, status, date_from, date_to)
+        return self._conn().execute(f"SELECT COUNT(*) FROM bookings WHERE {where}", params).fetchone()[0]
+
+    def list_bookings(self, user_id, limit=20, offset=0, facility=None, status=None, date_from=None,
+                      date_to=None):
+        """One page of bookings, newest first, as display dicts"""
+        where, params = self._where(user_id, facility, status, date_from, date_to)
+        rows = self._conn().execute(
+            f"SELECT * FROM bookings WHERE {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]
+        )
+        return [self._booking(row) for row in rows]
+
+    @staticmethod
+    def _booking(row):
+        booking = {key: row[key] for key in DISPLAY_COLUMNS if row[key] is not None}
+        booking['date'] = datetime.fromisoformat(row['date']).strftime(DISPLAY_DATE)
+        return booking
@@ -0,0 +1,20 @@
+from parking.aggregates import OccupancyAggregates
+from parking.inventory import STATUS_AVAILABLE, InventoryStore, layout_facilities
+
+
+def test_totals_follow_claims_and_releases():
+    inventory = InventoryStore(layout_facilities(None))
+    aggregates = OccupancyAggregates(inventory)
+    spots = sum(len(inventory.floor(name, floor_num))
+                for name, info in inventory.facilities.items() for floor_num in range(1, info['floors'] + 1))
+    facilities, total, available = aggregates.totals()
+    assert (facilities, total) == (len(inventory.facilities), spots)
+    assert sum(t for t, _ in aggregates.type_counts().values()) == spots
+
+    name = next(iter(inventory.facilities))
+    table = inventory.floor(name, 1)
+    spot_id = str(table.ids[table.status == STATUS_AVAILABLE][0])
+    assert inventory.claim(name, 1, spot_id)
+    assert aggregates.totals() == (facilities, spots, available - 1)
+    inventory.release(name, 1, spot_id)
+    assert aggregates.totals() == (facilities, spots, available)
@@ -0,0 +1,89 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from parking.assignment import INFEASIBLE, assign_batch, congested_assignment, linear_sum_assignment
+from parking.inventory import InventoryStore
+
+
+def brute_force_cost(cost):
+    """Cheapest total over every way to give each row its own column"""
+    n, m = cost.shape
+    return min(cost[np.arange(n), list(cols)].sum() for cols in itertools.permutations(range(m), n))
+
+
+@pytest.mark.parametrize('n, m', [(1, 1), (1, 4), (2, 2), (3, 5), (4, 4), (5, 6), (6, 6)])
+def test_matches_brute_force(n, m):
+    rng = np.random.default_rng(n * 10 + m)
+    for _ in range(20):
+        cost = rng.integers(0, 20, size=(n, m)).astype(np.float64)
+        rows, cols = linear_sum_assignment(cost)
+        assert rows.tolist() == list(range(n))
+        assert len(set(cols.tolist())) == n
+        assert cost[rows, cols].sum() == brute_force_cost(cost)
+
+
+def test_ties_and_real_costs():
+    rng = np.random.default_rng(1)
+    for cost in (np.zeros((4, 5)), np.ones((3, 3)), rng.random((5, 7))):
+        rows, cols = linear_sum_assignment(cost)
+        assert len(set(cols.tolist())) == len(cost)
+        assert np.isclose(cost[rows, cols].sum(), brute_force_cost(cost))
+
+
+def test_avoids_infeasible_pairs():
+    cost = np.array([[INFEASIBLE, 1.0, INFEASIBLE],
+                     [2.0, 5.0, INFEASIBLE],
+                     [INFEASIBLE, INFEASIBLE, 3.0]])
+    rows, cols = linear_sum_assignment(cost)
+    assert cols.tolist() == [1, 0, 2]
+
+
+def test_more_rows_than_columns():
+    with pytest.raises(ValueError):
+        linear_sum_assignment(np.zeros((3, 2)))
+
+
+def brute_force_congested(cost, groups, weight):
+    """(rows matched, cost) of the best matching: most rows first, then cheapest"""
+    n, m = cost.shape
+    for k in range(n, -1, -1):
+        best = np.inf
+        for rows in itertools.combinations(range(n), k):
+            for cols in itertools.permutations(range(m), k):
+                pairs = cost[list(rows), list(cols)]
+                if (pairs >= INFEASIBLE).any():
+                    continue
+                load = np.bincount(groups[list(cols)])
+                best = min(best, pairs.sum() + weight * (load * (load - 1) / 2).sum())
+        if best < np.inf:
+            return k, best
+    return 0, 0.0
+
+
+@pytest.mark.parametrize('weight', [0.0, 1.0, 2.5, 10.0])
+def test_congested_matches_brute_force(weight):
+    rng = np.random.default_rng(int(weight * 10))
+    for _ in range(40):
+        n, m = rng.integers(1, 5), rng.integers(1, 7)
+        cost = rng.integers(0, 10, size=(n, m)).astype(np.float64)
+        cost[rng.random((n, m)) < 0.2] = INFEASIBLE
+        groups = rng.integers(0, 3, m)
+        rows, cols = congested_assignment(cost, groups, weight)
+        assert len(set(cols.tolist())) == len(cols)
+        load = np.bincount(groups[cols]) if len(cols) else np.zeros(1)
+        found = cost[rows, cols].sum() + weight * (load * (load - 1) / 2).sum()
+        k, best = brute_force_congested(cost, groups, weight)
+        assert len(rows) == k
+        assert np.isclose(found, best)
+
+
+def test_batch_spreads_cars_over_aisles():
+    table = InventoryStore({'Surge': {'total': 2000, 'floors': 1}}).floor('Surge', 1)
+    aisles = len(np.unique(table.col))
+    arrivals = [('entry', None)] * (aisles * 6)
+    assert np.bincount(table.col[assign_batch(table, arrivals, congestion_weight=0.0)]).max() > 6
+    spots = assign_batch(table, arrivals)
+    assert len(set(spots.tolist())) == len(arrivals)
+    assert np.bincount(table.col[spots]).max() == 6
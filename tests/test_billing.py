@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from parking.billing import Tariffs, band_minutes, to_minutes
+
+FACILITY = 'Select Mall - Saket'
+DAY = datetime(2024, 3, 1)
+
+
+def at(hour, minute=0, days=0):
+    return DAY + timedelta(days=days, hours=hour, minutes=minute)
+
+
+@pytest.mark.parametrize('entry, exit_, spot_type, fee', [
+    (at(9), at(11), 'Regular', 80.0),                  # two day hours at 40
+    (at(22), at(2, days=1), 'Regular', 100.0),         # 2h at 30, then 2h at 20 after midnight
+    (at(19), at(9, days=1), 'Regular', 360.0),         # 40 + 4 x 30 + 8 x 20 + 40
+    (at(0), at(0, days=2), 'Regular', 1520.0),         # two whole days of 760
+    (at(7, 30), at(8, 30), 'Regular', 30.0),           # 30 min at 20, 30 min at 40
+    (at(9), at(11), 'Disabled', 40.0),                 # half rate
+    (at(9), at(9, 10), 'Regular', 0.0),                # inside the grace period
+    (at(9), at(9, 11), 'Regular', 20.0),               # just past it pays the minimum
+    (at(9), at(9, 30), 'Regular', 20.0),               # 20.0 exactly
+    (at(9), at(10), 'EV Charging', 126.4),             # 40 + 60 min x 0.12 kWh x 12
+    (at(9), at(9, 5), 'EV Charging', 0.0),             # grace covers energy too
+    (at(11), at(9), 'Regular', 0.0),                   # exit before entry is an empty stay
+])
+def test_known_fees(entry, exit_, spot_type, fee):
+    assert Tariffs().fee(FACILITY, entry, exit_, spot_type) == pytest.approx(fee)
+
+
+def test_facility_overrides():
+    tariffs = Tariffs()
+    # Day band at 50 from 10:00, energy at 14 per kWh
+    assert tariffs.fee('Phoenix Market City - Mumbai', at(10), at(11), 'EV Charging') == pytest.approx(150.8)
+    assert tariffs.fee('DLF Cyber Hub - Gurgaon', at(23), at(1, days=1), 'Regular') == pytest.approx(70.0)
+    custom = Tariffs({FACILITY: {'grace_minutes': 0, 'minimum': 0.0}})
+    assert custom.fee(FACILITY, at(9), at(9, 3), 'Regular') == pytest.approx(2.0)
+
+
+def test_batch_matches_single_fees():
+    rng = np.random.default_rng(0)
+    entries = [at(0) + timedelta(minutes=int(m)) for m in rng.integers(0, 7 * 1440, 50)]
+    exits = [e + timedelta(minutes=int(m)) for e, m in zip(entries, rng.integers(0, 3 * 1440, 50))]
+    types = rng.choice(['Regular', 'EV Charging', 'Disabled'], 50).tolist()
+    tariffs = Tariffs()
+    fees = tariffs.fees(FACILITY, entries, exits, types)
+    assert fees.tolist() == [tariffs.fee(FACILITY, *stay) for stay in zip(entries, exits, types)]
+
+
+def test_band_minutes_matches_minute_count():
+    rng = np.random.default_rng(1)
+    start = rng.integers(0, 5 * 1440, 200)
+    end = start + rng.integers(0, 3 * 1440, 200)
+    for band_start, band_end in ((0, 480), (480, 1200), (1200, 1440), (0, 1440)):
+        counted = [np.count_nonzero((np.arange(s, e) % 1440 >= band_start) & (np.arange(s, e) % 1440 < band_end))
+                   for s, e in zip(start, end)]
+        assert band_minutes(start, end, band_start, band_end).tolist() == counted
+
+
+def test_to_minutes_accepts_iso_strings():
+    assert to_minutes(['2024-03-01T09:30:00']).tolist() == to_minutes([at(9, 30)]).tolist()
+    assert to_minutes([at(0)])[0] % 1440 == 0
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from parking import forecast
+from parking.forecast import HOURS_PER_WEEK, OccupancyForecaster, hourly_occupancy, to_hours
+from parking.inventory import InventoryStore, layout_facilities
+
+FACILITY = 'Select Mall - Saket'
+# Two whole weeks after the Monday week origin, so every bucket is seen twice
+NOW = datetime(2024, 1, 15)
+
+STAYS = [
+    (FACILITY, 2, datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 1, 0, 30)),
+    (FACILITY, 1, datetime(2024, 1, 1, 9, 0), datetime(2024, 1, 1, 11, 30)),
+    (FACILITY, 1, datetime(2024, 1, 8, 9, 30), datetime(2024, 1, 8, 10, 0)),
+    # Sunday night into Monday wraps from bucket 167 to bucket 0
+    (FACILITY, 1, datetime(2024, 1, 7, 23, 0), datetime(2024, 1, 8, 1, 0)),
+]
+
+
+class FixedClock(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+
+@pytest.fixture
+def forecaster(monkeypatch):
+    monkeypatch.setattr(forecast, 'datetime', FixedClock)
+    return OccupancyForecaster(InventoryStore(layout_facilities(None)))
+
+
+def test_to_hours():
+    assert to_hours([datetime(2024, 1, 1)]).tolist() == [0.0]
+    assert to_hours([datetime(2024, 1, 8, 1, 30), '2024-01-01T02:15:00']).tolist() == [169.5, 2.25]
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0.5, 2.25, [0.5, 1.0, 0.25]),
+    (1.25, 1.75, [0.0, 0.5, 0.0]),
+    (0.0, 2.0, [1.0, 1.0, 0.0]),    # ends on an hour boundary
+    (2.0, 3.0, [0.0, 0.0, 1.0]),    # ends at n_hours
+    (1.0, 1.0, [0.0, 0.0, 0.0]),
+])
+def test_hourly_occupancy_edges(start, end, expected):
+    assert hourly_occupancy(np.array([start]), np.array([end]), 3).tolist() == pytest.approx(expected)
+
+
+def test_hourly_occupancy_sums_overlaps():
+    rng = np.random.default_rng(0)
+    start = rng.random(100) * 20
+    end = np.minimum(start + rng.random(100) * 6, 24)
+    # Overlap of each interval with each clock hour, summed
+    hours = np.arange(24)
+    expected = np.clip(np.minimum(end[:, None], hours + 1) - np.maximum(start[:, None], hours), 0, None).sum(axis=0)
+    assert np.allclose(hourly_occupancy(start, end, 24), expected)
+
+
+def test_fit_buckets_by_hour_of_week(forecaster):
+    forecaster.fit(STAYS, now=NOW)
+    curve = forecaster.curve(FACILITY, 1)
+    expected = np.zeros(HOURS_PER_WEEK)
+    expected[[9, 10, 11, 167, 0]] = [1.5 / 2, 1 / 2, 0.5 / 2, 1 / 2, 1 / 2]
+    assert np.allclose(curve, expected)
+    assert np.allclose(forecaster.curve(FACILITY, 2), np.eye(HOURS_PER_WEEK)[0] * 0.25)
+    assert forecaster.curve(FACILITY, 3) is None
+
+
+def test_observed_stays_match_fit(forecaster):
+    forecaster.fit(STAYS, now=NOW)
+    fitted = forecaster.curve(FACILITY, 1)
+    forecaster.fit(STAYS[:1], now=NOW)
+    for stay in STAYS[1:]:
+        forecaster.observe(*stay)
+    assert np.allclose(forecaster.curve(FACILITY, 1), fitted)
+
+
+def test_expected_free(forecaster):
+    forecaster.fit(STAYS, now=NOW)
+    capacity = len(forecaster.inventory.floor(FACILITY, 1))
+    # Busiest hour in 09:00-12:00 averages 0.75 occupied, which rounds to 1
+    assert forecaster.expected_free(FACILITY, 1, datetime(2024, 1, 15, 9), 3) == capacity - 1
+    assert forecaster.expected_free(FACILITY, 1, datetime(2024, 1, 15, 13), 2) == capacity
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from parking.aggregates import OccupancyAggregates
+from parking.ingest import OccupancyIngestor, event_ms
+from parking.inventory import STATUS_NAMES, InventoryStore, layout_facilities
+
+FACILITY = 'Select Mall - Saket'
+
+
+@pytest.fixture
+def inventory():
+    inventory = InventoryStore(layout_facilities(None))
+    # Its listener raised on the phantom floors unknown floor numbers built
+    OccupancyAggregates(inventory)
+    return inventory
+
+
+@pytest.fixture
+def spot(inventory):
+    table = inventory.floor(FACILITY, 1)
+    return str(table.ids[table.status == STATUS_NAMES.index('available')][0])
+
+
+def event(spot, status, ts, floor=1, facility=FACILITY):
+    return {'facility': facility, 'floor': floor, 'spot': spot, 'status': status, 'ts': ts}
+
+
+def status(inventory, spot):
+    table = inventory.floor(FACILITY, 1)
+    return STATUS_NAMES[table.status[table.index_of(spot)]]
+
+
+def test_event_ms():
+    assert event_ms(1.5) == 1500
+    assert event_ms('1970-01-01T00:00:01+00:00') == 1000
+
+
+def test_duplicates_apply_once(inventory, spot):
+    ingestor = OccupancyIngestor(inventory)
+    occupied = event(spot, 'occupied', 100)
+    assert ingestor.apply_batch([occupied, json.dumps(occupied)]) == 1
+    assert ingestor.apply_batch([occupied]) == 0
+    assert status(inventory, spot) == 'occupied'
+    assert ingestor.stats['superseded'] == 1 and ingestor.stats['stale'] == 1
+
+
+def test_newest_event_wins_out_of_order(inventory, spot):
+    ingestor = OccupancyIngestor(inventory)
+    ingestor.apply_batch([event(spot, 'available', 300), event(spot, 'occupied', 200)])
+    assert status(inventory, spot) == 'available'
+    # A late event from before the applied one is dropped
+    ingestor.apply_batch([event(spot, 'occupied', 250)])
+    assert status(inventory, spot) == 'available'
+    ingestor.apply_batch([event(spot, 'occupied', 301)])
+    assert status(inventory, spot) == 'occupied'
+
+
+@pytest.mark.parametrize('bad', [
+    'not json',
+    {'facility': FACILITY, 'floor': 1, 'status': 'occupied', 'ts': 1},
+    {'facility': FACILITY, 'floor': 'one', 'spot': '1A01', 'status': 'occupied', 'ts': 1},
+    {'facility': FACILITY, 'floor': 1, 'spot': '1A01', 'status': 'parked', 'ts': 1},
+    {'facility': FACILITY, 'floor': 1, 'spot': '1A01', 'status': 'occupied', 'ts': 'garbage'},
+    {'facility': FACILITY, 'floor': 1, 'spot': '1A01', 'status': 'occupied', 'ts': None},
+    {'facility': FACILITY, 'floor': 1, 'spot': '1A01', 'status': 'occupied', 'ts': float('inf')},
+])
+def test_malformed_events_are_skipped(inventory, spot, bad):
+    ingestor = OccupancyIngestor(inventory)
+    assert ingestor.apply_batch([bad, event(spot, 'occupied', 100)]) == 1
+    assert ingestor.stats['malformed'] == 1
+    assert status(inventory, spot) == 'occupied'
+
+
+@pytest.mark.parametrize('facility, floor, spot_id', [
+    ('Nowhere', 1, '1A01'),
+    (FACILITY, 0, '1A01'),
+    (FACILITY, 9, '9A01'),
+    (FACILITY, 1, 'ZZ99'),
+])
+def test_unknown_locations_are_counted(inventory, spot, facility, floor, spot_id):
+    ingestor = OccupancyIngestor(inventory)
+    floors = inventory.facilities[FACILITY]['floors']
+    assert ingestor.apply_batch([event(spot_id, 'occupied', 100, floor, facility), event(spot, 'occupied', 100)]) == 1
+    assert ingestor.stats['unknown'] == 1
+    assert all(1 <= f <= floors for name, f in inventory.versions() if name == FACILITY)
@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from parking.inventory import InventoryStore, layout_facilities
+from parking.reservations import FloorReservations, ReservationCalendar
+
+FACILITY = 'Select Mall - Saket'
+
+
+@pytest.fixture
+def floor():
+    floor = FloorReservations(4)
+    assert floor.add(1, 100, 200)
+    return floor
+
+
+@pytest.mark.parametrize('start, end, busy', [
+    (0, 100, False),     # ends where the reservation starts
+    (200, 300, False),   # starts where it ends
+    (0, 101, True),      # one minute into it
+    (199, 300, True),    # its last minute
+    (120, 150, True),    # inside it
+    (50, 250, True),     # around it
+])
+def test_overlap_edges(floor, start, end, busy):
+    assert floor.busy_mask(start, end).tolist() == [False, busy, False, False]
+    assert floor.add(1, start, end) is not busy
+
+
+def test_other_spots_unaffected(floor):
+    # A long reservation on the last spot must not leak into its neighbours
+    assert floor.add(3, 0, 10 ** 9)
+    assert floor.busy_mask(150, 160).tolist() == [False, True, False, True]
+    assert floor.add(0, 150, 160)
+    assert floor.add(2, 150, 160)
+
+
+def test_latest_reservation_before_window_decides(floor):
+    assert floor.add(1, 300, 400)
+    assert floor.add(1, 200, 300)
+    assert not floor.busy_mask(400, 500)[1]
+    assert floor.busy_mask(399, 500)[1]
+    assert not floor.add(1, 250, 260)
+    assert len(floor) == 3
+
+
+def test_empty_windows_rejected():
+    floor = FloorReservations(2)
+    assert not floor.add(0, 100, 100)
+    assert not floor.add(0, 100, 50)
+    assert not floor.busy_mask(0, 10 ** 6).any()
+
+
+def test_expire_keeps_unfinished(floor):
+    assert floor.add(2, 150, 250)
+    floor.expire(200)
+    assert len(floor) == 1
+    assert floor.busy_mask(200, 250).tolist() == [False, False, True, False]
+
+
+def test_calendar_reserve_and_sweep():
+    store = InventoryStore(layout_facilities(None))
+    calendar = ReservationCalendar(store)
+    spot_id = str(store.floor(FACILITY, 1).ids[0])
+    past = datetime.now() - timedelta(days=1)
+    assert calendar.reserve(FACILITY, 1, spot_id, past, past + timedelta(hours=1))
+    assert not calendar.reserve(FACILITY, 1, spot_id, past + timedelta(minutes=30), past + timedelta(hours=2))
+    assert not calendar.reserve(FACILITY, 1, 'nope', past, past + timedelta(hours=1))
+
+    start = datetime.now() + timedelta(days=1)
+    taken = set()
+    for _ in range(len(store.floor(FACILITY, 1))):
+        idx = calendar.reserve_best(FACILITY, 1, start, start + timedelta(hours=2))
+        assert idx >= 0 and idx not in taken
+        taken.add(idx)
+    assert calendar.reserve_best(FACILITY, 1, start, start + timedelta(hours=2)) == -1
+    # The first reserve_best swept out yesterday's reservation
+    assert len(calendar.floor(FACILITY, 1)) == len(taken)
+    assert calendar.busy_mask(FACILITY, 1, start + timedelta(hours=1), start + timedelta(hours=3)).all()
+
@@ -0,0 +1,48 @@
+import os
+import time
+from multiprocessing.connection import Client
+
+import pytest
+
+from parking.inventory import DEFAULT_FACILITIES
+from parking.sharding import ShardedInventory, shard_address, start_shards
+
+AUTHKEY = os.urandom(32)
+FACILITY = 'Select Mall - Saket'
+
+
+@pytest.fixture
+def socket_dir(tmp_path):
+    return str(tmp_path / 'shards')
+
+
+def stop(processes):
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+def test_shard_survives_client_hanging_up(socket_dir):
+    processes = start_shards(1, socket_dir, authkey=AUTHKEY)
+    try:
+        conn = Client(shard_address(socket_dir, 0), family='AF_UNIX', authkey=AUTHKEY)
+        conn.send(('statuses', (FACILITY, 1)))
+        conn.close()
+        time.sleep(0.5)
+        assert processes[0].is_alive()
+        shards = ShardedInventory(DEFAULT_FACILITIES, socket_dir, 1, authkey=AUTHKEY)
+        assert shards.available(FACILITY, 1) > 0
+    finally:
+        stop(processes)
+
+
+def test_client_reconnects_after_shard_restart(socket_dir):
+    processes = start_shards(1, socket_dir, authkey=AUTHKEY)
+    shards = ShardedInventory(DEFAULT_FACILITIES, socket_dir, 1, authkey=AUTHKEY)
+    try:
+        available = shards.available(FACILITY, 1)
+        stop(processes)
+        processes = start_shards(1, socket_dir, authkey=AUTHKEY)
+        assert shards.available(FACILITY, 1) == available
+    finally:
+        stop(processes)
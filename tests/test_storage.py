@@ -0,0 +1,19 @@
+from parking.storage import BookingStore
+
+
+def test_update_session_fees_reaches_history(tmp_path):
+    store = BookingStore(str(tmp_path / 'parking.db'))
+    user_id = store.upsert_user('0000000000', 'Test', 'TEST')
+    ids = []
+    for spot in ('1A01', '1A02'):
+        session_id = store.start_session(user_id, 'Facility', 'Floor 1', spot, '2026-03-01T09:00:00', 'Regular')
+        store.end_session(session_id, '2026-03-01T11:00:00', fee=1.0)
+        ids.append(session_id)
+    store.update_session_fees([(80.0, ids[0])])
+
+    conn = store._conn()
+    assert [row['fee'] for row in conn.execute("SELECT fee FROM sessions ORDER BY id")] == [80.0, 1.0]
+    assert [row['fee'] for row in conn.execute("SELECT fee FROM bookings ORDER BY session_id")] == [80.0, 1.0]
+    # One lookup per updated session, not a scan of the history
+    plan = conn.execute("EXPLAIN QUERY PLAN UPDATE bookings SET fee = ? WHERE session_id = ?", (0.0, ids[0])).fetchall()
+    assert any('idx_bookings_session' in row['detail'] for row in plan)